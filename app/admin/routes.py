@@ -1,22 +1,39 @@
 # app/admin/routes.py
-from fastapi import APIRouter, Depends, HTTPException, Body
-from pydantic import BaseModel
-from typing import Optional, List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Response
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
 
 from sqlmodel import Session
 
 from app.database import get_session
 from app.admin import service as admin_service
+from app.admin import search as admin_search
+from app.games.slots import service as slot_service
 from app.model import CreditRequest, User
 from fastapi.security import OAuth2PasswordBearer
 from app.auth.services import get_user_from_token
+from app.users.export import export_response
+from app.middleware import admission
+from app.analytics import rollups
+from app.analytics.monitor import monitor
+from app.money import Money, to_major, to_minor
 
 router = APIRouter(prefix="/v1/admin", tags=["admin"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+ADMIN_ROLES = ("admin", "administrator", "administrador")
+
+def is_admin(user: User) -> bool:
+    return bool(user.role and user.role.lower() in ADMIN_ROLES)
+
+def _optional_minor(amount: Optional[float]) -> Optional[int]:
+    # filtros de monto opcionales de la query -> centavos
+    return to_minor(amount) if amount is not None else None
+
 class CreateCreditReqIn(BaseModel):
-    amount: float
+    amount: Money
     note: Optional[str] = None
 
 class CreateCreditReqOut(BaseModel):
@@ -28,44 +45,82 @@ class CreateCreditReqOut(BaseModel):
 class ApproveDenyIn(BaseModel):
     note: Optional[str] = None
 
+class BulkFilterIn(BaseModel):
+    user_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    min_amount: Optional[Money] = None
+    max_amount: Optional[Money] = None
+    limit: int = Field(admin_service.BULK_MAX_REQUESTS, ge=1, le=admin_service.BULK_MAX_REQUESTS)
+
+class BulkReviewIn(BaseModel):
+    action: Literal["approve", "deny"]
+    ids: Optional[List[int]] = None
+    filter: Optional[BulkFilterIn] = None
+    note: Optional[str] = None
+
 @router.post("/credits", response_model=CreateCreditReqOut)
 def create_request_for_user(payload: CreateCreditReqIn, token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)):
     # permitimos crear solicitud solo para el propio usuario (o admin si quieres)
     user = get_user_from_token(db, token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
-    req = admin_service.create_credit_request(db, user.id, payload.amount, payload.note)
-    return CreateCreditReqOut(id=req.id, user_id=req.user_id, amount=req.amount, status=req.status)
+    try:
+        req = admin_service.create_credit_request(db, user.id, payload.amount, payload.note)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CreateCreditReqOut(id=req.id, user_id=req.user_id, amount=to_major(req.amount), status=req.status)
 
 @router.get("/credits", response_model=List[dict])
-def list_credits(status: Optional[str] = None, token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)):
+def list_credits(
+    response: Response,
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session),
+):
     # solo admins pueden listar todas; si un jugador pide listado solo devuelve sus solicitudes
     user = get_user_from_token(db, token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    is_admin = (user.role and user.role.lower() in ("admin", "administrator", "administrador"))
-    reqs = admin_service.list_credit_requests(db, status=status)
-    out = []
-    for r in reqs:
-        if not is_admin and r.user_id != user.id:
-            continue
-        # Obtener username del usuario que solicita
-        req_user = db.get(User, r.user_id)
-        username = req_user.username if req_user else None
-        
-        out.append({
-            "id": r.id,
-            "user_id": r.user_id,
-            "username": username,
-            "amount": r.amount,
-            "status": r.status,
-            "created_at": r.created_at.isoformat(),
-            "reviewed_at": r.reviewed_at.isoformat() if r.reviewed_at else None,
-            "reviewer_id": r.reviewer_id,
-            "note": r.note
-        })
-    return out
+    if not is_admin(user):
+        user_id = user.id
+    try:
+        rows, next_cursor = admin_service.page_credit_requests(
+            db,
+            status=status,
+            user_id=user_id,
+            created_from=created_from,
+            created_to=created_to,
+            min_amount=_optional_minor(min_amount),
+            max_amount=_optional_minor(max_amount),
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # siguiente página: GET /v1/admin/credits?cursor=<X-Next-Cursor>
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [{
+        "id": r.id,
+        "user_id": r.user_id,
+        "username": username,
+        "amount": to_major(r.amount),
+        "status": r.status,
+        "created_at": r.created_at.isoformat(),
+        "reviewed_at": r.reviewed_at.isoformat() if r.reviewed_at else None,
+        "reviewer_id": r.reviewer_id,
+        "note": r.note
+    } for r, username in rows]
 
 @router.post("/credits/{request_id}/approve")
 def approve_credit(request_id: int, token: str = Depends(oauth2_scheme), db: Session = Depends(get_session), payload: Optional[ApproveDenyIn] = Body(None)):
@@ -73,14 +128,14 @@ def approve_credit(request_id: int, token: str = Depends(oauth2_scheme), db: Ses
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
     # require admin
-    if not (user.role and user.role.lower() in ("admin", "administrator", "administrador")):
+    if not is_admin(user):
         raise HTTPException(status_code=403, detail="Require admin role")
 
     try:
         req = admin_service.approve_credit_request(db, request_id, user.id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    return {"id": req.id, "status": req.status, "user_id": req.user_id, "amount": req.amount, "reviewed_at": req.reviewed_at.isoformat()}
+    return {"id": req.id, "status": req.status, "user_id": req.user_id, "amount": to_major(req.amount), "reviewed_at": req.reviewed_at.isoformat()}
 
 @router.post("/credits/{request_id}/deny")
 def deny_credit(request_id: int, token: str = Depends(oauth2_scheme), db: Session = Depends(get_session), payload: Optional[ApproveDenyIn] = Body(None)):
@@ -88,10 +143,207 @@ def deny_credit(request_id: int, token: str = Depends(oauth2_scheme), db: Sessio
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
     # require admin
-    if not (user.role and user.role.lower() in ("admin", "administrator", "administrador")):
+    if not is_admin(user):
         raise HTTPException(status_code=403, detail="Require admin role")
     try:
         req = admin_service.deny_credit_request(db, request_id, user.id, payload.note if payload else None)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    return {"id": req.id, "status": req.status, "user_id": req.user_id, "amount": req.amount, "reviewed_at": req.reviewed_at.isoformat()}
+    return {"id": req.id, "status": req.status, "user_id": req.user_id, "amount": to_major(req.amount), "reviewed_at": req.reviewed_at.isoformat()}
+
+@router.post("/credits/bulk")
+def bulk_review_credits(payload: BulkReviewIn, token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)):
+    user = get_user_from_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Require admin role")
+    if bool(payload.ids) == bool(payload.filter):
+        raise HTTPException(status_code=400, detail="Provide either ids or filter")
+
+    filters = payload.filter.model_dump() if payload.filter else {}
+    try:
+        results = admin_service.bulk_review_credit_requests(
+            db, payload.action, user.id, request_ids=payload.ids, note=payload.note, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    summary = {}
+    for r in results:
+        summary[r["outcome"]] = summary.get(r["outcome"], 0) + 1
+        if "amount" in r:
+            r["amount"] = to_major(r["amount"])
+    return {"action": payload.action, "summary": summary, "results": results}
+
+@router.get("/users/{user_id}/export")
+def export_user_history(
+    user_id: int,
+    format: str = "csv",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session),
+):
+    # export de cumplimiento: historial completo de cualquier usuario, en streaming
+    user = get_user_from_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Require admin role")
+    target = db.get(User, user_id)
+    if not target:
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        return export_response(db, user_id, format, date_from, date_to, f"historial_{target.username}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/admission")
+def admission_stats(token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)):
+    # estado de los pools de admisión: activos, en cola, admitidos y rechazados (503)
+    user = get_user_from_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Require admin role")
+    return admission.controller.stats()
+
+@router.get("/analytics")
+def analytics_series(
+    period: Literal["hour", "day"] = "hour",
+    game: Optional[Literal["roulette", "slots"]] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(720, ge=1, le=5000),
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session),
+):
+    # serie por juego: apuestas, apostado, pagado, GGR, RTP y jugadores distintos
+    user = get_user_from_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Require admin role")
+    rollups.flush(db)  # lo acumulado en este proceso
+    games = [game] if game else list(rollups.GAMES)
+    series = {}
+    for g in games:
+        points = rollups.series(db, period, g, date_from, date_to, limit)
+        for p in points:
+            for key in ("wagered", "paid_out", "ggr"):
+                p[key] = to_major(p[key])
+        series[g] = points
+    return {"period": period, "series": series}
+
+@router.get("/monitor")
+def monitor_snapshot(token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)):
+    # estadísticas en vivo del proceso: retorno medio por juego, ventana, jugadores marcados
+    user = get_user_from_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Require admin role")
+    return monitor.snapshot()
+
+def _spin_out(game: str, spin) -> dict:
+    out = {
+        "id": spin.id,
+        "game": game,
+        "user_id": spin.user_id,
+        "session_id": spin.session_id,
+        "nonce": spin.nonce,
+        "timestamp": spin.timestamp.isoformat(),
+        "hmac_hex": spin.hmac_hex,
+    }
+    if game == "roulette":
+        out.update(pocket=spin.pocket, color=spin.color, bet_type=spin.bet_type,
+                   stake=to_major(spin.bet_amount), net=to_major(spin.payout))
+    else:
+        stake = spin.bet_amount * spin.lines
+        out.update(symbols=slot_service.spin_symbols(spin), multiplier=spin.multiplier, lines=spin.lines,
+                   stake=to_major(stake), net=to_major(spin.win_amount - stake))
+    return out
+
+@router.get("/spins")
+def search_spins(
+    response: Response,
+    game: Literal["roulette", "slots"],
+    user_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    bet_type: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    min_win: Optional[float] = None,
+    max_win: Optional[float] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session),
+):
+    # búsqueda de spins para soporte: solo combinaciones con índice (ver app/admin/search.py)
+    user = get_user_from_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Require admin role")
+    try:
+        rows, next_cursor, info = admin_search.search_spins(
+            db, game,
+            user_id=user_id,
+            date_from=date_from,
+            date_to=date_to,
+            bet_type=bet_type,
+            min_amount=_optional_minor(min_amount),
+            max_amount=_optional_minor(max_amount),
+            min_win=_optional_minor(min_win),
+            max_win=_optional_minor(max_win),
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # siguiente página: GET /v1/admin/spins?...&cursor=<X-Next-Cursor>
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return {"items": [_spin_out(game, r) for r in rows], **info}
+
+@router.get("/users")
+def user_directory(
+    response: Response,
+    q: Optional[str] = None,
+    by: Literal["username", "email"] = "username",
+    role: Optional[str] = None,
+    active: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session),
+):
+    # directorio de usuarios: prefijo de username/email, rol, activo; sin secretos
+    user = get_user_from_token(db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Require admin role")
+    try:
+        rows, next_cursor = admin_search.search_users(
+            db, q=q, by=by, role=role, active=active, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # siguiente página: GET /v1/admin/users?...&cursor=<X-Next-Cursor>
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [{
+        "id": r.id,
+        "username": r.username,
+        "email": r.email,
+        "name": r.name,
+        "apellidos": r.apellidos,
+        "role": r.role,
+        "is_active": r.is_Active,
+        "saldo": to_major(r.saldo),
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+    } for r in rows]
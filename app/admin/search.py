@@ -0,0 +1,173 @@
+# app/admin/search.py
+"""
+Búsquedas de admin: spins (soporte y compliance) y el directorio de usuarios.
+
+Spins
+-----
+Solo se aceptan combinaciones de filtros que recorren un índice: el filtro
+que "maneja" la consulta elige el índice y el orden (timestamp, id) desc sale
+de él, así que cada página lee a lo sumo `limit` filas más las que descartan
+los filtros residuales.
+
+- user_id            -> ix_<spin>_user_ts_id (el resto de los filtros, libres)
+- bet_type (ruleta)  -> ix_spin_bettype_ts_id
+- nada de lo anterior -> ix_<spin>_ts_id
+
+Monto y premio no tienen índice propio: sin user_id se exige un rango de fechas
+cerrado de hasta SEARCH_MAX_RANGE_DAYS, así el recorrido queda acotado.
+
+Paginación keyset sobre (timestamp, id) con el cursor de app.pagination; el
+conteo se corta en SEARCH_COUNT_CAP (una estimación "al menos N" barata).
+
+Usuarios
+--------
+Prefijo sobre username_norm o email_norm (rango [q, q + U+10FFFF), usa el
+índice), filtros por rol y activo, keyset sobre (columna, id). Se devuelve
+una proyección por columnas: nunca el hash de la contraseña ni el documento.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import Session, and_, func, or_, select
+
+from app import config
+from app.games import compact
+from app.model import SlotSpin, Spin, User, normalize_identity
+from app.pagination import decode_cursor, decode_text_cursor, encode_cursor, encode_text_cursor
+from app.timeutil import naive_utc
+
+GAMES = {"roulette": Spin, "slots": SlotSpin}
+
+
+def _stake(model):
+    return model.bet_amount * model.lines if model is SlotSpin else model.bet_amount
+
+
+def _net(model):
+    """Resultado neto del jugador en centavos (negativo si perdió)"""
+    return model.win_amount - model.bet_amount * model.lines if model is SlotSpin else model.payout
+
+
+def plan(game: str, user_id: Optional[int] = None, bet_type: Optional[str] = None,
+         date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
+         residual: bool = False) -> str:
+    """Índice que usaría la búsqueda; ValueError si la combinación no tiene uno"""
+    if game not in GAMES:
+        raise ValueError("Unknown game")
+    table = GAMES[game].__tablename__
+    if bet_type is not None and game != "roulette":
+        raise ValueError("bet_type only applies to roulette")
+    if user_id is not None:
+        return f"ix_{table}_user_ts_id"
+    if residual:
+        if date_from is None or date_to is None:
+            raise ValueError("Amount and win filters need user_id or a date_from/date_to range")
+        if date_to - date_from > timedelta(days=config.SEARCH_MAX_RANGE_DAYS):
+            raise ValueError(f"Date range too wide (max {config.SEARCH_MAX_RANGE_DAYS} days without user_id)")
+    if bet_type is not None:
+        return "ix_spin_bettype_ts_id"
+    return f"ix_{table}_ts_id"
+
+
+def search_spins(
+    db: Session,
+    game: str,
+    user_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    bet_type: Optional[str] = None,
+    min_amount: Optional[int] = None,
+    max_amount: Optional[int] = None,
+    min_win: Optional[int] = None,
+    max_win: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> Tuple[List[Any], Optional[str], Dict[str, Any]]:
+    """
+    Spins más recientes primero. Montos en centavos; min_win/max_win sobre el
+    neto del jugador. Devuelve (filas, next_cursor, info) con info =
+    {"index", "count", "count_exact"}.
+    """
+    lo = naive_utc(date_from) if date_from is not None else None
+    hi = naive_utc(date_to) if date_to is not None else None
+    residual = any(v is not None for v in (min_amount, max_amount, min_win, max_win))
+    index = plan(game, user_id, bet_type, lo, hi, residual)
+
+    model = GAMES[game]
+    stmt = select(model)
+    if user_id is not None:
+        stmt = stmt.where(model.user_id == user_id)
+    if bet_type is not None:
+        stmt = stmt.where(model.bet_type == bet_type)
+    if lo is not None:
+        stmt = stmt.where(model.timestamp >= lo)
+    if hi is not None:
+        stmt = stmt.where(model.timestamp < hi)
+    if min_amount is not None:
+        stmt = stmt.where(_stake(model) >= min_amount)
+    if max_amount is not None:
+        stmt = stmt.where(_stake(model) <= max_amount)
+    if min_win is not None:
+        stmt = stmt.where(_net(model) >= min_win)
+    if max_win is not None:
+        stmt = stmt.where(_net(model) <= max_win)
+
+    cap = config.SEARCH_COUNT_CAP
+    counted = db.exec(
+        select(func.count()).select_from(stmt.with_only_columns(model.id).limit(cap + 1).subquery())
+    ).one()
+
+    if cursor:
+        c_ts, c_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            model.timestamp < c_ts,
+            and_(model.timestamp == c_ts, model.id < c_id),
+        ))
+    rows = db.exec(stmt.order_by(model.timestamp.desc(), model.id.desc()).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+    rows = [compact.hydrate(db, game, r) for r in rows]
+    return rows, next_cursor, {"index": index, "count": min(counted, cap), "count_exact": counted <= cap}
+
+
+# columnas que devuelve el directorio (sin secretos)
+USER_DIRECTORY_COLUMNS = (
+    User.id, User.username, User.email, User.name, User.apellidos,
+    User.role, User.is_Active, User.saldo, User.created_at,
+)
+USER_SEARCH_FIELDS = {"username": User.username_norm, "email": User.email_norm}
+
+
+def search_users(
+    db: Session,
+    q: Optional[str] = None,
+    by: str = "username",
+    role: Optional[str] = None,
+    active: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> Tuple[List[Any], Optional[str]]:
+    """Página del directorio ordenada por `by` (username o email). Devuelve (filas, next_cursor)"""
+    key = USER_SEARCH_FIELDS.get(by)
+    if key is None:
+        raise ValueError("by must be 'username' or 'email'")
+    stmt = select(key.label("sort_key"), *USER_DIRECTORY_COLUMNS)
+    prefix = normalize_identity(q) if q else None
+    if prefix:
+        stmt = stmt.where(key >= prefix, key < prefix + "\U0010ffff")
+    if role is not None:
+        stmt = stmt.where(User.role == role)
+    if active is not None:
+        stmt = stmt.where(User.is_Active == active)
+    if cursor:
+        c_key, c_id = decode_text_cursor(cursor)
+        stmt = stmt.where(or_(key > c_key, and_(key == c_key, User.id > c_id)))
+
+    rows = db.exec(stmt.order_by(key, User.id).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_text_cursor(rows[-1].sort_key, rows[-1].id)
+    return rows, next_cursor
@@ -1,18 +1,43 @@
 # app/admin/service.py
 from datetime import datetime, timezone
-from typing import List, Optional
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlmodel import Session, select
+from sqlalchemy import bindparam, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select, or_, and_, func
 
 from app.model import CreditRequest, User
+from app.pagination import encode_cursor, decode_cursor
+from app.realtime.hub import balance_changed, balances_changed
+from app.users.activity import record_activity
 from sqlmodel import select
 
-def create_credit_request(db: Session, user_id: int, amount: float, note: Optional[str]=None) -> CreditRequest:
+class PendingCreditRequestExists(ValueError):
+    pass
+
+def _is_pending_conflict(e: IntegrityError) -> bool:
+    # SQLite nombra las columnas, PostgreSQL el índice
+    msg = str(e.orig)
+    return "uq_creditrequest_user_pending" in msg or "UNIQUE constraint failed: creditrequest.user_id" in msg
+
+def create_credit_request(db: Session, user_id: int, amount: int, note: Optional[str]=None) -> CreditRequest:
+    # amount en centavos (app.money)
     if amount <= 0:
         raise ValueError("Amount must be positive")
-    req = CreditRequest(user_id=user_id, amount=float(amount), status="pending", note=note)
+    req = CreditRequest(user_id=user_id, amount=int(amount), status="pending", note=note)
     db.add(req)
-    db.commit()
+    try:
+        db.flush()
+        record_activity(db, user_id, "credit_request", amount=req.amount, ref_id=req.id,
+                        created_at=req.created_at)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if not _is_pending_conflict(e):
+            raise
+        # uq_creditrequest_user_pending: ya hay una 'pending' para este usuario
+        raise PendingCreditRequestExists("Ya existe una solicitud pendiente. Espera a que se procese.")
     db.refresh(req)
     return req
 
@@ -22,6 +47,53 @@ def list_credit_requests(db: Session, status: Optional[str]=None) -> List[Credit
         stmt = stmt.where(CreditRequest.status == status)
     return db.exec(stmt).all()
 
+def page_credit_requests(
+    db: Session,
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_amount: Optional[int] = None,
+    max_amount: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+) -> Tuple[List[Tuple[CreditRequest, Optional[str]]], Optional[str]]:
+    """
+    Página de solicitudes (más recientes primero) con el username del solicitante
+    en un solo JOIN. Keyset sobre (created_at, id): devuelve (filas, next_cursor).
+    """
+    stmt = (
+        select(CreditRequest, User.username)
+        .join(User, User.id == CreditRequest.user_id, isouter=True)
+        .order_by(CreditRequest.created_at.desc(), CreditRequest.id.desc())
+    )
+    if status:
+        stmt = stmt.where(CreditRequest.status == status)
+    if user_id is not None:
+        stmt = stmt.where(CreditRequest.user_id == user_id)
+    if created_from is not None:
+        stmt = stmt.where(CreditRequest.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(CreditRequest.created_at < created_to)
+    if min_amount is not None:
+        stmt = stmt.where(CreditRequest.amount >= min_amount)
+    if max_amount is not None:
+        stmt = stmt.where(CreditRequest.amount <= max_amount)
+    if cursor:
+        c_created, c_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            CreditRequest.created_at < c_created,
+            and_(CreditRequest.created_at == c_created, CreditRequest.id < c_id),
+        ))
+
+    rows = db.exec(stmt.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
 def get_credit_request(db: Session, request_id: int) -> Optional[CreditRequest]:
     stmt = select(CreditRequest).where(CreditRequest.id == request_id)
     return db.exec(stmt).one_or_none()
@@ -39,7 +111,7 @@ def approve_credit_request(db: Session, request_id: int, reviewer_user_id: int)
     if not user:
         raise ValueError("User not found")
 
-    user.saldo = (user.saldo or 0.0) + float(req.amount)
+    user.saldo = (user.saldo or 0) + req.amount
     # store reviewer & timestamps
     req.status = "approved"
     req.reviewed_at = datetime.now(timezone.utc)
@@ -47,9 +119,12 @@ def approve_credit_request(db: Session, request_id: int, reviewer_user_id: int)
 
     db.add(user)
     db.add(req)
+    record_activity(db, user.id, "credit_approved", amount=req.amount, payout=req.amount,
+                    ref_id=req.id, created_at=req.reviewed_at)
     db.commit()
     db.refresh(user)
     db.refresh(req)
+    balance_changed(user, "credit_approved", amount=req.amount)
     return req
 
 def deny_credit_request(db: Session, request_id: int, reviewer_user_id: int, note: Optional[str]=None) -> CreditRequest:
@@ -66,6 +141,137 @@ def deny_credit_request(db: Session, request_id: int, reviewer_user_id: int, not
         req.note = (req.note or "") + f" | Deny note: {note}"
 
     db.add(req)
+    record_activity(db, req.user_id, "credit_denied", amount=req.amount, ref_id=req.id,
+                    created_at=req.reviewed_at)
     db.commit()
     db.refresh(req)
     return req
+
+BULK_MAX_REQUESTS = 1000
+
+def _pending_ids_matching(
+    db: Session,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_amount: Optional[int] = None,
+    max_amount: Optional[int] = None,
+    limit: int = BULK_MAX_REQUESTS,
+) -> List[int]:
+    stmt = (
+        select(CreditRequest.id)
+        .where(CreditRequest.status == "pending")
+        .order_by(CreditRequest.created_at, CreditRequest.id)
+        .limit(limit)
+    )
+    if user_id is not None:
+        stmt = stmt.where(CreditRequest.user_id == user_id)
+    if created_from is not None:
+        stmt = stmt.where(CreditRequest.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(CreditRequest.created_at < created_to)
+    if min_amount is not None:
+        stmt = stmt.where(CreditRequest.amount >= min_amount)
+    if max_amount is not None:
+        stmt = stmt.where(CreditRequest.amount <= max_amount)
+    return list(db.exec(stmt).all())
+
+def bulk_review_credit_requests(
+    db: Session,
+    action: str,
+    reviewer_user_id: int,
+    request_ids: Optional[List[int]] = None,
+    note: Optional[str] = None,
+    **filters: Any,
+) -> List[Dict[str, Any]]:
+    """
+    Aprueba o niega muchas solicitudes en una sola transacción.
+    - Por ids explícitos o, si no hay ids, por filtros sobre las 'pending'.
+    - La transición es condicional (WHERE status='pending'), así que una
+      solicitud ya procesada (o procesada en paralelo) nunca se acredita dos veces.
+    - Los saldos se acreditan con un UPDATE incremental por usuario (executemany).
+    Devuelve el resultado por id: approved / denied / already_processed / not_found.
+    """
+    if action not in ("approve", "deny"):
+        raise ValueError("Unsupported action")
+    new_status = "approved" if action == "approve" else "denied"
+
+    if request_ids:
+        ids = list(dict.fromkeys(request_ids))
+        if len(ids) > BULK_MAX_REQUESTS:
+            raise ValueError(f"At most {BULK_MAX_REQUESTS} requests per call")
+    else:
+        ids = _pending_ids_matching(db, **filters)
+    if not ids:
+        return []
+
+    values: Dict[str, Any] = {
+        "status": new_status,
+        "reviewed_at": datetime.now(timezone.utc),
+        "reviewer_id": reviewer_user_id,
+    }
+    if action == "deny" and note:
+        values["note"] = func.coalesce(CreditRequest.note, "") + f" | Deny note: {note}"
+
+    if db.get_bind().dialect.update_returning:
+        changed = db.exec(
+            update(CreditRequest)
+            .where(CreditRequest.id.in_(ids), CreditRequest.status == "pending")
+            .values(**values)
+            .execution_options(synchronize_session=False)
+            .returning(CreditRequest.id, CreditRequest.user_id, CreditRequest.amount)
+        ).all()
+    else:
+        # motores sin RETURNING: leer candidatas y pasar cada una con su propio UPDATE
+        # condicional; solo se acredita la que esta transacción realmente cambió
+        # (otro admin pudo procesarla entre el SELECT y el UPDATE)
+        candidates = db.exec(
+            select(CreditRequest.id, CreditRequest.user_id, CreditRequest.amount)
+            .where(CreditRequest.id.in_(ids), CreditRequest.status == "pending")
+        ).all()
+        changed = []
+        for row in candidates:
+            result = db.exec(
+                update(CreditRequest)
+                .where(CreditRequest.id == row[0], CreditRequest.status == "pending")
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                changed.append(row)
+
+    for request_id, user_id, amount in changed:
+        record_activity(db, user_id, f"credit_{new_status}", amount=amount,
+                        payout=amount if action == "approve" else 0,
+                        ref_id=request_id, created_at=values["reviewed_at"])
+    if action == "approve" and changed:
+        per_user: Dict[int, int] = defaultdict(int)
+        for _, user_id, amount in changed:
+            per_user[user_id] += amount
+        user_table = User.__table__
+        db.exec(
+            user_table.update()
+            .where(user_table.c.id == bindparam("b_user_id"))
+            .values(saldo=user_table.c.saldo + bindparam("b_amount")),
+            params=[{"b_user_id": uid, "b_amount": total} for uid, total in per_user.items()],
+        )
+    db.commit()
+    if action == "approve" and changed:
+        balances_changed(db, [row[1] for row in changed], "credit_approved")
+
+    changed_by_id = {row[0]: row for row in changed}
+    missing = [i for i in ids if i not in changed_by_id]
+    existing = set()
+    if missing:
+        existing = set(db.exec(select(CreditRequest.id).where(CreditRequest.id.in_(missing))).all())
+
+    results = []
+    for request_id in ids:
+        row = changed_by_id.get(request_id)
+        if row:
+            results.append({"id": request_id, "outcome": new_status, "user_id": row[1], "amount": row[2]})
+        elif request_id in existing:
+            results.append({"id": request_id, "outcome": "already_processed"})
+        else:
+            results.append({"id": request_id, "outcome": "not_found"})
+    return results
@@ -0,0 +1,177 @@
+# app/analytics/monitor.py
+"""
+Monitor de RTP en vivo: detecta un paytable roto o un jugador con demasiada
+suerte sin consultar el historial.
+
+Cada apuesta liquidada (ruleta y slots) llama a observe() con su retorno
+r = pagado / apostado. Todo es O(1) en tiempo y memoria por actualización:
+- por juego, media y varianza de r acumuladas con Welford (la línea base);
+- por juego, una ventana de las últimas MONITOR_WINDOW apuestas con sumas
+  corridas: al llenarse, si su media se aleja de la línea base más de
+  MONITOR_Z_THRESHOLD errores estándar, alerta "rtp_drift";
+- por (usuario, juego), otro Welford: con MONITOR_MIN_BETS apuestas, si su media
+  supera la del juego por más del umbral, alerta "lucky_player". Se recuerdan
+  como mucho MONITOR_MAX_USERS (LRU).
+
+Las alertas van al log "casino.monitor" como una línea JSON y se disparan una
+vez al cruzar el umbral (vuelven a armarse cuando la métrica regresa). El estado
+es del proceso, como los leaderboards: con varios workers cada uno ve su tráfico.
+"""
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app import config
+
+logger = logging.getLogger("casino.monitor")
+
+RECENT_ALERTS = 50
+
+
+class Welford:
+    """Media y varianza en una pasada, numéricamente estable"""
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class RollingWindow:
+    """Últimas `size` observaciones con sumas corridas (apostado, pagado, retornos)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.items: Deque[Tuple[int, int, float]] = deque()
+        self.wagered = 0
+        self.paid_out = 0
+        self.returns = 0.0
+
+    def add(self, wagered: int, paid_out: int, r: float) -> None:
+        self.items.append((wagered, paid_out, r))
+        self.wagered += wagered
+        self.paid_out += paid_out
+        self.returns += r
+        if len(self.items) > self.size:
+            w, p, old = self.items.popleft()
+            self.wagered -= w
+            self.paid_out -= p
+            self.returns -= old
+
+    @property
+    def full(self) -> bool:
+        return len(self.items) >= self.size
+
+    @property
+    def mean(self) -> float:
+        return self.returns / len(self.items) if self.items else 0.0
+
+    @property
+    def rtp(self) -> Optional[float]:
+        return self.paid_out / self.wagered if self.wagered else None
+
+
+def z_score(sample_mean: float, n: int, baseline: Welford) -> Optional[float]:
+    """Cuántos errores estándar se aleja la media de n observaciones de la línea base"""
+    if n == 0 or baseline.n < 2 or baseline.std == 0:
+        return None
+    return (sample_mean - baseline.mean) / (baseline.std / math.sqrt(n))
+
+
+class Monitor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._games: Dict[str, Welford] = {}
+        self._windows: Dict[str, RollingWindow] = {}
+        self._users: "OrderedDict[Tuple[int, str], Welford]" = OrderedDict()
+        self._alerting: set = set()  # claves con alerta activa
+        self._alerts: Deque[Dict[str, Any]] = deque(maxlen=RECENT_ALERTS)
+
+    def observe(self, game: str, user_id: int, wagered: int, paid_out: int) -> None:
+        """Llamar después del commit de cada apuesta (montos en centavos)"""
+        if wagered <= 0:
+            return
+        r = paid_out / wagered
+        with self._lock:
+            baseline = self._games.setdefault(game, Welford())
+            window = self._windows.get(game)
+            if window is None or window.size != config.MONITOR_WINDOW:
+                window = self._windows[game] = RollingWindow(config.MONITOR_WINDOW)
+            # se compara contra la línea base de ANTES de esta apuesta
+            window.add(wagered, paid_out, r)
+            if window.full and baseline.n >= window.size:
+                self._check(("rtp_drift", game), z_score(window.mean, len(window.items), baseline),
+                            game=game, window=len(window.items), window_rtp=window.rtp,
+                            baseline_mean=baseline.mean)
+            baseline.add(r)
+
+            key = (user_id, game)
+            stats = self._users.pop(key, None) or Welford()
+            stats.add(r)
+            self._users[key] = stats
+            while len(self._users) > config.MONITOR_MAX_USERS:
+                evicted, _ = self._users.popitem(last=False)
+                self._alerting.discard(("lucky_player", evicted))
+            if stats.n >= config.MONITOR_MIN_BETS:
+                z = z_score(stats.mean, stats.n, baseline)
+                # solo interesa la suerte: un jugador que pierde de más no es alerta
+                self._check(("lucky_player", key), z if z is not None and z > 0 else None,
+                            game=game, user_id=user_id, bets=stats.n, mean_return=stats.mean,
+                            baseline_mean=baseline.mean)
+
+    def _check(self, key: tuple, z: Optional[float], **fields) -> None:
+        if z is None or abs(z) < config.MONITOR_Z_THRESHOLD:
+            self._alerting.discard(key)
+            return
+        if key in self._alerting:
+            return
+        self._alerting.add(key)
+        alert = {"event": key[0], "z": round(z, 2), **fields,
+                 "at": datetime.now(timezone.utc).isoformat()}
+        self._alerts.append(alert)
+        logger.warning(json.dumps(alert))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            games = {}
+            for game, baseline in self._games.items():
+                window = self._windows[game]
+                games[game] = {
+                    "bets": baseline.n,
+                    "mean_return": baseline.mean,
+                    "std_return": baseline.std,
+                    "window": {"size": window.size, "bets": len(window.items), "rtp": window.rtp,
+                               "z": z_score(window.mean, len(window.items), baseline)},
+                }
+            flagged = [
+                {"user_id": target[0], "game": target[1], "bets": self._users[target].n,
+                 "mean_return": self._users[target].mean}
+                for event, target in self._alerting if event == "lucky_player"
+            ]
+            return {"games": games, "users_tracked": len(self._users),
+                    "flagged_users": flagged, "recent_alerts": list(self._alerts)}
+
+
+monitor = Monitor()
@@ -0,0 +1,188 @@
+# app/analytics/replay.py
+"""
+What-if de paytables: re-liquida los spins con apuesta de la DB bajo un
+SYMBOL_PAYOUTS (slots) o PAYOUTS (ruleta) candidato y compara con lo que pasó.
+
+El resultado de un spin no depende del paytable: solo el pago. Así que no hace
+falta recorrer fila por fila: la DB agrupa por (usuario, resultado, apuesta)
+con GROUP BY y solo los grupos llegan a Python, en lotes de REPLAY_BATCH (un
+cursor con yield_per). Cada grupo se re-liquida una vez y se multiplica por su
+cantidad; como el monto es parte de la clave, el redondeo al centavo de
+app.money.scale() da exactamente lo mismo que liquidar cada spin.
+
+Reporta por juego: apuestas, apostado, GGR y RTP actual vs candidato, cuántos
+jugadores quedan mejor, peor, y en ganancia, y las apuestas que no se pudieron
+interpretar ("unpriced", fuera de los totales). Los spins ya
+archivados (app.games.archive) no se re-liquidan.
+
+Uso:  python -m app.analytics.replay --slots '{"7️⃣": 40}' --roulette '{"straight": 34}'
+(los pagos que no se pasan quedan como están)
+"""
+import argparse
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.games.roulette import service as roulette_service
+from app.games.slots import service as slot_service
+from app.games import compact
+from app.model import SlotSpin, Spin
+from app.money import scale
+
+REPLAY_BATCH = 10000
+
+
+def _grouped(db: Session, stmt) -> Iterator[Any]:
+    yield from db.exec(stmt.execution_options(yield_per=REPLAY_BATCH))
+
+
+def _in_range(stmt, model, date_from: Optional[datetime], date_to: Optional[datetime]):
+    if date_from is not None:
+        stmt = stmt.where(model.timestamp >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(model.timestamp < date_to)
+    return stmt
+
+
+def _slots_groups(db: Session, date_from, date_to) -> Iterator[Dict[str, Any]]:
+    stake = (SlotSpin.bet_amount * SlotSpin.lines).label("stake")
+    stmt = (
+        select(SlotSpin.user_id, SlotSpin.symbols, SlotSpin.symbol_code, stake,
+               func.count().label("n"), func.sum(SlotSpin.win_amount).label("won"))
+        .where(SlotSpin.user_id.is_not(None))
+        .group_by(SlotSpin.user_id, SlotSpin.symbols, SlotSpin.symbol_code, stake)
+    )
+    for row in _grouped(db, _in_range(stmt, SlotSpin, date_from, date_to)):
+        symbols = (json.loads(row.symbols) if row.symbols
+                   else compact.unpack_symbols(row.symbol_code, slot_service.SLOT_SYMBOLS))
+        yield {"user_id": row.user_id, "n": row.n, "stake": row.stake,
+               "net": row.won - row.n * row.stake, "outcome": symbols}
+
+
+def _roulette_winners(bet_type: str, bet_payload: Optional[str]):
+    """
+    Pockets ganadores de una apuesta guardada. Se normaliza con compile_bet: las
+    filas viejas guardaban el request tal cual ("side": "Red", "number": "17").
+    None si ni así se puede interpretar.
+    """
+    try:
+        payload = json.loads(bet_payload or "{}")
+        return roulette_service.compile_bet({**payload, "type": bet_type, "amount": 0}).winners
+    except (ValueError, TypeError):
+        return None
+
+
+def _roulette_groups(db: Session, date_from, date_to) -> Iterator[Dict[str, Any]]:
+    stmt = (
+        select(Spin.user_id, Spin.bet_type, Spin.bet_payload, Spin.pocket, Spin.bet_amount,
+               func.count().label("n"), func.sum(Spin.payout).label("net"))
+        .where(Spin.user_id.is_not(None), Spin.bet_type.is_not(None))
+        .group_by(Spin.user_id, Spin.bet_type, Spin.bet_payload, Spin.pocket, Spin.bet_amount)
+    )
+    winners_of: Dict[tuple, Any] = {}  # el mismo payload aparece en muchos grupos
+    for row in _grouped(db, _in_range(stmt, Spin, date_from, date_to)):
+        key = (row.bet_type, row.bet_payload)
+        if key not in winners_of:
+            winners_of[key] = _roulette_winners(*key)
+        winners = winners_of[key]
+        # outcome None: no se puede re-liquidar, se informa aparte
+        outcome = (row.bet_type, row.pocket in winners) if winners is not None else None
+        yield {"user_id": row.user_id, "n": row.n, "stake": row.bet_amount, "net": row.net,
+               "outcome": outcome}
+
+
+def _slots_net(group: Dict[str, Any], payouts: Dict[str, float]) -> int:
+    multiplier = slot_service.calculate_multiplier(group["outcome"], payouts)
+    win = scale(group["stake"], multiplier) if multiplier > 0 else 0
+    return group["n"] * (win - group["stake"])
+
+
+def _roulette_net(group: Dict[str, Any], payouts: Dict[str, float]) -> int:
+    bet_type, won = group["outcome"]
+    per_bet = scale(group["stake"], payouts[bet_type]) if won else -group["stake"]
+    return group["n"] * per_bet
+
+
+GAMES = {
+    "slots": (_slots_groups, _slots_net, lambda: slot_service.SYMBOL_PAYOUTS),
+    "roulette": (_roulette_groups, _roulette_net, lambda: roulette_service.PAYOUTS),
+}
+
+
+def _summary(wagered: int, player_net: int) -> Dict[str, Any]:
+    ggr = -player_net
+    return {"ggr": ggr, "rtp": round((wagered - ggr) / wagered, 4) if wagered else None}
+
+
+def replay(db: Session, game: str, candidate: Dict[str, float],
+           date_from: Optional[datetime] = None, date_to: Optional[datetime] = None) -> Dict[str, Any]:
+    """Re-liquida los spins del juego con el paytable actual actualizado con `candidate`"""
+    if game not in GAMES:
+        raise ValueError("Unknown game")
+    groups_of, net_of, current = GAMES[game]
+    payouts = dict(current())
+    unknown = set(candidate) - set(payouts)
+    if unknown:
+        raise ValueError(f"Unknown paytable entries: {', '.join(sorted(unknown))}")
+    payouts.update(candidate)
+
+    bets = wagered = 0
+    unpriced = {"bets": 0, "wagered": 0}
+    # por jugador: [neto actual, neto candidato]
+    players: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for group in groups_of(db, date_from, date_to):
+        if group["outcome"] is None:
+            unpriced["bets"] += group["n"]
+            unpriced["wagered"] += group["n"] * group["stake"]
+            continue
+        bets += group["n"]
+        wagered += group["n"] * group["stake"]
+        p = players[group["user_id"]]
+        p[0] += group["net"]
+        p[1] += net_of(group, payouts)
+
+    current_net = sum(p[0] for p in players.values())
+    candidate_net = sum(p[1] for p in players.values())
+    now, then = _summary(wagered, current_net), _summary(wagered, candidate_net)
+    return {
+        "game": game,
+        "paytable": payouts,
+        "bets": bets,
+        "wagered": wagered,
+        "current": now,
+        "candidate": then,
+        "ggr_delta": then["ggr"] - now["ggr"],
+        # apuestas que no se pudieron interpretar (fuera de los totales de arriba)
+        "unpriced": unpriced,
+        "players": {
+            "total": len(players),
+            "better_off": sum(1 for p in players.values() if p[1] > p[0]),
+            "worse_off": sum(1 for p in players.values() if p[1] < p[0]),
+            "in_profit_current": sum(1 for p in players.values() if p[0] > 0),
+            "in_profit_candidate": sum(1 for p in players.values() if p[1] > 0),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="What-if de paytables sobre los spins de la DB")
+    parser.add_argument("--slots", type=json.loads, help='pagos candidatos, p.ej. \'{"🍒": 2.5}\'')
+    parser.add_argument("--roulette", type=json.loads, help='pagos candidatos, p.ej. \'{"straight": 34}\'')
+    parser.add_argument("--from", dest="date_from", type=datetime.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=datetime.fromisoformat)
+    args = parser.parse_args()
+    if not (args.slots or args.roulette):
+        parser.error("pasar --slots y/o --roulette")
+
+    from app.database import engine
+
+    with Session(engine) as s:
+        for name in ("slots", "roulette"):
+            candidate = getattr(args, name)
+            if candidate:
+                print(json.dumps(replay(s, name, candidate, args.date_from, args.date_to),
+                                 ensure_ascii=False, indent=2))
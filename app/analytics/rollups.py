@@ -0,0 +1,322 @@
+# app/analytics/rollups.py
+"""
+Totales por juego y hora/día para el panel de admin: apuestas, apostado
+(turnover), pagado, GGR (apostado - pagado), RTP (pagado / apostado) y
+jugadores distintos.
+
+Se mantienen incrementalmente pero fuera de la transacción de la apuesta: cada
+apuesta liquidada llama a record_bet() después del commit y solo suma en memoria;
+flush() (cada ROLLUP_FLUSH_SECONDS, al apagar y antes de leer el panel) escribe un
+upsert por bucket con todo lo acumulado. Así las apuestas concurrentes no se
+pelean por las mismas filas (hora, juego) y (día, juego). Lo que no llegó a
+escribirse si el proceso muere se recupera con rebuild().
+
+Los jugadores distintos se cuentan con GameRollupPlayer: el primer INSERT de
+(bucket, usuario) suma 1. Esas filas solo hacen falta mientras el bucket está
+abierto: flush() borra las de buckets que cerraron hace más de un período.
+
+"Pagado" es el premio bruto devuelto al jugador: en la ruleta la apuesta más la
+ganancia neta si ganó (0 si perdió); en slots win_amount. Todo en centavos.
+
+rebuild() recalcula todo desde los spins calientes y los archivados (por si
+cambió la fórmula o se sospecha deriva), de a un mes por vez. Uso manual:
+    python -m app.analytics.rollups --rebuild
+Con la app corriendo, lo que otros procesos tengan sin escribir se suma encima:
+conviene correrlo con el tráfico parado o volver a correrlo después.
+"""
+import argparse
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from app.model import GameRollup, GameRollupPlayer, SlotSpin, Spin
+from app.timeutil import aware_utc, naive_utc
+
+PERIODS = ("hour", "day")
+GAMES = {"roulette": Spin, "slots": SlotSpin}
+
+REBUILD_BATCH = 1000
+
+
+def bucket_start(at: datetime, period: str) -> datetime:
+    """Inicio de la hora/día de `at`"""
+    at = naive_utc(at)
+    if period == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    if period == "day":
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError("Invalid period")
+
+
+def _insert(db: Session):
+    # upsert: ON CONFLICT existe en SQLite y PostgreSQL con la misma API
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def roulette_paid_out(amount: int, payout: int) -> int:
+    """Premio bruto de una apuesta de ruleta (payout es neto: -amount si perdió)"""
+    return amount + payout if payout > 0 else 0
+
+
+# acumulado del proceso sin escribir: (período, juego, bucket) -> [apuestas, apostado, pagado]
+_lock = threading.Lock()
+_pending: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0, 0])
+_pending_players: Dict[tuple, Set[int]] = defaultdict(set)
+
+
+def record_bet(game: str, user_id: int, wagered: int, paid_out: int,
+               at: Optional[datetime] = None) -> None:
+    """Suma una apuesta liquidada a los buckets de hora y día (en memoria, llamar después del commit)"""
+    at = at or datetime.now(timezone.utc)
+    with _lock:
+        for period in PERIODS:
+            key = (period, game, bucket_start(at, period))
+            t = _pending[key]
+            t[0] += 1
+            t[1] += wagered
+            t[2] += paid_out
+            _pending_players[key].add(user_id)
+
+
+def reset() -> None:
+    with _lock:
+        _pending.clear()
+        _pending_players.clear()
+
+
+def _write(db: Session, totals: Dict[tuple, List[int]], players: Dict[tuple, Set[int]]) -> None:
+    insert = _insert(db)
+    for key in sorted(totals):
+        period, game, bucket = key
+        new_players = 0
+        if players.get(key):
+            new_players = db.exec(
+                insert(GameRollupPlayer)
+                .values([{"period": period, "game": game, "bucket": bucket, "user_id": u}
+                         for u in sorted(players[key])])
+                .on_conflict_do_nothing()
+            ).rowcount
+        bets, wagered, paid_out = totals[key]
+        stmt = insert(GameRollup).values(
+            period=period, game=game, bucket=bucket,
+            bets=bets, wagered=wagered, paid_out=paid_out, players=new_players)
+        db.exec(stmt.on_conflict_do_update(
+            index_elements=["period", "game", "bucket"],
+            set_={
+                "bets": GameRollup.bets + stmt.excluded.bets,
+                "wagered": GameRollup.wagered + stmt.excluded.wagered,
+                "paid_out": GameRollup.paid_out + stmt.excluded.paid_out,
+                "players": GameRollup.players + stmt.excluded.players,
+            },
+        ))
+
+
+def _open_since(period: str, now: datetime) -> datetime:
+    """Buckets anteriores a esto ya cerraron hace más de un período"""
+    step = timedelta(hours=1) if period == "hour" else timedelta(days=1)
+    return bucket_start(now, period) - step
+
+
+def prune_players(db: Session, now: Optional[datetime] = None) -> int:
+    """Borra los jugadores de buckets cerrados (sin commit). Devuelve cuántas filas"""
+    now = now or datetime.now(timezone.utc)
+    return db.exec(delete(GameRollupPlayer).where(or_(*(
+        (GameRollupPlayer.period == period) & (GameRollupPlayer.bucket < _open_since(period, now))
+        for period in PERIODS
+    )))).rowcount
+
+
+def flush(db: Session) -> int:
+    """Escribe lo acumulado (una transacción por lote) y poda jugadores viejos. Devuelve buckets escritos"""
+    global _pending, _pending_players
+    with _lock:
+        totals, players = _pending, _pending_players
+        _pending, _pending_players = defaultdict(lambda: [0, 0, 0]), defaultdict(set)
+    if not totals:
+        return 0
+    try:
+        _write(db, totals, players)
+        prune_players(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # no se pierde: vuelve al acumulado para el próximo flush
+        with _lock:
+            for key, t in totals.items():
+                p = _pending[key]
+                for i in range(3):
+                    p[i] += t[i]
+                _pending_players[key] |= players.get(key, set())
+        raise
+    return len(totals)
+
+
+def run_flush_job() -> None:
+    from app.database import engine
+
+    with Session(engine) as db:
+        flush(db)
+
+
+def series(db: Session, period: str, game: str, date_from: Optional[datetime] = None,
+           date_to: Optional[datetime] = None, limit: int = 720) -> List[Dict[str, Any]]:
+    """Buckets del juego en [date_from, date_to), los `limit` más recientes, en orden cronológico"""
+    if period not in PERIODS:
+        raise ValueError("Invalid period")
+    stmt = select(GameRollup).where(GameRollup.period == period, GameRollup.game == game)
+    if date_from is not None:
+        stmt = stmt.where(GameRollup.bucket >= bucket_start(date_from, period))
+    if date_to is not None:
+        stmt = stmt.where(GameRollup.bucket < naive_utc(date_to))
+    rows = db.exec(stmt.order_by(GameRollup.bucket.desc()).limit(limit)).all()
+    return [
+        {
+            "bucket": aware_utc(r.bucket).isoformat(),
+            "bets": r.bets,
+            "wagered": r.wagered,
+            "paid_out": r.paid_out,
+            "ggr": r.wagered - r.paid_out,
+            "rtp": round(r.paid_out / r.wagered, 4) if r.wagered else None,
+            "players": r.players,
+        }
+        for r in reversed(rows)
+    ]
+
+
+# ---- reconstrucción ----
+def _amounts(game: str, row: Any) -> Tuple[int, int]:
+    """(apostado, pagado) de un spin con apuesta, fila del modelo o dict archivado"""
+    get = row.get if isinstance(row, dict) else lambda k: getattr(row, k)
+    if game == "roulette":
+        return get("bet_amount"), roulette_paid_out(get("bet_amount"), get("payout"))
+    return get("bet_amount") * get("lines"), get("win_amount")
+
+
+# columnas que hacen falta de cada spin (no se cargan los modelos enteros)
+_COLUMNS = {
+    "roulette": ("id", "user_id", "timestamp", "bet_amount", "payout"),
+    "slots": ("id", "user_id", "timestamp", "bet_amount", "lines", "win_amount"),
+}
+
+
+def _month_start(at: datetime) -> datetime:
+    return bucket_start(at, "day").replace(day=1)
+
+
+def _next_month(month: datetime) -> datetime:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _hot_rows(db: Session, game: str, lo: datetime, hi: datetime) -> Iterator[Any]:
+    """Spins con apuesta en [lo, hi), por columnas y de a REBUILD_BATCH (índice por timestamp)"""
+    model = GAMES[game]
+    columns = [getattr(model, c) for c in _COLUMNS[game]]
+    stmt = (
+        select(*columns)
+        .where(model.user_id.is_not(None), model.timestamp >= lo, model.timestamp < hi)
+        .execution_options(yield_per=REBUILD_BATCH)
+    )
+    yield from db.exec(stmt)
+
+
+def _months(db: Session, game: str) -> List[datetime]:
+    """Todos los meses entre el primer y el último spin (calientes o archivados)"""
+    from app.games.archive import archived_months
+
+    model = GAMES[game]
+    first, last = db.exec(
+        select(func.min(model.timestamp), func.max(model.timestamp)).where(model.user_id.is_not(None))
+    ).one()
+    edges = [datetime.strptime(m, "%Y-%m") for m in archived_months(game)]
+    edges += [_month_start(ts) for ts in (first, last) if ts is not None]
+    if not edges:
+        return []
+    months, month = [], min(edges)
+    while month <= max(edges):
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def _rebuild_month(db: Session, game: str, month: datetime, now: datetime) -> int:
+    from app.games.archive import iter_archived_month
+
+    end = _next_month(month)
+    totals: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0, 0])
+    players: Dict[tuple, Set[int]] = defaultdict(set)
+    seen = set()
+
+    def add(user_id: int, at: datetime, row: Any) -> None:
+        wagered, paid_out = _amounts(game, row)
+        for period in PERIODS:
+            key = (period, game, bucket_start(at, period))
+            t = totals[key]
+            t[0] += 1
+            t[1] += wagered
+            t[2] += paid_out
+            players[key].add(user_id)
+
+    for row in _hot_rows(db, game, month, end):
+        seen.add(row.id)
+        add(row.user_id, row.timestamp, row)
+    for row in iter_archived_month(game, month.strftime("%Y-%m")):
+        # un lote archivado que no llegó a borrarse está en los dos lados
+        if row.get("user_id") is None or row["id"] in seen:
+            continue
+        seen.add(row["id"])
+        add(row["user_id"], row["timestamp"], row)
+
+    in_month = (GameRollup.game == game) & (GameRollup.bucket >= month) & (GameRollup.bucket < end)
+    db.exec(delete(GameRollup).where(in_month))
+    db.exec(delete(GameRollupPlayer).where(
+        GameRollupPlayer.game == game, GameRollupPlayer.bucket >= month, GameRollupPlayer.bucket < end))
+    db.add_all(
+        GameRollup(period=p, game=g, bucket=b, bets=t[0], wagered=t[1], paid_out=t[2],
+                   players=len(players[(p, g, b)]))
+        for (p, g, b), t in totals.items()
+    )
+    # jugadores solo de los buckets todavía abiertos (los demás ya no reciben apuestas)
+    db.add_all(
+        GameRollupPlayer(period=p, game=g, bucket=b, user_id=u)
+        for (p, g, b), users in players.items() if b >= _open_since(p, now)
+        for u in users
+    )
+    db.commit()
+    return len(seen)
+
+
+def rebuild(db: Session) -> Dict[str, int]:
+    """Recalcula los rollups desde los spins (calientes y archivados), un mes por transacción. Devuelve apuestas por juego"""
+    flush(db)  # lo acumulado en este proceso ya está en los spins
+    now = datetime.now(timezone.utc)
+    counted = {}
+    for game in GAMES:
+        months = _months(db, game)
+        counted[game] = sum(_rebuild_month(db, game, month, now) for month in months)
+        # buckets fuera del rango que ya no tienen spins
+        outside = GameRollup.game == game
+        if months:
+            outside &= (GameRollup.bucket < months[0]) | (GameRollup.bucket >= _next_month(months[-1]))
+        db.exec(delete(GameRollup).where(outside))
+        db.commit()
+    return counted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rollups de analytics por juego y hora/día")
+    parser.add_argument("--rebuild", action="store_true", help="recalcular todo desde los spins")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nada que hacer (usar --rebuild)")
+
+    from app.database import engine
+
+    with Session(engine) as s:
+        print(f"Rollups reconstruidos: {rebuild(s)}")
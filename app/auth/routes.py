@@ -1,5 +1,5 @@
 from app.auth.services import get_user, authenticate_user
-from sqlmodel import Session, select
+from sqlmodel import Session
 from app.database import get_session
 from app.model import User
 from app.auth.utils import get_password_hash
@@ -80,7 +80,7 @@ def signup(
         fecha_nacimiento=born_date,
         tipo_documento=type_id,
         numero_documento=id,
-        saldo=1000.0
+        saldo=100000  # 1000.00 en centavos
     )
 
     db.add(new_user)
@@ -127,13 +127,6 @@ def login(
     }
 
 
-@router.get("/debug/users")
-def Debug_Users(db: Session = Depends(get_session)):
-    statement = select(User)
-    users = db.exec(statement).all()
-    return users
-
-
 @router.get("/create-admin")
 def create_admin_user(db: Session = Depends(get_session)):
     """
@@ -159,7 +152,7 @@ def create_admin_user(db: Session = Depends(get_session)):
         is_Active=True,
         name="Admin",
         apellidos="Test",
-        saldo=10000.0
+        saldo=1000000  # 10000.00 en centavos
     )
     
     db.add(new_admin)
@@ -0,0 +1,19 @@
+# app/background.py
+"""Tareas periódicas del proceso (se arrancan en el lifespan de app.main)."""
+import asyncio
+import logging
+from typing import Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger("casino.background")
+
+
+async def run_periodically(interval_seconds: float, job: Callable[[], object], name: str) -> None:
+    """Ejecuta `job` (sync, en el threadpool) cada `interval_seconds` hasta ser cancelada"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await run_in_threadpool(job)
+        except Exception:
+            logger.exception("background job %s failed", name)
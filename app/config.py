@@ -13,4 +13,90 @@ ALGORITHM = "HS256"
 DATABASE_URL = getenv("DATABASE_URL", "sqlite:///./casino.db")
 
 
-ADMIN_TOKEN = getenv("ADMIN_TOKEN", "changeme_admin_token")
\ No newline at end of file
+ADMIN_TOKEN = getenv("ADMIN_TOKEN", "changeme_admin_token")
+
+
+# Leaderboards en memoria: tamaño de cada top y cada cuánto se guardan en la DB
+LEADERBOARD_SIZE = int(getenv("LEADERBOARD_SIZE", "100"))
+LEADERBOARD_SNAPSHOT_SECONDS = float(getenv("LEADERBOARD_SNAPSHOT_SECONDS", "60"))
+
+# ETags de perfil/saldo (app/users/versions.py): cuántos usuarios recuerda cada proceso.
+USER_VERSIONS_CACHE_SIZE = int(getenv("USER_VERSIONS_CACHE_SIZE", "10000"))
+
+# Idempotency-Key: cuánto se guarda la respuesta original y cuántas como máximo
+IDEMPOTENCY_TTL_SECONDS = float(getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_ENTRIES = int(getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+
+# Cache de sesiones de juego: cuántas se guardan y cuántos nonces se reservan por UPDATE.
+# Con SESSION_NONCE_LEASE > 1 cada giro hace además un UPDATE condicional para comprobar
+# que otro proceso no reveló la sesión durante el lease (app/games/session_cache.py).
+SESSION_CACHE_SIZE = int(getenv("SESSION_CACHE_SIZE", "1024"))
+SESSION_NONCE_LEASE = int(getenv("SESSION_NONCE_LEASE", "1"))
+
+# Group commit de liquidaciones (ver app/games/group_commit.py): desactivado por defecto.
+# Conviene con SESSION_NONCE_LEASE > 1, si no cada giro hace su propio commit del nonce.
+GROUP_COMMIT_ENABLED = getenv("GROUP_COMMIT_ENABLED", "false").lower() in ("1", "true", "yes")
+GROUP_COMMIT_WINDOW_MS = float(getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+GROUP_COMMIT_MAX_BATCH = int(getenv("GROUP_COMMIT_MAX_BATCH", "64"))
+
+# Rate limiting por usuario (o IP) en endpoints de juego: tokens por segundo y ráfaga máxima.
+# RATE_LIMIT_IDLE_SECONDS debe ser >= ráfaga / tasa (un bucket inactivo ya está lleno).
+RATE_LIMIT_ENABLED = getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_SPIN_PER_SECOND = float(getenv("RATE_LIMIT_SPIN_PER_SECOND", "10"))
+RATE_LIMIT_SPIN_BURST = float(getenv("RATE_LIMIT_SPIN_BURST", "30"))
+RATE_LIMIT_BET_PER_SECOND = float(getenv("RATE_LIMIT_BET_PER_SECOND", "10"))
+RATE_LIMIT_BET_BURST = float(getenv("RATE_LIMIT_BET_BURST", "30"))
+RATE_LIMIT_SESSION_PER_SECOND = float(getenv("RATE_LIMIT_SESSION_PER_SECOND", "1"))
+RATE_LIMIT_SESSION_BURST = float(getenv("RATE_LIMIT_SESSION_BURST", "20"))
+RATE_LIMIT_IDLE_SECONDS = float(getenv("RATE_LIMIT_IDLE_SECONDS", "600"))
+
+# Control de admisión (app/middleware/admission.py): requests concurrentes y en cola por clase.
+# La suma de los límites debe quedar por debajo del threadpool (40 hilos) para que los
+# logins lentos no dejen sin hilos a las apuestas.
+ADMISSION_ENABLED = getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_AUTH_CONCURRENCY = int(getenv("ADMISSION_AUTH_CONCURRENCY", "4"))
+ADMISSION_AUTH_QUEUE = int(getenv("ADMISSION_AUTH_QUEUE", "32"))
+ADMISSION_BET_CONCURRENCY = int(getenv("ADMISSION_BET_CONCURRENCY", "16"))
+ADMISSION_BET_QUEUE = int(getenv("ADMISSION_BET_QUEUE", "128"))
+ADMISSION_READ_CONCURRENCY = int(getenv("ADMISSION_READ_CONCURRENCY", "16"))
+ADMISSION_READ_QUEUE = int(getenv("ADMISSION_READ_QUEUE", "256"))
+ADMISSION_EXPORT_CONCURRENCY = int(getenv("ADMISSION_EXPORT_CONCURRENCY", "2"))
+ADMISSION_EXPORT_QUEUE = int(getenv("ADMISSION_EXPORT_QUEUE", "4"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "5"))
+
+# Archivo de spins viejos (app/games/archive.py): gzip NDJSON mensual en ARCHIVE_DIR.
+# Se archivan spins de sesiones reveladas con más de ARCHIVE_AFTER_DAYS días.
+# ARCHIVE_INTERVAL_SECONDS = 0 desactiva la tarea periódica (queda el comando manual).
+ARCHIVE_DIR = getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_AFTER_DAYS = int(getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_INTERVAL_SECONDS = float(getenv("ARCHIVE_INTERVAL_SECONDS", "0"))
+
+# Rotación de sesiones de juego (app/games/rotation.py): se revelan solas tras N giros
+# o T minutos (0 desactiva cada criterio); la tarea periódica revela las que quedaron.
+SESSION_ROTATE_AFTER_SPINS = int(getenv("SESSION_ROTATE_AFTER_SPINS", "1000"))
+SESSION_ROTATE_AFTER_MINUTES = float(getenv("SESSION_ROTATE_AFTER_MINUTES", "1440"))
+SESSION_REVEAL_INTERVAL_SECONDS = float(getenv("SESSION_REVEAL_INTERVAL_SECONDS", "300"))
+
+# Almacenamiento de spins (app/games/compact.py): "full" guarda hmac/client seed/resultado
+# como texto; "compact" guarda el HMAC crudo, el client seed internado por sesión y los
+# símbolos como código entero, y reconstruye todo al leer. Las filas viejas se leen igual.
+SPIN_STORAGE = getenv("SPIN_STORAGE", "full")
+
+# Monitor de RTP en vivo (app/analytics/monitor.py): tamaño de la ventana por juego,
+# umbral de alerta en errores estándar, apuestas mínimas antes de evaluar a un jugador
+# y cuántos jugadores se recuerdan.
+MONITOR_WINDOW = int(getenv("MONITOR_WINDOW", "1000"))
+MONITOR_Z_THRESHOLD = float(getenv("MONITOR_Z_THRESHOLD", "4"))
+MONITOR_MIN_BETS = int(getenv("MONITOR_MIN_BETS", "200"))
+MONITOR_MAX_USERS = int(getenv("MONITOR_MAX_USERS", "10000"))
+
+# Rollups de analytics (app/analytics/rollups.py): cada cuántos segundos se escribe lo
+# acumulado en memoria. Lo no escrito se pierde si el proceso muere (--rebuild lo recupera).
+ROLLUP_FLUSH_SECONDS = float(getenv("ROLLUP_FLUSH_SECONDS", "10"))
+
+# Búsqueda de spins para admins (app/admin/search.py): los filtros de monto y premio sin
+# usuario piden un rango de fechas de a lo sumo SEARCH_MAX_RANGE_DAYS; el conteo se
+# detiene en SEARCH_COUNT_CAP filas (se informa como "al menos").
+SEARCH_MAX_RANGE_DAYS = int(getenv("SEARCH_MAX_RANGE_DAYS", "31"))
+SEARCH_COUNT_CAP = int(getenv("SEARCH_COUNT_CAP", "10000"))
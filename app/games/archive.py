@@ -0,0 +1,344 @@
+# app/games/archive.py
+"""
+Archivo y compactación del historial de spins (ruleta y slots).
+
+Los spins de sesiones YA reveladas con más de ARCHIVE_AFTER_DAYS días salen de
+la DB caliente hacia archivos append-only gzip NDJSON, uno por juego y mes:
+ARCHIVE_DIR/<juego>/<YYYY-MM>.ndjson.gz. Cada lote se agrega como un miembro
+gzip nuevo (gzip acepta miembros concatenados), así nunca se reescribe un archivo.
+
+Por cada lote, en UNA transacción:
+- SpinRollup suma los totales por (usuario, juego), para las estadísticas;
+- SpinArchiveMonth anota qué meses tienen filas de cada usuario;
+- se borran las filas archivadas.
+
+El archivo se escribe (y fsync) ANTES del commit: si el proceso muere en el
+medio, el próximo lote vuelve a archivar esas filas y la lectura descarta los
+duplicados por id. Nunca se pierde una fila.
+
+Cada lote (miembro gzip) se escribe ordenado por (timestamp, id) y su offset se
+anota en <YYYY-MM>.ndjson.gz.idx: cada miembro es una corrida ordenada y la
+lectura las mezcla con heapq.merge leyendo cada una de a pedazos. La memoria
+depende de cuántos lotes tiene el mes, no de cuántas filas. Los archivos de
+antes del índice (o el tramo inicial sin índice) se marcan "unsorted" y solo esa
+corrida se ordena en memoria.
+
+Lectura: iter_archived() abre solo los meses que SpinArchiveMonth marca para el
+usuario y devuelve sus filas ordenadas por (timestamp, id); iter_archived_month()
+hace lo mismo para todas las filas de un mes (reconstrucción de
+app.analytics.rollups). Una fila repetida (lote re-archivado tras un corte)
+sale una sola vez: gana la última copia.
+
+Uso manual:  python -m app.games.archive [--days 90] [--batch 1000]
+"""
+import argparse
+import gzip
+import heapq
+import json
+import os
+import zlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app import config
+from app.games import compact
+from app.money import to_minor
+from app.model import (
+    RouletteSession, SlotSession, SlotSpin, Spin, SpinArchiveMonth, SpinRollup,
+)
+from app.timeutil import naive_utc
+
+# montos de las filas archivadas (ruleta y slots)
+MONEY_FIELDS = ("bet_amount", "payout", "win_amount")
+
+# juego -> (modelo del spin, modelo de la sesión)
+GAMES = {
+    "roulette": (Spin, RouletteSession),
+    "slots": (SlotSpin, SlotSession),
+}
+
+
+def archive_path(game: str, month: str) -> Path:
+    return Path(config.ARCHIVE_DIR) / game / f"{month}.ndjson.gz"
+
+
+def _month(ts: datetime) -> str:
+    return ts.strftime("%Y-%m")
+
+
+def _outcome(game: str, row) -> Dict[str, int]:
+    """Aporte de un spin a los totales del SpinRollup (centavos)"""
+    if game == "roulette":
+        won = row.payout if row.payout > 0 else 0
+        return {"bet": row.bet_amount, "won": won, "net": row.payout}
+    stake = row.bet_amount * row.lines
+    return {"bet": row.bet_amount, "won": row.win_amount, "net": row.win_amount - stake}
+
+
+def _money_to_minor(row: Dict[str, Any]) -> None:
+    # los archivos escritos antes de pasar a centavos guardan los montos como
+    # float (json los deja con ".0"); los nuevos son enteros
+    for key in MONEY_FIELDS:
+        if isinstance(row.get(key), float):
+            row[key] = to_minor(row[key])
+
+
+def _index_path(path: Path) -> Path:
+    return path.with_name(path.name + ".idx")
+
+
+def _row_key(row: Dict[str, Any]) -> tuple:
+    ts = row["timestamp"]
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts)
+    return naive_utc(ts), row["id"]
+
+
+def _append_index(path: Path, line: str) -> None:
+    with open(_index_path(path), "a") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _append(path: Path, rows: List[Dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists() and not _index_path(path).exists() and path.stat().st_size:
+        # archivo de antes del índice: todo lo previo es una corrida sin orden
+        _append_index(path, f"0 {path.stat().st_size} unsorted")
+    with open(path, "ab") as f:
+        offset = f.tell()
+        with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+            for row in sorted(rows, key=_row_key):
+                gz.write((json.dumps(row) + "\n").encode())
+        f.flush()
+        os.fsync(f.fileno())
+        length = f.tell() - offset
+    # un miembro sin su línea de índice (corte en el medio) no se lee; sus filas
+    # siguen en la DB y el próximo lote las vuelve a archivar
+    _append_index(path, f"{offset} {length}")
+
+
+def archive_batch(db: Session, game: str, cutoff: datetime, batch_size: int) -> int:
+    """Archiva hasta batch_size spins viejos de sesiones reveladas. Devuelve cuántos"""
+    model, session_model = GAMES[game]
+    rows = db.exec(
+        select(model)
+        .join(session_model, model.session_id == session_model.id)
+        .where(session_model.revealed == True, model.timestamp < cutoff)  # noqa: E712
+        .order_by(model.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+
+    by_month: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    totals: Dict[int, Dict[str, int]] = {}
+    months: Dict[tuple, int] = defaultdict(int)
+    for row in rows:
+        # el archivo guarda la fila completa aunque la DB la tenga compacta
+        data = dict(row.model_dump(), **compact.expand(db, game, row))
+        data.pop("hmac_digest", None)
+        data["timestamp"] = row.timestamp.isoformat()
+        by_month[_month(row.timestamp)].append(data)
+        if row.user_id is None:
+            continue  # spins sin usuario se archivan pero no suman a nadie
+        out = _outcome(game, row)
+        t = totals.setdefault(row.user_id, {"spins": 0, "bet": 0, "won": 0, "net": 0, "biggest": 0})
+        t["spins"] += 1
+        t["bet"] += out["bet"]
+        t["won"] += out["won"]
+        t["net"] += out["net"]
+        t["biggest"] = max(t["biggest"], out["won"])
+        months[(row.user_id, _month(row.timestamp))] += 1
+
+    for month, items in by_month.items():
+        _append(archive_path(game, month), items)
+
+    for user_id, t in totals.items():
+        rollup = db.exec(
+            select(SpinRollup).where(SpinRollup.user_id == user_id, SpinRollup.game == game)
+        ).one_or_none() or SpinRollup(user_id=user_id, game=game)
+        rollup.spins += t["spins"]
+        rollup.total_bet += t["bet"]
+        rollup.total_won += t["won"]
+        rollup.net += t["net"]
+        rollup.biggest_win = max(rollup.biggest_win, t["biggest"])
+        rollup.updated_at = datetime.now(timezone.utc)
+        db.add(rollup)
+    for (user_id, month), n in months.items():
+        entry = db.exec(
+            select(SpinArchiveMonth).where(
+                SpinArchiveMonth.user_id == user_id,
+                SpinArchiveMonth.game == game,
+                SpinArchiveMonth.month == month,
+            )
+        ).one_or_none() or SpinArchiveMonth(user_id=user_id, game=game, month=month)
+        entry.rows += n
+        db.add(entry)
+    db.exec(delete(model).where(model.id.in_([r.id for r in rows])))
+    db.commit()
+    return len(rows)
+
+
+def archive_old_spins(db: Session, older_than_days: Optional[int] = None,
+                      batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Archiva todo lo que pasó el corte, en lotes. Devuelve filas archivadas por juego"""
+    days = config.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch = batch_size or config.ARCHIVE_BATCH_SIZE
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    done = {}
+    for game in GAMES:
+        total = 0
+        while True:
+            n = archive_batch(db, game, cutoff, batch)
+            total += n
+            if n < batch:
+                break
+        done[game] = total
+    return done
+
+
+def get_rollup(db: Session, user_id: int, game: str) -> Optional[SpinRollup]:
+    return db.exec(
+        select(SpinRollup).where(SpinRollup.user_id == user_id, SpinRollup.game == game)
+    ).one_or_none()
+
+
+READ_CHUNK = 64 * 1024
+
+
+def _runs(path: Path) -> List[tuple]:
+    """(offset, largo, ordenada) de cada corrida del archivo"""
+    index = _index_path(path)
+    if not index.exists():
+        return [(0, path.stat().st_size, False)]
+    runs = []
+    with open(index) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2:
+                runs.append((int(parts[0]), int(parts[1]), "unsorted" not in parts[2:]))
+    return runs
+
+
+def _read_run(f, offset: int, length: int) -> Iterator[Dict[str, Any]]:
+    """Filas de una corrida, descomprimiendo de a READ_CHUNK (f se comparte entre corridas)"""
+    pos, end = offset, offset + length
+    d = zlib.decompressobj(wbits=31)
+    pending = b""
+
+    def lines(data: bytes) -> Iterator[Dict[str, Any]]:
+        nonlocal pending
+        *complete, pending = (pending + data).split(b"\n")
+        for line in complete:
+            if line:
+                row = json.loads(line)
+                _money_to_minor(row)
+                row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+                yield row
+
+    while pos < end:
+        f.seek(pos)
+        chunk = f.read(min(READ_CHUNK, end - pos))
+        if not chunk:
+            break
+        pos += len(chunk)
+        while chunk:
+            yield from lines(d.decompress(chunk))
+            chunk = b""
+            if d.eof:  # una corrida "unsorted" puede tener varios miembros
+                chunk = d.unused_data
+                d = zlib.decompressobj(wbits=31)
+    yield from lines(d.flush() + b"\n")
+
+
+def _iter_file(path: Path, keep) -> Iterator[Dict[str, Any]]:
+    """Filas del archivo que pasan `keep`, ordenadas por (timestamp, id), sin duplicados"""
+    with open(path, "rb") as f:
+        streams = []
+        for offset, length, ordered in _runs(path):
+            rows = (r for r in _read_run(f, offset, length) if keep(r))
+            # solo las corridas viejas, sin orden, se ordenan en memoria
+            streams.append(rows if ordered else iter(sorted(rows, key=_row_key)))
+        prev = None
+        for row in heapq.merge(*streams, key=_row_key):
+            if prev is not None and _row_key(prev) != _row_key(row):
+                yield prev
+            prev = row  # misma (timestamp, id): gana la última copia
+        if prev is not None:
+            yield prev
+
+
+def iter_archived(db: Session, game: str, user_id: int, date_from: Optional[datetime] = None,
+                  date_to: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    """Spins archivados del usuario en [date_from, date_to), ordenados por (timestamp, id)"""
+    months = db.exec(
+        select(SpinArchiveMonth.month)
+        .where(SpinArchiveMonth.user_id == user_id, SpinArchiveMonth.game == game)
+        .order_by(SpinArchiveMonth.month)
+    ).all()
+    lo = naive_utc(date_from) if date_from is not None else None
+    hi = naive_utc(date_to) if date_to is not None else None
+
+    def keep(row: Dict[str, Any]) -> bool:
+        if row.get("user_id") != user_id:
+            return False
+        naive = naive_utc(row["timestamp"])
+        return (lo is None or naive >= lo) and (hi is None or naive < hi)
+
+    for month in months:
+        if lo is not None and month < _month(lo):
+            continue
+        if hi is not None and month > _month(hi):
+            break
+        path = archive_path(game, month)
+        if not path.exists():
+            print(f"⚠️ Falta el archivo {path} ({game}, usuario {user_id})")
+            continue
+        yield from _iter_file(path, keep)
+
+
+def archived_months(game: str) -> List[str]:
+    """Meses con archivo del juego, en orden"""
+    return sorted(p.name[:7] for p in (Path(config.ARCHIVE_DIR) / game).glob("*.ndjson.gz"))
+
+
+def iter_archived_month(game: str, month: str) -> Iterator[Dict[str, Any]]:
+    """Todas las filas archivadas del mes, ordenadas por (timestamp, id)"""
+    path = archive_path(game, month)
+    if path.exists():
+        yield from _iter_file(path, lambda row: True)
+
+
+def iter_all_archived(game: str) -> Iterator[Dict[str, Any]]:
+    """Todas las filas archivadas del juego, mes por mes"""
+    for month in archived_months(game):
+        yield from iter_archived_month(game, month)
+
+
+def run_archive_job() -> None:
+    """Tarea periódica del lifespan"""
+    from app.database import engine
+
+    with Session(engine) as db:
+        done = archive_old_spins(db)
+    if any(done.values()):
+        print(f"🗄️ Spins archivados: {done}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archiva spins viejos de sesiones reveladas")
+    parser.add_argument("--days", type=int, default=config.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch", type=int, default=config.ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app.database import engine
+
+    with Session(engine) as s:
+        print(f"Spins archivados en {config.ARCHIVE_DIR}: {archive_old_spins(s, args.days, args.batch)}")
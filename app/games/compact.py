@@ -0,0 +1,155 @@
+# app/games/compact.py
+"""
+Almacenamiento compacto de spins (SPIN_STORAGE=compact).
+
+Lo que se puede re-derivar no se guarda como texto:
+- hmac_hex (64 chars) -> hmac_digest, los 32 bytes crudos;
+- client_seed -> client_seed_id, internado una vez por (juego, sesión) en ClientSeed;
+- color de la ruleta -> sale de pocket;
+- símbolos de slots (JSON con emojis) -> symbol_code, el índice en SLOT_SYMBOLS de
+  cada carrete en base 16.
+
+Las columnas de texto quedan en "" (no NULL: así sirven las tablas existentes
+sin reconstruirlas) y expand()/hydrate() las rearman al leer. Una fila con
+hmac_digest NULL está en formato completo y se lee tal cual: los dos formatos
+conviven en la misma tabla y se puede cambiar de modo en cualquier momento.
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session, select
+
+from app import config
+from app.games.session_cache import SessionMeta
+from app.model import ClientSeed
+
+SYMBOL_CODE_BASE = 16
+REELS = 3
+
+# seeds recordados por sesión en la metadata y por id en el proceso
+SEEDS_PER_SESSION = 256
+SEED_CACHE_SIZE = 4096
+
+_lock = threading.Lock()
+_seeds: "OrderedDict[int, str]" = OrderedDict()
+
+
+def enabled() -> bool:
+    return config.SPIN_STORAGE == "compact"
+
+
+def clear() -> None:
+    with _lock:
+        _seeds.clear()
+
+
+def _remember(seed_id: int, seed: str) -> None:
+    with _lock:
+        _seeds[seed_id] = seed
+        _seeds.move_to_end(seed_id)
+        while len(_seeds) > SEED_CACHE_SIZE:
+            _seeds.popitem(last=False)
+
+
+# ---- símbolos ----
+def pack_symbols(symbols: Sequence[str], alphabet: Sequence[str]) -> Optional[int]:
+    """Código entero de los símbolos, o None si alguno no está en el alfabeto"""
+    if len(symbols) != REELS:
+        return None
+    code = 0
+    for i, symbol in enumerate(symbols):
+        if symbol not in alphabet:
+            return None
+        code += alphabet.index(symbol) * SYMBOL_CODE_BASE ** i
+    return code
+
+
+def unpack_symbols(code: int, alphabet: Sequence[str]) -> List[str]:
+    return [alphabet[(code // SYMBOL_CODE_BASE ** i) % SYMBOL_CODE_BASE] for i in range(REELS)]
+
+
+# ---- client seeds ----
+def intern_client_seed(db: Session, meta: SessionMeta, seed: str) -> int:
+    """
+    Id del client seed en la sesión; lo inserta la primera vez.
+    Como el lease de nonces, el alta se confirma aparte (antes de reservar el
+    nonce): si el giro después falla, el id que quedó en la metadata sigue
+    existiendo en la DB.
+    """
+    with meta.lock:
+        seed_id = meta.client_seeds.get(seed)
+    if seed_id is not None:
+        return seed_id
+
+    stmt = select(ClientSeed.id).where(
+        ClientSeed.game == meta.game, ClientSeed.session_id == meta.id, ClientSeed.seed == seed)
+    seed_id = db.exec(stmt).first()
+    if seed_id is None:
+        row = ClientSeed(game=meta.game, session_id=meta.id, seed=seed)
+        try:
+            with db.begin_nested():
+                db.add(row)
+            seed_id = row.id
+        except IntegrityError:
+            seed_id = db.exec(stmt).one()  # lo insertó otro request/proceso
+        db.commit()
+
+    with meta.lock:
+        if len(meta.client_seeds) >= SEEDS_PER_SESSION:
+            meta.client_seeds.clear()
+        meta.client_seeds[seed] = seed_id
+    _remember(seed_id, seed)
+    return seed_id
+
+
+def client_seed_by_id(db: Session, seed_id: int) -> str:
+    with _lock:
+        seed = _seeds.get(seed_id)
+    if seed is None:
+        seed = db.exec(select(ClientSeed.seed).where(ClientSeed.id == seed_id)).one()
+        _remember(seed_id, seed)
+    return seed
+
+
+# ---- escritura / lectura ----
+def strip(spin: Any, seed_id: int) -> None:
+    """Pasa un spin recién armado (aún sin INSERT) al formato compacto"""
+    spin.hmac_digest = bytes.fromhex(spin.hmac_hex)
+    spin.client_seed_id = seed_id
+    spin.hmac_hex = ""
+    spin.client_seed = ""
+
+
+def expand(db: Session, game: str, row: Any) -> Dict[str, Any]:
+    """
+    Campos re-derivados de una fila compacta (modelo, Row de un select por
+    columnas o SimpleNamespace). Vacío si la fila está en formato completo.
+    """
+    digest = getattr(row, "hmac_digest", None)
+    if digest is None:
+        return {}
+    out: Dict[str, Any] = {"hmac_hex": digest.hex()}
+    if getattr(row, "client_seed_id", None) is not None:
+        out["client_seed"] = client_seed_by_id(db, row.client_seed_id)
+    # import diferido: los servicios de juego importan este módulo
+    if game == "roulette":
+        from app.games.roulette.service import pocket_color
+        out["color"] = pocket_color(row.pocket)
+    elif getattr(row, "symbol_code", None) is not None:
+        from app.games.slots.service import SLOT_SYMBOLS
+        out["symbols"] = json.dumps(unpack_symbols(row.symbol_code, SLOT_SYMBOLS))
+    return out
+
+
+def hydrate(db: Session, game: str, spin: Any) -> Any:
+    """
+    Completa en memoria un Spin/SlotSpin compacto. set_committed_value no marca
+    la fila como modificada: un flush posterior no vuelve a escribir el texto.
+    """
+    for key, value in expand(db, game, spin).items():
+        set_committed_value(spin, key, value)
+    return spin
@@ -0,0 +1,185 @@
+# app/games/group_commit.py
+"""
+Group commit (opcional) para la liquidación de apuestas.
+
+En SQLite, o en Postgres con synchronous_commit=on, cada apuesta paga su propio
+fsync. Con GROUP_COMMIT_ENABLED las liquidaciones concurrentes de ruleta y slots
+se encolan un instante (GROUP_COMMIT_WINDOW_MS) y un hilo "committer" por engine
+las escribe todas en UNA transacción:
+
+- cada trabajo corre dentro de su propio SAVEPOINT: si falla, solo se deshace lo
+  suyo y solo su llamador recibe la excepción;
+- el llamador queda bloqueado hasta que el commit compartido termina, así nunca
+  se confirma una apuesta que no está en disco;
+- si el commit del lote falla, cada trabajo se reintenta solo (commit propio)
+  para aislar al culpable.
+
+Un trabajo es `work(db) -> resultado`: recibe la sesión del committer (no la del
+request) y debe poder re-ejecutarse si el lote se deshace. Los objetos que
+devuelve quedan desligados de la sesión y con sus atributos ya cargados.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from app import config
+
+logger = logging.getLogger("casino.group_commit")
+
+Work = Callable[[Session], Any]
+
+
+class GroupCommitter:
+    def __init__(self, engine: Engine, window_ms: float = 2.0, max_batch: int = 64):
+        self.engine = engine
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queue: "queue.Queue[Tuple[Work, Future] | None]" = queue.Queue()
+        self._stats = {"batches": 0, "jobs": 0, "failed": 0, "commit_retries": 0}
+        self._thread = threading.Thread(target=self._loop, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, work: Work) -> Any:
+        """Encola el trabajo y espera a que su lote esté confirmado"""
+        if not self._thread.is_alive():
+            raise RuntimeError("group committer stopped")
+        fut: Future = Future()
+        self._queue.put((work, fut))
+        return fut.result()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats, pending=self._queue.qsize())
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Procesa lo que ya está en cola y detiene el hilo"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    # ---- hilo committer ----
+    def _collect(self, first) -> Tuple[List[Tuple[Work, Future]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+            try:
+                self._run_batch(batch)
+            except Exception as e:  # nunca dejar a un llamador esperando
+                logger.exception("group commit batch failed")
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            if stop:
+                return
+
+    def _session(self) -> Session:
+        # sin expire_on_commit: los resultados se leen desde otro hilo ya desligados
+        return Session(self.engine, expire_on_commit=False)
+
+    def _run_batch(self, batch: List[Tuple[Work, Future]]) -> None:
+        done: List[Tuple[Work, Future, Any]] = []
+        with self._session() as db:
+            for work, fut in batch:
+                try:
+                    with db.begin_nested():
+                        result = work(db)
+                except Exception as e:
+                    self._stats["failed"] += 1
+                    fut.set_exception(e)
+                    continue
+                done.append((work, fut, result))
+            try:
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.warning("group commit of %d jobs failed, retrying one by one", len(done))
+                self._stats["commit_retries"] += 1
+                self._run_one_by_one(db, done)
+                return
+            db.expunge_all()
+        self._stats["batches"] += 1
+        self._stats["jobs"] += len(done)
+        for _, fut, result in done:
+            fut.set_result(result)
+
+    def _run_one_by_one(self, db: Session, jobs: List[Tuple[Work, Future, Any]]) -> None:
+        for work, fut, _ in jobs:
+            try:
+                result = work(db)
+                db.commit()
+                db.expunge_all()
+            except Exception as e:
+                db.rollback()
+                self._stats["failed"] += 1
+                fut.set_exception(e)
+                continue
+            self._stats["batches"] += 1
+            self._stats["jobs"] += 1
+            fut.set_result(result)
+
+
+_lock = threading.Lock()
+_committers: Dict[Engine, GroupCommitter] = {}
+
+
+def enabled() -> bool:
+    return config.GROUP_COMMIT_ENABLED
+
+
+def committer_for(engine: Engine) -> GroupCommitter:
+    with _lock:
+        committer = _committers.get(engine)
+        if committer is None:
+            committer = GroupCommitter(
+                engine, config.GROUP_COMMIT_WINDOW_MS, config.GROUP_COMMIT_MAX_BATCH)
+            _committers[engine] = committer
+        return committer
+
+
+def run(db: Session, work: Work) -> Any:
+    """
+    Ejecuta y confirma una liquidación. Sin group commit corre en la sesión del
+    request y hace commit ahí mismo; con group commit va al lote del engine.
+    """
+    if not enabled():
+        result = work(db)
+        db.commit()
+        return result
+    # el request no debe retener locks de la DB mientras espera al committer
+    db.commit()
+    return committer_for(db.get_bind()).submit(work)
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    with _lock:
+        return {str(engine.url): c.stats() for engine, c in _committers.items()}
+
+
+def shutdown() -> None:
+    with _lock:
+        committers = list(_committers.values())
+        _committers.clear()
+    for committer in committers:
+        committer.stop()
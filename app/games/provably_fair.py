@@ -0,0 +1,104 @@
+# app/games/provably_fair.py
+"""
+Helpers provably fair compartidos por ruleta y slots.
+
+Cada giro es HMAC-SHA256(key=server_seed, msg=f"{client_seed}:{nonce}").
+Parsear el server_seed y preparar el HMAC con la llave cuesta más que el propio
+digest, así que se cachea un HMAC ya "keyed" por sesión activa (LRU acotado) y se
+clona con .copy() para cada nonce.
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+from collections import OrderedDict
+from typing import List
+
+MAX_CACHED_KEYS = 1024
+
+_keyed: "OrderedDict[str, hmac.HMAC]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def generate_server_seed() -> str:
+    """Genera un seed aleatorio del servidor (32 bytes en hex)"""
+    return secrets.token_hex(32)
+
+
+def hash_server_seed(server_seed: str) -> str:
+    """Genera el hash SHA-256 público del server seed"""
+    return hashlib.sha256(server_seed.encode()).hexdigest()
+
+
+def hmac_sha256_hex(key_hex: str, message: str) -> str:
+    """HMAC-SHA256 en hexadecimal, sin cache (útil para verificación puntual)"""
+    key = bytes.fromhex(key_hex)
+    hm = hmac.new(key, message.encode(), hashlib.sha256)
+    return hm.hexdigest()
+
+
+def derive_integer_from_hex(hexstr: str) -> int:
+    return int(hexstr, 16)
+
+
+def _new_keyed(server_seed: str) -> hmac.HMAC:
+    return hmac.new(bytes.fromhex(server_seed), digestmod=hashlib.sha256)
+
+
+def keyed_hmac(server_seed: str) -> hmac.HMAC:
+    """Devuelve el HMAC pre-keyed de la sesión (no mutar: clonarlo con .copy())"""
+    with _lock:
+        hm = _keyed.get(server_seed)
+        if hm is not None:
+            _keyed.move_to_end(server_seed)
+            return hm
+    hm = _new_keyed(server_seed)
+    with _lock:
+        _keyed[server_seed] = hm
+        _keyed.move_to_end(server_seed)
+        while len(_keyed) > MAX_CACHED_KEYS:
+            _keyed.popitem(last=False)
+    return hm
+
+
+def forget(server_seed: str) -> None:
+    """Saca la sesión de la cache (al revelarla ya no habrá más giros)"""
+    with _lock:
+        _keyed.pop(server_seed, None)
+
+
+def clear_cache() -> None:
+    with _lock:
+        _keyed.clear()
+
+
+def spin_hmac_hex(server_seed: str, client_seed: str, nonce: int) -> str:
+    """HMAC del giro `nonce` usando el estado keyed cacheado de la sesión"""
+    hm = keyed_hmac(server_seed).copy()
+    hm.update(f"{client_seed}:{nonce}".encode())
+    return hm.hexdigest()
+
+
+def derive_batch(
+    server_seed: str,
+    client_seed: str,
+    nonce_start: int,
+    count: int,
+    cache: bool = True,
+) -> List[str]:
+    """
+    HMACs hex para los nonces [nonce_start, nonce_start + count).
+    El prefijo "client_seed:" se absorbe una sola vez y se clona por nonce.
+    Con cache=False no se guarda la llave (verificación de seeds ya revelados).
+    """
+    if count <= 0:
+        return []
+    base = keyed_hmac(server_seed) if cache else _new_keyed(server_seed)
+    prefixed = base.copy()
+    prefixed.update(f"{client_seed}:".encode())
+    out = []
+    for nonce in range(nonce_start, nonce_start + count):
+        hm = prefixed.copy()
+        hm.update(str(nonce).encode())
+        out.append(hm.hexdigest())
+    return out
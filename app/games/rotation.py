@@ -0,0 +1,126 @@
+# app/games/rotation.py
+"""
+Rotación automática de sesiones de ruleta y slots.
+
+Una sesión cumple la política después de SESSION_ROTATE_AFTER_SPINS giros o
+SESSION_ROTATE_AFTER_MINUTES minutos (0 desactiva cada criterio). El giro que la
+cumple la revela y abre una nueva: la respuesta trae el server seed revelado
+(para verificar) y la sesión siguiente.
+
+El reveal es un UPDATE ... WHERE revealed = false: si dos requests (o dos
+procesos) llegan a la vez, solo uno rota; el otro sigue sin rotación.
+
+reveal_stale_sessions() es la tarea periódica: revela en lote las sesiones que
+cumplieron la política aunque nadie haya vuelto a girar en ellas.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import or_, update
+from sqlmodel import Session, select
+
+from app import config
+from app.games import provably_fair, session_cache
+from app.games.session_cache import SessionMeta
+from app.model import RouletteSession, SlotSession
+from app.timeutil import aware_utc
+
+# juego -> modelo de la sesión
+SESSION_MODELS = {
+    "roulette": RouletteSession,
+    "slots": SlotSession,
+}
+
+
+def rotation_due(meta: SessionMeta, now: Optional[datetime] = None) -> bool:
+    if config.SESSION_ROTATE_AFTER_SPINS and meta.next_nonce >= config.SESSION_ROTATE_AFTER_SPINS:
+        return True
+    if config.SESSION_ROTATE_AFTER_MINUTES:
+        now = now or datetime.now(timezone.utc)
+        if now - aware_utc(meta.created_at) >= timedelta(minutes=config.SESSION_ROTATE_AFTER_MINUTES):
+            return True
+    return False
+
+
+def _forget(game: str, session_id: int, server_seed: str) -> None:
+    provably_fair.forget(server_seed)
+    session_cache.invalidate(game, session_id)
+
+
+def rotate_if_due(db: Session, game: str, meta: SessionMeta,
+                  create_session: Callable[[Session], Any]) -> Optional[Dict[str, Any]]:
+    """Revela la sesión si cumplió la política y abre la siguiente"""
+    if meta.revealed or not rotation_due(meta):
+        return None
+    model = SESSION_MODELS[game]
+    result = db.exec(
+        update(model)
+        .where(model.id == meta.id, model.revealed == False)  # noqa: E712
+        .values(revealed=True)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        db.rollback()
+        return None  # ya la rotó otro request
+    db.commit()
+    _forget(game, meta.id, meta.server_seed)
+    new = create_session(db)
+    return {
+        "revealed_session_id": meta.id,
+        "server_seed": meta.server_seed,
+        "server_seed_hash": meta.server_seed_hash,
+        "next_session_id": new.id,
+        "next_server_seed_hash": new.server_seed_hash,
+    }
+
+
+def _stale_filter(model, now: datetime):
+    conditions = []
+    if config.SESSION_ROTATE_AFTER_SPINS:
+        # nonce es el tope reservado por los leases: puede adelantarse un poco
+        conditions.append(model.nonce >= config.SESSION_ROTATE_AFTER_SPINS)
+    if config.SESSION_ROTATE_AFTER_MINUTES:
+        conditions.append(model.created_at < now - timedelta(minutes=config.SESSION_ROTATE_AFTER_MINUTES))
+    return or_(*conditions) if conditions else None
+
+
+def reveal_stale_sessions(db: Session, batch_size: int = 500) -> Dict[str, int]:
+    """Revela en lote las sesiones que cumplieron la política. Devuelve cuántas por juego"""
+    now = datetime.now(timezone.utc)
+    done = {}
+    for game, model in SESSION_MODELS.items():
+        stale = _stale_filter(model, now)
+        total = 0
+        while stale is not None:
+            rows = db.exec(
+                select(model.id, model.server_seed)
+                .where(model.revealed == False, stale)  # noqa: E712
+                .order_by(model.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            result = db.exec(
+                update(model)
+                .where(model.id.in_([r.id for r in rows]), model.revealed == False)  # noqa: E712
+                .values(revealed=True)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            for r in rows:
+                _forget(game, r.id, r.server_seed)
+            total += result.rowcount
+            if len(rows) < batch_size:
+                break
+        done[game] = total
+    return done
+
+
+def run_reveal_job() -> None:
+    """Tarea periódica del lifespan"""
+    from app.database import engine
+
+    with Session(engine) as db:
+        done = reveal_stale_sessions(db)
+    if any(done.values()):
+        print(f"🔓 Sesiones reveladas por rotación: {done}")
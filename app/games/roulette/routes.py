@@ -1,7 +1,7 @@
 # app/roulette/routes.py
-from fastapi import APIRouter, Depends, HTTPException, Header
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+from pydantic import BaseModel, BeforeValidator, Field
+from typing import Annotated, Literal, Optional, List, Union
 
 from sqlmodel import Session
 
@@ -11,12 +11,17 @@ from app.database import get_session
 from app.games.roulette import service as roulette_service
 from app.model import RouletteSession, Spin, User
 from app import config
+from app.money import Money, to_major
 from app.auth.services import get_user_from_token  # usamos la función existente
+from app.realtime.hub import balance_changed
+from app.users.activity import record_activity
 
 router = APIRouter(prefix="/v1/roulette", tags=["roulette"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+HASH_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 # ---- request/response models ----
 
 
@@ -36,6 +41,7 @@ class SpinResp(BaseModel):
     color: str
     hmac_hex: str
     server_seed_hash: str
+    rotation: Optional[dict] = None  # sesión revelada + la siguiente, si tocó rotar
 
 
 class RevealResp(BaseModel):
@@ -45,19 +51,72 @@ class RevealResp(BaseModel):
     revealed: bool
 
 
+def _lower(v):
+    return v.lower() if isinstance(v, str) else v
+
+
+class _BetBase(BaseModel):
+    amount: Money = Field(gt=0)
+
+
+class StraightBet(_BetBase):
+    type: Literal["straight"]
+    number: int = Field(ge=0, le=36)
+
+
+class ColorBet(_BetBase):
+    type: Literal["color"]
+    side: Annotated[Literal["red", "black"], BeforeValidator(_lower)]
+
+
+class OddEvenBet(_BetBase):
+    type: Literal["odd_even"]
+    side: Annotated[Literal["odd", "even"], BeforeValidator(_lower)]
+
+
+class LowHighBet(_BetBase):
+    type: Literal["low_high"]
+    side: Annotated[Literal["low", "high"], BeforeValidator(_lower)]
+
+
+class DozenBet(_BetBase):
+    type: Literal["dozen"]
+    which: int = Field(ge=1, le=3)
+
+
+class ColumnBet(_BetBase):
+    type: Literal["column"]
+    which: int = Field(ge=1, le=3)
+
+
+# el campo "type" elige el modelo: un tipo desconocido o un campo inválido es 422
+RouletteBet = Annotated[
+    Union[StraightBet, ColorBet, OddEvenBet, LowHighBet, DozenBet, ColumnBet],
+    Field(discriminator="type"),
+]
+
+
 class BetReqToken(BaseModel):
     client_seed: str
-    bet: dict
+    bet: RouletteBet
 
 
 class BetResp(BaseModel):
     spin: dict
     bet_result: dict
     user: dict
+    rotation: Optional[dict] = None
 
 
 class DepositReq(BaseModel):
-    amount: float
+    amount: Money
+
+
+class VerifyReq(BaseModel):
+    server_seed: str
+    client_seed: str
+    nonce_start: int = Field(0, ge=0)
+    count: int = Field(1, ge=1, le=1000)
 
 # ---- routes ----
 
@@ -69,16 +128,18 @@ def create_session(db: Session = Depends(get_session)):
 
 
 @router.get("/session/{session_id}/hash")
-def get_session_hash(session_id: int, db: Session = Depends(get_session)):
-    s = roulette_service.get_session(db, session_id)
+def get_session_hash(session_id: int, response: Response, db: Session = Depends(get_session)):
+    s = roulette_service.get_session_meta(db, session_id)
     if not s:
         raise HTTPException(status_code=404, detail="session not found")
+    # el hash de una sesión nunca cambia
+    response.headers["Cache-Control"] = HASH_CACHE_CONTROL
     return {"session_id": s.id, "server_seed_hash": s.server_seed_hash}
 
 
 @router.post("/session/{session_id}/spin", response_model=SpinResp)
 def spin(session_id: int, payload: SpinReq, db: Session = Depends(get_session)):
-    s = roulette_service.get_session(db, session_id)
+    s = roulette_service.get_session_meta(db, session_id)
     if not s:
         raise HTTPException(status_code=404, detail="session not found")
     if s.revealed:
@@ -93,7 +154,8 @@ def spin(session_id: int, payload: SpinReq, db: Session = Depends(get_session)):
         pocket=spin.pocket,
         color=spin.color,
         hmac_hex=spin.hmac_hex,
-        server_seed_hash=s.server_seed_hash
+        server_seed_hash=s.server_seed_hash,
+        rotation=roulette_service.rotate_if_due(db, s)
     )
 
 
@@ -104,22 +166,29 @@ def place_bet_token(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_session)
 ):
+    bet = roulette_service.compile_bet(payload.bet.model_dump())
+
     # Obtiene el usuario desde el token (usa la función que ya tienes)
     user = get_user_from_token(db, token)
     if not user:
         raise HTTPException(
             status_code=401, detail="Token inválido o expirado")
 
-    s = roulette_service.get_session(db, session_id)
+    s = roulette_service.get_session_meta(db, session_id)
     if not s:
         raise HTTPException(status_code=404, detail="session not found")
     if s.revealed:
         raise HTTPException(status_code=400, detail="session already revealed")
     try:
         result = roulette_service.create_bet(
-            db, s, user.username, payload.bet, payload.client_seed)
+            db, s, user.username, bet, payload.client_seed)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    # el servicio trabaja en centavos
+    result["bet_result"]["payout"] = to_major(result["bet_result"]["payout"])
+    for key in ("saldo", "ganancias_totales", "perdidas_totales"):
+        result["user"][key] = to_major(result["user"][key])
+    result["rotation"] = roulette_service.rotate_if_due(db, s)
     return result
 
 
@@ -139,9 +208,24 @@ def reveal(session_id: int, authorization: Optional[str] = Header(None), db: Ses
     return RevealResp(session_id=s.id, server_seed=seed, server_seed_hash=s.server_seed_hash, revealed=True)
 
 
+@router.post("/verify")
+def verify(payload: VerifyReq):
+    # recalcula los resultados de un seed ya revelado (no toca la DB)
+    try:
+        bytes.fromhex(payload.server_seed)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="server_seed must be hex")
+    outcomes = roulette_service.derive_outcomes(
+        payload.server_seed, payload.client_seed, payload.nonce_start, payload.count, cache=False)
+    return {
+        "server_seed_hash": roulette_service.hash_server_seed(payload.server_seed),
+        "outcomes": outcomes
+    }
+
+
 @router.get("/session/{session_id}/spins")
 def list_spins(session_id: int, db: Session = Depends(get_session)):
-    s = roulette_service.get_session(db, session_id)
+    s = roulette_service.get_session_meta(db, session_id)
     if not s:
         raise HTTPException(status_code=404, detail="session not found")
     spins = roulette_service.list_spins(db, s)
@@ -152,8 +236,8 @@ def list_spins(session_id: int, db: Session = Depends(get_session)):
         "pocket": spin.pocket,
         "color": spin.color,
         "bet_type": spin.bet_type,
-        "bet_amount": spin.bet_amount,
-        "payout": spin.payout,
+        "bet_amount": to_major(spin.bet_amount),
+        "payout": to_major(spin.payout),
         "timestamp": spin.timestamp.isoformat()
     } for spin in spins], "revealed": s.revealed}
 
@@ -168,8 +252,10 @@ def deposit(payload: DepositReq, token: str = Depends(oauth2_scheme), db: Sessio
             status_code=401, detail="Token inválido o expirado")
     if payload.amount <= 0:
         raise HTTPException(status_code=400, detail="Cantidad inválida")
-    user.saldo = (user.saldo or 0.0) + float(payload.amount)
+    user.saldo = (user.saldo or 0) + payload.amount
     db.add(user)
+    record_activity(db, user.id, "deposit", amount=payload.amount, payout=payload.amount)
     db.commit()
     db.refresh(user)
-    return {"id": user.id, "username": user.username, "saldo": user.saldo}
+    balance_changed(user, "deposit", amount=payload.amount)
+    return {"id": user.id, "username": user.username, "saldo": to_major(user.saldo)}
@@ -1,13 +1,23 @@
 # app/roulette/service.py
-import secrets
-import hashlib
-import hmac
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, FrozenSet, NamedTuple, Union
 from datetime import datetime, timezone
 
 from sqlmodel import Session, select
 from app.model import RouletteSession, Spin, User
+from app.games import compact, group_commit, provably_fair, rotation, session_cache
+from app.games.session_cache import SessionMeta
+from app.realtime.hub import balance_changed
+from app.users.activity import record_activity
+from app.leaderboards import service as leaderboard_service
+from app.analytics import rollups
+from app.analytics.monitor import monitor
+from app.games.provably_fair import (  # re-exportados por compatibilidad
+    generate_server_seed,
+    hash_server_seed,
+    hmac_sha256_hex,
+    derive_integer_from_hex,
+)
 
 # --- wheel & colors (EUROPEAN only) ---
 EUROPEAN_POCKETS = list(range(0, 37))
@@ -26,19 +36,24 @@ def pocket_color(pocket) -> str:
     return "unknown"
 
 # ---- provably fair helpers ----
-def generate_server_seed() -> str:
-    return secrets.token_hex(32)
-
-def hash_server_seed(server_seed: str) -> str:
-    return hashlib.sha256(server_seed.encode()).hexdigest()
-
-def hmac_sha256_hex(key_hex: str, message: str) -> str:
-    key = bytes.fromhex(key_hex)
-    hm = hmac.new(key, message.encode(), hashlib.sha256)
-    return hm.hexdigest()
+def pocket_from_hmac(hmac_hex: str) -> int:
+    number = derive_integer_from_hex(hmac_hex)
+    return EUROPEAN_POCKETS[number % len(EUROPEAN_POCKETS)]
 
-def derive_integer_from_hex(hexstr: str) -> int:
-    return int(hexstr, 16)
+def derive_outcomes(server_seed: str, client_seed: str, nonce_start: int, count: int,
+                    cache: bool = True) -> List[Dict[str, Any]]:
+    """Resultados (nonce, hmac, pocket, color) para un rango de nonces."""
+    hexes = provably_fair.derive_batch(server_seed, client_seed, nonce_start, count, cache=cache)
+    out = []
+    for i, hmac_hex in enumerate(hexes):
+        pocket = pocket_from_hmac(hmac_hex)
+        out.append({
+            "nonce": nonce_start + i,
+            "hmac_hex": hmac_hex,
+            "pocket": pocket,
+            "color": pocket_color(pocket),
+        })
+    return out
 
 # ---- DB operations (public API expected by routes) ----
 def create_session(db: Session) -> RouletteSession:
@@ -52,22 +67,24 @@ def create_session(db: Session) -> RouletteSession:
     db.add(session)
     db.commit()
     db.refresh(session)
+    session_cache.put("roulette", session)
     return session
 
 def get_session(db: Session, session_id: int) -> Optional[RouletteSession]:
     statement = select(RouletteSession).where(RouletteSession.id == session_id)
     return db.exec(statement).one_or_none()
 
-def create_spin(db: Session, session: RouletteSession, client_seed: str) -> Spin:
-    if session.revealed:
-        raise ValueError("Session already revealed")
+def get_session_meta(db: Session, session_id: int) -> Optional[SessionMeta]:
+    """Metadata inmutable de la sesión desde la cache en proceso (SELECT solo en miss)"""
+    return session_cache.get(db, RouletteSession, "roulette", session_id)
 
-    nonce = session.nonce
-    message = f"{client_seed}:{nonce}"
-    hmac_hex = hmac_sha256_hex(session.server_seed, message)
-    number = derive_integer_from_hex(hmac_hex)
-    index = number % len(EUROPEAN_POCKETS)
-    pocket = EUROPEAN_POCKETS[index]
+def _build_spin(db: Session, session: SessionMeta, client_seed: str) -> Spin:
+    # reserva el nonce y calcula el resultado; no hace commit del giro
+    # (el client seed se interna antes: su alta se confirma aparte)
+    seed_id = compact.intern_client_seed(db, session, client_seed) if compact.enabled() else None
+    nonce = session_cache.next_nonce(db, RouletteSession, session)
+    hmac_hex = provably_fair.spin_hmac_hex(session.server_seed, client_seed, nonce)
+    pocket = pocket_from_hmac(hmac_hex)
     color = pocket_color(pocket)
 
     spin = Spin(
@@ -79,26 +96,39 @@ def create_spin(db: Session, session: RouletteSession, client_seed: str) -> Spin
         color=color,
         timestamp=datetime.now(timezone.utc)
     )
+    if seed_id is not None:
+        compact.strip(spin, seed_id)
+        spin.color = ""  # sale de pocket
+    return spin
+
+def create_spin(db: Session, session: SessionMeta, client_seed: str) -> Spin:
+    if session.revealed:
+        raise ValueError("Session already revealed")
 
+    spin = _build_spin(db, session, client_seed)
+    session_cache.ensure_open(db, RouletteSession, session)
     db.add(spin)
-    session.nonce += 1
-    db.add(session)
     db.commit()
     db.refresh(spin)
-    db.refresh(session)
-    return spin
+    return compact.hydrate(db, "roulette", spin)
 
-def list_spins(db: Session, session: RouletteSession):
+def list_spins(db: Session, session: SessionMeta):
     statement = select(Spin).where(Spin.session_id == session.id).order_by(Spin.nonce)
-    return db.exec(statement).all()
+    return [compact.hydrate(db, "roulette", spin) for spin in db.exec(statement).all()]
 
 def reveal_session_seed(db: Session, session: RouletteSession):
     session.revealed = True
     db.add(session)
     db.commit()
     db.refresh(session)
+    provably_fair.forget(session.server_seed)
+    session_cache.invalidate("roulette", session.id)
     return session.server_seed
 
+def rotate_if_due(db: Session, session: SessionMeta) -> Optional[Dict[str, Any]]:
+    """Tras un giro: revela la sesión y abre otra si cumplió la política de rotación"""
+    return rotation.rotate_if_due(db, "roulette", session, create_session)
+
 # ---- EVALUATE BETS (same rules as earlier) ----
 PAYOUTS = {
     "straight": 35,
@@ -113,71 +143,76 @@ col1 = {1,4,7,10,13,16,19,22,25,28,31,34}
 col2 = {2,5,8,11,14,17,20,23,26,29,32,35}
 col3 = {3,6,9,12,15,18,21,24,27,30,33,36}
 
-def evaluate_bet(bet: Dict[str,Any], spin: Spin) -> (bool, float):
-    pocket = spin.pocket
-    amount = float(bet.get("amount", 0))
+# pockets ganadores por (tipo, selección), calculados una sola vez
+WINNING_POCKETS: Dict[Tuple[str, Any], FrozenSet[int]] = {
+    **{("straight", n): frozenset({n}) for n in EUROPEAN_POCKETS},
+    ("color", "red"): frozenset(RED_NUMS),
+    ("color", "black"): frozenset(BLACK_NUMS),
+    ("odd_even", "odd"): frozenset(n for n in range(1, 37) if n % 2 == 1),
+    ("odd_even", "even"): frozenset(n for n in range(1, 37) if n % 2 == 0),
+    ("low_high", "low"): frozenset(range(1, 19)),
+    ("low_high", "high"): frozenset(range(19, 37)),
+    ("dozen", 1): frozenset(range(1, 13)),
+    ("dozen", 2): frozenset(range(13, 25)),
+    ("dozen", 3): frozenset(range(25, 37)),
+    ("column", 1): frozenset(col1),
+    ("column", 2): frozenset(col2),
+    ("column", 3): frozenset(col3),
+}
+
+# campo del payload que elige la apuesta dentro de cada tipo
+BET_SELECTION_FIELD = {
+    "straight": "number",
+    "color": "side",
+    "odd_even": "side",
+    "low_high": "side",
+    "dozen": "which",
+    "column": "which",
+}
+
+
+class CompiledBet(NamedTuple):
+    """Apuesta ya validada, lista para evaluar con un lookup"""
+    type: str
+    amount: int                # centavos
+    winners: FrozenSet[int]
+    multiplier: int
+    payload: Dict[str, Any]  # lo que se guarda en spin.bet_payload (sin amount)
+
+
+def compile_bet(bet: Dict[str, Any]) -> CompiledBet:
+    # amount ya viene en centavos (app.money)
     t = bet.get("type")
-    if t == "straight":
-        target = bet["number"]
-        if pocket == target:
-            return True, amount * PAYOUTS["straight"]
-        else:
-            return False, -amount
-    if t == "color":
-        side = bet["side"].lower()
-        if pocket == 0:
-            return False, -amount
-        if pocket_color(pocket) == side:
-            return True, amount * PAYOUTS["color"]
-        else:
-            return False, -amount
-    if t == "odd_even":
-        side = bet["side"].lower()
-        if pocket == 0:
-            return False, -amount
-        if side == "odd" and (int(pocket) % 2 == 1):
-            return True, amount * PAYOUTS["odd_even"]
-        if side == "even" and (int(pocket) % 2 == 0):
-            return True, amount * PAYOUTS["odd_even"]
-        return False, -amount
-    if t == "low_high":
-        side = bet["side"].lower()
-        if pocket == 0:
-            return False, -amount
-        n = int(pocket)
-        if side == "low" and 1 <= n <= 18:
-            return True, amount * PAYOUTS["low_high"]
-        if side == "high" and 19 <= n <= 36:
-            return True, amount * PAYOUTS["low_high"]
-        return False, -amount
-    if t == "dozen":
-        which = int(bet["which"])
-        if pocket == 0:
-            return False, -amount
-        n = int(pocket)
-        if which == 1 and 1 <= n <= 12:
-            return True, amount * PAYOUTS["dozen"]
-        if which == 2 and 13 <= n <= 24:
-            return True, amount * PAYOUTS["dozen"]
-        if which == 3 and 25 <= n <= 36:
-            return True, amount * PAYOUTS["dozen"]
-        return False, -amount
-    if t == "column":
-        which = int(bet["which"])
-        if pocket == 0:
-            return False, -amount
-        n = int(pocket)
-        if which == 1 and n in col1:
-            return True, amount * PAYOUTS["column"]
-        if which == 2 and n in col2:
-            return True, amount * PAYOUTS["column"]
-        if which == 3 and n in col3:
-            return True, amount * PAYOUTS["column"]
-        return False, -amount
-    raise ValueError("Unsupported bet type")
+    field = BET_SELECTION_FIELD.get(t)
+    if field is None:
+        raise ValueError("Unsupported bet type")
+    if field not in bet:
+        raise ValueError(f"Missing field '{field}' for {t} bet")
+    value = bet[field]
+    try:
+        value = value.lower() if field == "side" else int(value)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"Invalid {field} for {t} bet")
+    winners = WINNING_POCKETS.get((t, value))
+    if winners is None:
+        raise ValueError(f"Invalid {field} for {t} bet")
+    # solo centavos enteros: un float (p.ej. 150.7 en unidades mayores) no se trunca
+    amount = bet.get("amount", 0)
+    if not isinstance(amount, int) or isinstance(amount, bool):
+        raise ValueError("amount must be an integer number of cents")
+    payload = {k: v for k, v in bet.items() if k != "amount"}
+    payload[field] = value
+    return CompiledBet(t, amount, winners, PAYOUTS[t], payload)
+
+
+def evaluate_compiled(bet: CompiledBet, pocket: int) -> Tuple[bool, int]:
+    if pocket in bet.winners:
+        return True, bet.amount * bet.multiplier
+    return False, -bet.amount
+
 
 # ---- CREATE A BET (atomic-ish: create spin -> evaluate -> update user & spin) ----
-def create_bet(db: Session, session: RouletteSession, username: str, bet: Dict[str,Any], client_seed: str):
+def create_bet(db: Session, session: SessionMeta, username: str, bet: Union[CompiledBet, Dict[str,Any]], client_seed: str):
     """
     1) check session exists & not revealed
     2) find user by username
@@ -188,49 +223,70 @@ def create_bet(db: Session, session: RouletteSession, username: str, bet: Dict[s
     if session.revealed:
         raise ValueError("Session already revealed")
 
+    # validar la apuesta antes de tocar la DB
+    if not isinstance(bet, CompiledBet):
+        bet = compile_bet(bet)
+    amount = bet.amount
+    if amount <= 0:
+        raise ValueError("Invalid amount")
+
     # get user
     stmt = select(User).where(User.username == username)
     user = db.exec(stmt).one_or_none()
     if not user:
         raise ValueError("User not found")
 
-    amount = float(bet.get("amount", 0))
-    if amount <= 0:
-        raise ValueError("Invalid amount")
-
     if user.saldo < amount:
         raise ValueError("Insufficient balance")
 
     # create spin
-    spin = create_spin(db, session, client_seed)
+    spin = _build_spin(db, session, client_seed)
 
     # evaluate
-    won, payout = evaluate_bet(bet, spin)  # payout is net (positive if win, negative stake if lose)
-
-    # update user balances and stats
-    # payout ya incluye la ganancia o pérdida completa
-    # Si gana: payout = cantidad ganada (ej: 100 apostado -> payout = 100 ganado)
-    # Si pierde: payout = -cantidad apostada (ej: 100 apostado -> payout = -100)
-    user.saldo += payout
-    
-    # update statistics
-    if payout > 0:
-        user.ganancias_totales = (user.ganancias_totales or 0) + payout
-    else:
-        user.perdidas_totales = (user.perdidas_totales or 0) + (-payout)
+    won, payout = evaluate_compiled(bet, spin.pocket)  # payout is net (positive if win, negative stake if lose)
 
     # attach bet data to spin
     spin.user_id = user.id
-    spin.bet_type = bet.get("type")
-    spin.bet_payload = json.dumps({k: v for k, v in bet.items() if k != "amount"})
+    spin.bet_type = bet.type
+    spin.bet_payload = json.dumps(bet.payload)
     spin.bet_amount = amount
     spin.payout = payout
 
-    db.add(user)
-    db.add(spin)
-    db.commit()
-    db.refresh(user)
-    db.refresh(spin)
+    def settle(tx: Session):
+        # con group commit corre en la sesión del committer: el saldo se relee ahí
+        session_cache.ensure_open(tx, RouletteSession, session, nonce_in_tx=tx is db)
+        u = tx.get(User, spin.user_id)
+        if u.saldo < amount:
+            raise ValueError("Insufficient balance")
+
+        # update user balances and stats
+        # payout ya incluye la ganancia o pérdida completa
+        # Si gana: payout = cantidad ganada (ej: 100 apostado -> payout = 100 ganado)
+        # Si pierde: payout = -cantidad apostada (ej: 100 apostado -> payout = -100)
+        u.saldo += payout
+
+        # update statistics
+        if payout > 0:
+            u.ganancias_totales = (u.ganancias_totales or 0) + payout
+        else:
+            u.perdidas_totales = (u.perdidas_totales or 0) + (-payout)
+
+        tx.add(u)
+        tx.add(spin)
+        tx.flush()
+        record_activity(
+            tx, u.id, "roulette_bet", amount=amount, payout=payout, game="roulette",
+            ref_id=spin.id, created_at=spin.timestamp,
+            detail={"pocket": spin.pocket, "color": pocket_color(spin.pocket), "bet_type": spin.bet_type})
+        return u
+
+    user = group_commit.run(db, settle)
+    compact.hydrate(db, "roulette", spin)
+    balance_changed(user, "bet_settled", game="roulette", bet_amount=amount, payout=payout)
+    leaderboard_service.record_win(user, payout)
+    paid_out = rollups.roulette_paid_out(amount, payout)
+    rollups.record_bet("roulette", user.id, amount, paid_out, spin.timestamp)
+    monitor.observe("roulette", user.id, amount, paid_out)
 
     return {
         "spin": {
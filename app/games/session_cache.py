@@ -0,0 +1,149 @@
+# app/games/session_cache.py
+"""
+Cache en proceso (LRU) de la metadata de sesiones de ruleta y slots.
+
+server_seed, server_seed_hash y created_at no cambian nunca, y revealed solo pasa
+de False a True (se invalida al revelar). Con esto cada giro deja de hacer el
+SELECT de la sesión.
+
+El nonce se reparte con "leases": un UPDATE ... SET nonce = nonce + N WHERE
+revealed = false reserva N nonces de una vez y se confirma enseguida, así dos
+procesos nunca usan el mismo nonce. La columna nonce de la sesión pasa a ser el
+tope reservado (no la cantidad de giros); cada giro guarda su propio nonce.
+Con N = 1 el UPDATE va dentro de la transacción del giro (sin commit extra).
+
+Un lease no vuelve a mirar `revealed`: otro proceso puede revelar la sesión
+mientras este todavía tiene nonces reservados. Por eso, cuando el nonce no se
+reservó en la misma transacción que guarda el giro (N > 1, o group commit),
+ensure_open() repite el UPDATE condicional ahí: si la sesión ya se reveló el giro
+no se escribe, y si el giro toma el lock primero el reveal espera a que termine.
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from app import config
+
+
+@dataclass
+class SessionMeta:
+    game: str
+    id: int
+    server_seed: str
+    server_seed_hash: str
+    created_at: datetime
+    revealed: bool = False
+    next_nonce: int = 0
+    lease_end: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    # client seed -> id de ClientSeed (modo compacto, app.games.compact)
+    client_seeds: Dict[str, int] = field(default_factory=dict, repr=False, compare=False)
+
+
+_lock = threading.Lock()
+_cache: "OrderedDict[Tuple[str, int], SessionMeta]" = OrderedDict()
+
+
+def _meta_from_row(game: str, row) -> SessionMeta:
+    return SessionMeta(
+        game=game,
+        id=row.id,
+        server_seed=row.server_seed,
+        server_seed_hash=row.server_seed_hash,
+        created_at=row.created_at,
+        revealed=row.revealed,
+        next_nonce=row.nonce,
+        lease_end=row.nonce,
+    )
+
+
+def put(game: str, row) -> SessionMeta:
+    meta = _meta_from_row(game, row)
+    with _lock:
+        _cache[(game, meta.id)] = meta
+        _cache.move_to_end((game, meta.id))
+        while len(_cache) > config.SESSION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return meta
+
+
+def get(db: Session, model, game: str, session_id: int) -> Optional[SessionMeta]:
+    with _lock:
+        meta = _cache.get((game, session_id))
+        if meta is not None:
+            _cache.move_to_end((game, session_id))
+            return meta
+    row = db.exec(select(model).where(model.id == session_id)).one_or_none()
+    if row is None:
+        return None
+    return put(game, row)
+
+
+def invalidate(game: str, session_id: int) -> None:
+    with _lock:
+        meta = _cache.pop((game, session_id), None)
+    if meta is not None:
+        meta.revealed = True
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
+
+
+def next_nonce(db: Session, model, meta: SessionMeta) -> int:
+    """Siguiente nonce de la sesión; pide un lease nuevo a la DB cuando se agota"""
+    with meta.lock:
+        if meta.revealed:
+            raise ValueError("Session already revealed")
+        if meta.next_nonce >= meta.lease_end:
+            lease = max(1, config.SESSION_NONCE_LEASE)
+            stmt = (
+                update(model)
+                .where(model.id == meta.id, model.revealed == False)  # noqa: E712
+                .values(nonce=model.nonce + lease)
+                .execution_options(synchronize_session=False)
+            )
+            if db.get_bind().dialect.update_returning:
+                new_end = db.exec(stmt.returning(model.nonce)).scalar_one_or_none()
+            else:
+                result = db.exec(stmt)
+                new_end = None
+                if result.rowcount:
+                    new_end = db.exec(select(model.nonce).where(model.id == meta.id)).one()
+            if new_end is None:
+                db.rollback()
+                invalidate(meta.game, meta.id)
+                raise ValueError("Session already revealed")
+            if lease > 1:
+                # el lease se confirma aparte para que sobreviva a un rollback del giro
+                db.commit()
+            meta.next_nonce = new_end - lease
+            meta.lease_end = new_end
+        nonce = meta.next_nonce
+        meta.next_nonce += 1
+        return nonce
+
+
+def ensure_open(db: Session, model, meta: SessionMeta, nonce_in_tx: bool = True) -> None:
+    """
+    Comprueba en la transacción del giro (sin commit) que la sesión sigue sin
+    revelar. Con lease 1 y el nonce reservado en esa misma transacción no hace
+    falta: el UPDATE de next_nonce ya lo comprobó.
+    """
+    if nonce_in_tx and config.SESSION_NONCE_LEASE <= 1:
+        return
+    result = db.exec(
+        update(model)
+        .where(model.id == meta.id, model.revealed == False)  # noqa: E712
+        .values(nonce=model.nonce)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        invalidate(meta.game, meta.id)
+        raise ValueError("Session already revealed")
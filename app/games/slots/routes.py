@@ -1,6 +1,6 @@
 # app/games/slots/routes.py
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import BaseModel, Field
 from typing import Optional
 import json
 
@@ -11,11 +11,14 @@ from app.database import get_session
 from app.games.slots import service as slot_service
 from app.model import SlotSession, SlotSpin, User
 from app.auth.services import get_user_from_token
+from app.money import Money, to_major
 
 router = APIRouter(prefix="/v1/slots", tags=["slots"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+HASH_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 
 # ---- Request/Response Models ----
 
@@ -26,7 +29,7 @@ class CreateSessionResp(BaseModel):
 
 class SpinReq(BaseModel):
     client_seed: str
-    bet_amount: float
+    bet_amount: Money
     lines: Optional[int] = 1
 
 
@@ -39,11 +42,17 @@ class SpinResp(BaseModel):
     multiplier: float
     hmac_hex: str
     server_seed_hash: str
+    rotation: Optional[dict] = None  # sesión revelada + la siguiente, si tocó rotar
+
+
+class SlotBet(BaseModel):
+    amount: Money = Field(gt=0)
+    lines: int = Field(1, ge=1)
 
 
 class BetReq(BaseModel):
     client_seed: str
-    bet: dict  # {"amount": float, "lines": int (opcional)}
+    bet: SlotBet
 
 
 class BetResp(BaseModel):
@@ -53,6 +62,7 @@ class BetResp(BaseModel):
     spin: dict
     bet_result: dict
     user: dict
+    rotation: Optional[dict] = None
 
 
 class BalanceResp(BaseModel):
@@ -68,10 +78,17 @@ class StatsResp(BaseModel):
 
 class TestBetReq(BaseModel):
     client_seed: str
-    bet: dict
+    bet: SlotBet
     force_symbols: Optional[list] = None  # Para testing: ["🍒", "🍒", "🍒"]
 
 
+class VerifyReq(BaseModel):
+    server_seed: str
+    client_seed: str
+    nonce_start: int = Field(0, ge=0)
+    count: int = Field(1, ge=1, le=1000)
+
+
 # ---- Endpoints ----
 
 @router.post("/session", response_model=CreateSessionResp)
@@ -88,15 +105,17 @@ def create_session(db: Session = Depends(get_session)):
 
 
 @router.get("/session/{session_id}/hash")
-def get_session_hash(session_id: int, db: Session = Depends(get_session)):
+def get_session_hash(session_id: int, response: Response, db: Session = Depends(get_session)):
     """
     2. Obtener Hash de Sesión
     Obtiene el hash de la sesión para verificación
     """
-    session = slot_service.get_session(db, session_id)
+    session = slot_service.get_session_meta(db, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    # el hash de una sesión nunca cambia
+    response.headers["Cache-Control"] = HASH_CACHE_CONTROL
     return {
         "session_id": session.id,
         "server_seed_hash": session.server_seed_hash
@@ -113,7 +132,7 @@ def spin(
     3. Girar (Spin)
     Realiza un giro del tragamonedas sin autenticación
     """
-    session = slot_service.get_session(db, session_id)
+    session = slot_service.get_session_meta(db, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -140,10 +159,11 @@ def spin(
         nonce=spin.nonce,
         result=result,
         symbols=symbols,
-        win_amount=spin.win_amount,
+        win_amount=to_major(spin.win_amount),
         multiplier=spin.multiplier,
         hmac_hex=spin.hmac_hex,
-        server_seed_hash=session.server_seed_hash
+        server_seed_hash=session.server_seed_hash,
+        rotation=slot_service.rotate_if_due(db, session)
     )
 
 
@@ -164,7 +184,7 @@ def place_bet(
         raise HTTPException(status_code=401, detail="Invalid token")
     
     # Obtener sesión
-    session = slot_service.get_session(db, session_id)
+    session = slot_service.get_session_meta(db, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -172,8 +192,8 @@ def place_bet(
         raise HTTPException(status_code=400, detail="Session already revealed")
     
     # Extraer datos de la apuesta
-    bet_amount = float(payload.bet.get("amount", 0))
-    lines = int(payload.bet.get("lines", 1))
+    bet_amount = payload.bet.amount
+    lines = payload.bet.lines
     
     # Validar saldo
     total_bet = bet_amount * lines
@@ -181,23 +201,14 @@ def place_bet(
         raise HTTPException(status_code=400, detail="Insufficient balance")
     
     try:
-        # Realizar el spin
-        spin = slot_service.create_spin(
+        # Realizar el spin y actualizar el saldo en una sola transacción
+        spin, user = slot_service.settle_bet(
             db=db,
             session=session,
+            user_id=user.id,
             client_seed=payload.client_seed,
             bet_amount=bet_amount,
-            lines=lines,
-            user_id=user.id
-        )
-        
-        # Actualizar saldo del usuario
-        # Pasar total_bet y win_amount para actualización correcta
-        user = slot_service.update_user_balance_with_bet(
-            db=db,
-            user_id=user.id,
-            bet_amount=total_bet,
-            win_amount=spin.win_amount
+            lines=lines
         )
         balance_change = spin.win_amount - total_bet
         
@@ -211,33 +222,57 @@ def place_bet(
     return BetResp(
         success=True,
         message=f"You {'won' if result == 'win' else 'lost'}!",
-        balance=user.saldo,
+        balance=to_major(user.saldo),
         spin={
             "session_id": session.id,
             "nonce": spin.nonce,
             "symbols": symbols,
             "multiplier": spin.multiplier,
-            "win_amount": spin.win_amount,
+            "win_amount": to_major(spin.win_amount),
             "hmac_hex": spin.hmac_hex,
             "result": result
         },
         bet_result={
-            "amount": bet_amount,
+            "amount": to_major(bet_amount),
             "lines": lines,
-            "total_bet": total_bet,
-            "win": spin.win_amount,
-            "net": balance_change
+            "total_bet": to_major(total_bet),
+            "win": to_major(spin.win_amount),
+            "net": to_major(balance_change)
         },
         user={
             "id": user.id,
             "username": user.username,
-            "saldo": user.saldo,
-            "ganancias_totales": user.ganancias_totales,
-            "perdidas_totales": user.perdidas_totales
-        }
+            "saldo": to_major(user.saldo),
+            "ganancias_totales": to_major(user.ganancias_totales),
+            "perdidas_totales": to_major(user.perdidas_totales)
+        },
+        rotation=slot_service.rotate_if_due(db, session)
     )
 
 
+@router.post("/verify")
+def verify(payload: VerifyReq):
+    """
+    5. Verificar
+    Recalcula los resultados de un server seed ya revelado para un rango de nonces
+    """
+    try:
+        bytes.fromhex(payload.server_seed)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="server_seed must be hex")
+    outcomes = slot_service.derive_outcomes(
+        payload.server_seed,
+        payload.client_seed,
+        payload.nonce_start,
+        payload.count,
+        cache=False
+    )
+    return {
+        "server_seed_hash": slot_service.hash_server_seed(payload.server_seed),
+        "outcomes": outcomes
+    }
+
+
 @router.get("/stats", response_model=StatsResp)
 def get_stats(
     token: str = Depends(oauth2_scheme),
@@ -253,7 +288,12 @@ def get_stats(
     
     stats = slot_service.get_user_stats(db, user.id)
     
-    return StatsResp(**stats)
+    return StatsResp(
+        total_spins=stats["total_spins"],
+        total_won=to_major(stats["total_won"]),
+        total_lost=to_major(stats["total_lost"]),
+        biggest_win=to_major(stats["biggest_win"])
+    )
 
 
 # ========== ENDPOINT DE TESTING (BORRAR EN PRODUCCIÓN) ==========
@@ -272,12 +312,12 @@ def test_bet(
     if not user:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    session = slot_service.get_session(db, session_id)
+    session = slot_service.get_session_meta(db, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    bet_amount = float(payload.bet.get("amount", 0))
-    lines = int(payload.bet.get("lines", 1))
+    bet_amount = payload.bet.amount
+    lines = payload.bet.lines
     total_bet = bet_amount * lines
     
     if user.saldo < total_bet:
@@ -285,22 +325,15 @@ def test_bet(
     
     # Usar función de testing que permite forzar símbolos
     try:
-        spin = slot_service.create_test_spin(
+        spin, user = slot_service.settle_bet(
             db=db,
             session=session,
+            user_id=user.id,
             client_seed=payload.client_seed,
             bet_amount=bet_amount,
             lines=lines,
-            user_id=user.id,
             forced_symbols=payload.force_symbols  # Forzar símbolos si se proporcionan
         )
-        
-        user = slot_service.update_user_balance_with_bet(
-            db=db,
-            user_id=user.id,
-            bet_amount=total_bet,
-            win_amount=spin.win_amount
-        )
         balance_change = spin.win_amount - total_bet
         
     except ValueError as e:
@@ -312,29 +345,30 @@ def test_bet(
     return BetResp(
         success=True,
         message=f"TEST MODE - You {'won' if result == 'win' else 'lost'}!",
-        balance=user.saldo,
+        balance=to_major(user.saldo),
         spin={
             "session_id": session.id,
             "nonce": spin.nonce,
             "symbols": symbols,
             "multiplier": spin.multiplier,
-            "win_amount": spin.win_amount,
+            "win_amount": to_major(spin.win_amount),
             "hmac_hex": spin.hmac_hex,
             "result": result
         },
         bet_result={
-            "amount": bet_amount,
+            "amount": to_major(bet_amount),
             "lines": lines,
-            "total_bet": total_bet,
-            "win": spin.win_amount,
-            "net": balance_change
+            "total_bet": to_major(total_bet),
+            "win": to_major(spin.win_amount),
+            "net": to_major(balance_change)
         },
         user={
             "id": user.id,
             "username": user.username,
-            "saldo": user.saldo,
-            "ganancias_totales": user.ganancias_totales,
-            "perdidas_totales": user.perdidas_totales
-        }
+            "saldo": to_major(user.saldo),
+            "ganancias_totales": to_major(user.ganancias_totales),
+            "perdidas_totales": to_major(user.perdidas_totales)
+        },
+        rotation=slot_service.rotate_if_due(db, session)
     )
 
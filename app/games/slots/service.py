@@ -1,13 +1,23 @@
 # app/games/slots/service.py
-import secrets
-import hashlib
-import hmac
 import json
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timezone
 
 from sqlmodel import Session, select, func
 from app.model import SlotSession, SlotSpin, User
+from app.games import archive, compact, group_commit, provably_fair, rotation, session_cache
+from app.games.session_cache import SessionMeta
+from app.realtime.hub import balance_changed
+from app.users.activity import record_activity
+from app.leaderboards import service as leaderboard_service
+from app.analytics import rollups
+from app.analytics.monitor import monitor
+from app.money import scale, to_major
+from app.games.provably_fair import (  # re-exportados por compatibilidad
+    generate_server_seed,
+    hash_server_seed,
+    hmac_sha256_hex,
+)
 
 # --- Símbolos y multiplicadores ---
 SLOT_SYMBOLS = ["🍒", "🍋", "🍊", "🍇", "💎", "⭐", "7️⃣"]
@@ -24,23 +34,6 @@ SYMBOL_PAYOUTS = {
 }
 
 # ---- Provably fair helpers ----
-def generate_server_seed() -> str:
-    """Genera un seed aleatorio del servidor"""
-    return secrets.token_hex(32)
-
-
-def hash_server_seed(server_seed: str) -> str:
-    """Genera el hash SHA-256 del server seed"""
-    return hashlib.sha256(server_seed.encode()).hexdigest()
-
-
-def hmac_sha256_hex(key_hex: str, message: str) -> str:
-    """Genera HMAC-SHA256 en hexadecimal"""
-    key = bytes.fromhex(key_hex)
-    hm = hmac.new(key, message.encode(), hashlib.sha256)
-    return hm.hexdigest()
-
-
 def derive_symbols_from_hmac(hmac_hex: str, num_reels: int = 3) -> List[str]:
     """
     Deriva símbolos de forma determinística desde el HMAC.
@@ -57,22 +50,51 @@ def derive_symbols_from_hmac(hmac_hex: str, num_reels: int = 3) -> List[str]:
     return symbols
 
 
-def calculate_multiplier(symbols: List[str]) -> float:
+def calculate_multiplier(symbols: List[str], payouts: Optional[Dict[str, float]] = None) -> float:
     """
     Calcula el multiplicador basado en los símbolos obtenidos.
-    Si los 3 símbolos coinciden, aplica el pago de SYMBOL_PAYOUTS.
+    Si los 3 símbolos coinciden, aplica el pago de SYMBOL_PAYOUTS
+    (u otro paytable, p.ej. un candidato en app.analytics.replay).
     """
     if len(symbols) != 3:
         return 0.0
     
     # Verificar si todos los símbolos son iguales
     if symbols[0] == symbols[1] == symbols[2]:
-        return SYMBOL_PAYOUTS.get(symbols[0], 0.0)
+        return (SYMBOL_PAYOUTS if payouts is None else payouts).get(symbols[0], 0.0)
     
     # No hay coincidencia
     return 0.0
 
 
+def derive_outcomes(
+    server_seed: str,
+    client_seed: str,
+    nonce_start: int,
+    count: int,
+    cache: bool = True
+) -> List[Dict[str, Any]]:
+    """Resultados (nonce, hmac, símbolos, multiplicador) para un rango de nonces"""
+    hexes = provably_fair.derive_batch(server_seed, client_seed, nonce_start, count, cache=cache)
+    out = []
+    for i, hmac_hex in enumerate(hexes):
+        symbols = derive_symbols_from_hmac(hmac_hex)
+        out.append({
+            "nonce": nonce_start + i,
+            "hmac_hex": hmac_hex,
+            "symbols": symbols,
+            "multiplier": calculate_multiplier(symbols),
+        })
+    return out
+
+
+def spin_symbols(spin: SlotSpin) -> List[str]:
+    """Símbolos del spin, esté en formato completo o compacto"""
+    if spin.symbols:
+        return json.loads(spin.symbols)
+    return compact.unpack_symbols(spin.symbol_code, SLOT_SYMBOLS)
+
+
 # ---- DB operations ----
 def create_session(db: Session) -> SlotSession:
     """Crea una nueva sesión de slot machine"""
@@ -86,6 +108,7 @@ def create_session(db: Session) -> SlotSession:
     db.add(session)
     db.commit()
     db.refresh(session)
+    session_cache.put("slots", session)
     return session
 
 
@@ -95,34 +118,44 @@ def get_session(db: Session, session_id: int) -> Optional[SlotSession]:
     return db.exec(statement).one_or_none()
 
 
-def create_spin(
+def get_session_meta(db: Session, session_id: int) -> Optional[SessionMeta]:
+    """Metadata inmutable de la sesión desde la cache en proceso (SELECT solo en miss)"""
+    return session_cache.get(db, SlotSession, "slots", session_id)
+
+
+def _build_spin(
     db: Session,
-    session: SlotSession,
+    session: SessionMeta,
     client_seed: str,
-    bet_amount: float,
+    bet_amount: int,
     lines: int = 1,
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    forced_symbols: Optional[List[str]] = None
 ) -> SlotSpin:
-    """
-    Crea un nuevo spin con sistema provably fair.
-    Calcula símbolos, multiplicador y ganancias.
-    """
+    """Reserva el nonce y calcula el resultado del spin (sin commit)"""
     if session.revealed:
         raise ValueError("Session already revealed")
     
+    # El client seed se interna antes de reservar el nonce (su alta se confirma aparte)
+    seed_id = compact.intern_client_seed(db, session, client_seed) if compact.enabled() else None
+    
     # Generar HMAC usando server seed + client seed + nonce
-    nonce = session.nonce
-    message = f"{client_seed}:{nonce}"
-    hmac_hex = hmac_sha256_hex(session.server_seed, message)
+    nonce = session_cache.next_nonce(db, SlotSession, session)
+    hmac_hex = provably_fair.spin_hmac_hex(session.server_seed, client_seed, nonce)
     
-    # Derivar símbolos del HMAC
-    symbols = derive_symbols_from_hmac(hmac_hex)
+    # Si se fuerzan símbolos, usarlos; sino, derivar del HMAC
+    if forced_symbols and len(forced_symbols) == 3:
+        symbols = forced_symbols
+        print(f"⚠️ TEST MODE: Forzando símbolos: {symbols}")
+    else:
+        symbols = derive_symbols_from_hmac(hmac_hex)
     
     # Calcular multiplicador y ganancia
     multiplier = calculate_multiplier(symbols)
-    win_amount = bet_amount * multiplier * lines if multiplier > 0 else 0.0
+    win_amount = scale(bet_amount * lines, multiplier) if multiplier > 0 else 0
     
-    print(f"🎲 SPIN: Símbolos={symbols} | Multiplicador={multiplier}x | Apuesta=${bet_amount} | Líneas={lines} | Ganancia=${win_amount}")
+    label = "TEST SPIN" if forced_symbols else "SPIN"
+    print(f"🎲 {label}: Símbolos={symbols} | Multiplicador={multiplier}x | Apuesta=${to_major(bet_amount)} | Líneas={lines} | Ganancia=${to_major(win_amount)}")
     
     # Crear registro del spin
     spin = SlotSpin(
@@ -138,76 +171,74 @@ def create_spin(
         win_amount=win_amount,
         timestamp=datetime.now(timezone.utc)
     )
-    
-    db.add(spin)
-    session.nonce += 1
-    db.add(session)
-    db.commit()
-    db.refresh(spin)
-    db.refresh(session)
-    
+    if seed_id is not None:
+        compact.strip(spin, seed_id)
+        # símbolos forzados fuera de SLOT_SYMBOLS quedan como JSON
+        spin.symbol_code = compact.pack_symbols(symbols, SLOT_SYMBOLS)
+        if spin.symbol_code is not None:
+            spin.symbols = ""
     return spin
 
 
-def create_test_spin(
+def create_spin(
     db: Session,
-    session: SlotSession,
+    session: SessionMeta,
     client_seed: str,
-    bet_amount: float,
+    bet_amount: int,
     lines: int = 1,
-    user_id: Optional[int] = None,
-    forced_symbols: Optional[List[str]] = None
+    user_id: Optional[int] = None
 ) -> SlotSpin:
     """
-    FUNCIÓN DE TESTING - Permite forzar símbolos específicos
-    Si forced_symbols es None, funciona como create_spin normal
+    Crea un nuevo spin con sistema provably fair.
+    Calcula símbolos, multiplicador y ganancias.
     """
-    if session.revealed:
-        raise ValueError("Session already revealed")
-    
-    nonce = session.nonce
-    message = f"{client_seed}:{nonce}"
-    hmac_hex = hmac_sha256_hex(session.server_seed, message)
-    
-    # Si se fuerzan símbolos, usarlos; sino, derivar del HMAC
-    if forced_symbols and len(forced_symbols) == 3:
-        symbols = forced_symbols
-        print(f"⚠️ TEST MODE: Forzando símbolos: {symbols}")
-    else:
-        symbols = derive_symbols_from_hmac(hmac_hex)
-    
-    # Calcular multiplicador y ganancia
-    multiplier = calculate_multiplier(symbols)
-    win_amount = bet_amount * multiplier * lines if multiplier > 0 else 0.0
-    
-    print(f"🎲 TEST SPIN: Símbolos={symbols} | Multiplicador={multiplier}x | Apuesta=${bet_amount} | Líneas={lines} | Ganancia=${win_amount}")
-    
-    spin = SlotSpin(
-        session_id=session.id,
-        user_id=user_id,
-        nonce=nonce,
-        client_seed=client_seed,
-        hmac_hex=hmac_hex,
-        symbols=json.dumps(symbols),
-        multiplier=multiplier,
-        bet_amount=bet_amount,
-        lines=lines,
-        win_amount=win_amount,
-        timestamp=datetime.now(timezone.utc)
-    )
-    
+    spin = _build_spin(db, session, client_seed, bet_amount, lines, user_id)
+    session_cache.ensure_open(db, SlotSession, session)
     db.add(spin)
-    session.nonce += 1
-    db.add(session)
     db.commit()
     db.refresh(spin)
-    db.refresh(session)
     
-    return spin
+    return compact.hydrate(db, "slots", spin)
+
+
+def settle_bet(
+    db: Session,
+    session: SessionMeta,
+    user_id: int,
+    client_seed: str,
+    bet_amount: int,
+    lines: int = 1,
+    forced_symbols: Optional[List[str]] = None
+) -> Tuple[SlotSpin, User]:
+    """
+    Gira y liquida la apuesta en una sola transacción (spin + saldo + actividad).
+    Con GROUP_COMMIT_ENABLED la transacción se comparte con otras apuestas concurrentes.
+    """
+    spin = _build_spin(db, session, client_seed, bet_amount, lines, user_id, forced_symbols)
+    total_bet = bet_amount * lines
+    
+    def settle(tx: Session) -> User:
+        session_cache.ensure_open(tx, SlotSession, session, nonce_in_tx=tx is db)
+        user = tx.get(User, user_id)
+        if not user:
+            raise ValueError("User not found")
+        if user.saldo < total_bet:
+            raise ValueError("Insufficient balance")
+        tx.add(spin)
+        tx.flush()
+        return _apply_bet(tx, user, total_bet, spin.win_amount, spin)
+    
+    user = group_commit.run(db, settle)
+    compact.hydrate(db, "slots", spin)
+    balance_changed(user, "bet_settled", game="slots", bet_amount=total_bet, payout=spin.win_amount - total_bet)
+    leaderboard_service.record_win(user, spin.win_amount)
+    rollups.record_bet("slots", user.id, total_bet, spin.win_amount, spin.timestamp)
+    monitor.observe("slots", user.id, total_bet, spin.win_amount)
+    return spin, user
 
 
 def get_user_stats(db: Session, user_id: int) -> Dict[str, Any]:
-    """Obtiene estadísticas del jugador"""
+    """Obtiene estadísticas del jugador (montos en centavos)"""
     # Total de spins
     total_spins = db.exec(
         select(func.count(SlotSpin.id)).where(SlotSpin.user_id == user_id)
@@ -219,12 +250,12 @@ def get_user_stats(db: Session, user_id: int) -> Dict[str, Any]:
             SlotSpin.user_id == user_id,
             SlotSpin.win_amount > 0
         )
-    ).one() or 0.0
+    ).one() or 0
     
     # Total apostado
     total_bet = db.exec(
         select(func.sum(SlotSpin.bet_amount)).where(SlotSpin.user_id == user_id)
-    ).one() or 0.0
+    ).one() or 0
     
     # Mayor ganancia
     biggest_win_spin = db.exec(
@@ -232,13 +263,21 @@ def get_user_stats(db: Session, user_id: int) -> Dict[str, Any]:
         .order_by(SlotSpin.win_amount.desc())
     ).first()
     
-    biggest_win = biggest_win_spin.win_amount if biggest_win_spin else 0.0
+    biggest_win = biggest_win_spin.win_amount if biggest_win_spin else 0
+    
+    # Sumar lo que ya se movió al archivo (app.games.archive)
+    rollup = archive.get_rollup(db, user_id, "slots")
+    if rollup:
+        total_spins = (total_spins or 0) + rollup.spins
+        total_won += rollup.total_won
+        total_bet += rollup.total_bet
+        biggest_win = max(biggest_win, rollup.biggest_win)
     
     return {
         "total_spins": total_spins or 0,
-        "total_won": float(total_won),
-        "total_lost": float(total_bet - total_won),
-        "biggest_win": float(biggest_win)
+        "total_won": int(total_won),
+        "total_lost": int(total_bet - total_won),
+        "biggest_win": int(biggest_win)
     }
 
 
@@ -248,11 +287,18 @@ def reveal_session_seed(db: Session, session: SlotSession) -> str:
     db.add(session)
     db.commit()
     db.refresh(session)
+    provably_fair.forget(session.server_seed)
+    session_cache.invalidate("slots", session.id)
     return session.server_seed
 
 
-def update_user_balance(db: Session, user_id: int, amount: float) -> User:
-    """Actualiza el saldo del usuario (puede ser positivo o negativo)"""
+def rotate_if_due(db: Session, session: SessionMeta) -> Optional[Dict[str, Any]]:
+    """Tras un giro: revela la sesión y abre otra si cumplió la política de rotación"""
+    return rotation.rotate_if_due(db, "slots", session, create_session)
+
+
+def update_user_balance(db: Session, user_id: int, amount: int) -> User:
+    """Actualiza el saldo del usuario en centavos (puede ser positivo o negativo)"""
     statement = select(User).where(User.id == user_id)
     user = db.exec(statement).one_or_none()
     
@@ -268,24 +314,21 @@ def update_user_balance(db: Session, user_id: int, amount: float) -> User:
         user.perdidas_totales += abs(amount)
     
     db.add(user)
+    record_activity(db, user.id, "adjustment", amount=abs(amount), payout=amount, game="slots")
     db.commit()
     db.refresh(user)
+    balance_changed(user, "balance_adjusted", amount=amount)
     return user
 
 
-def update_user_balance_with_bet(
+def _apply_bet(
     db: Session,
-    user_id: int,
-    bet_amount: float,
-    win_amount: float
+    user: User,
+    bet_amount: int,
+    win_amount: int,
+    spin: Optional[SlotSpin] = None
 ) -> User:
-    """Actualiza el saldo del usuario con apuesta y ganancia"""
-    statement = select(User).where(User.id == user_id)
-    user = db.exec(statement).one_or_none()
-    
-    if not user:
-        raise ValueError("User not found")
-    
+    """Aplica apuesta y ganancia al usuario y registra la actividad (sin commit)"""
     saldo_antes = user.saldo
     
     # Restar la apuesta
@@ -295,17 +338,45 @@ def update_user_balance_with_bet(
     if win_amount > 0:
         user.saldo += win_amount
         user.ganancias_totales += win_amount
-        print(f"🎰 GANANCIA! Usuario: {user.username} | Saldo antes: ${saldo_antes} | Apuesta: ${bet_amount} | Ganancia: ${win_amount} | Saldo después: ${user.saldo}")
+        print(f"🎰 GANANCIA! Usuario: {user.username} | Saldo antes: ${to_major(saldo_antes)} | Apuesta: ${to_major(bet_amount)} | Ganancia: ${to_major(win_amount)} | Saldo después: ${to_major(user.saldo)}")
     
     # Registrar la pérdida (apuesta perdida)
     if win_amount == 0:
         user.perdidas_totales += bet_amount
-        print(f"❌ PÉRDIDA! Usuario: {user.username} | Saldo antes: ${saldo_antes} | Apuesta: ${bet_amount} | Saldo después: ${user.saldo}")
+        print(f"❌ PÉRDIDA! Usuario: {user.username} | Saldo antes: ${to_major(saldo_antes)} | Apuesta: ${to_major(bet_amount)} | Saldo después: ${to_major(user.saldo)}")
     elif win_amount < bet_amount:
         # Ganaste algo pero menos de lo que apostaste
         user.perdidas_totales += (bet_amount - win_amount)
     
     db.add(user)
+    record_activity(
+        db, user.id, "slot_bet", amount=bet_amount, payout=win_amount - bet_amount, game="slots",
+        ref_id=spin.id if spin else None,
+        created_at=spin.timestamp if spin else None,
+        detail={"symbols": spin_symbols(spin), "multiplier": spin.multiplier} if spin else None)
+    return user
+
+
+def update_user_balance_with_bet(
+    db: Session,
+    user_id: int,
+    bet_amount: int,
+    win_amount: int,
+    spin: Optional[SlotSpin] = None
+) -> User:
+    """Actualiza el saldo del usuario con apuesta y ganancia (y registra la actividad)"""
+    statement = select(User).where(User.id == user_id)
+    user = db.exec(statement).one_or_none()
+    
+    if not user:
+        raise ValueError("User not found")
+    
+    _apply_bet(db, user, bet_amount, win_amount, spin)
     db.commit()
     db.refresh(user)
+    balance_changed(user, "bet_settled", game="slots", bet_amount=bet_amount, payout=win_amount - bet_amount)
+    leaderboard_service.record_win(user, win_amount)
+    if spin:
+        rollups.record_bet("slots", user.id, bet_amount, win_amount, spin.timestamp)
+        monitor.observe("slots", user.id, bet_amount, win_amount)
     return user
@@ -0,0 +1,68 @@
+# app/leaderboards/board.py
+"""
+Top-k incremental para puntajes que solo crecen (ganancias acumuladas, mayor premio).
+
+- offer() es O(log k): min-heap con entradas perezosas (las viejas se descartan
+  al llegar al tope) + dict con el puntaje vigente de cada miembro.
+- top() devuelve una lista ya ordenada que se recalcula solo si hubo cambios,
+  así las lecturas repetidas son O(k).
+Como los puntajes nunca bajan, un usuario fuera del top-k solo puede entrar
+superando al mínimo actual, y no hace falta conocer a todos los usuarios.
+"""
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+
+class TopK:
+    def __init__(self, k: int):
+        self.k = k
+        self._scores: Dict[int, float] = {}
+        self._names: Dict[int, str] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._sorted: Optional[List[Tuple[int, str, float]]] = None
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _floor(self) -> Tuple[float, int]:
+        while self._heap:
+            score, user_id = self._heap[0]
+            if self._scores.get(user_id) == score:
+                return score, user_id
+            heapq.heappop(self._heap)
+        raise IndexError("empty board")
+
+    def _compact(self) -> None:
+        self._heap = [(score, uid) for uid, score in self._scores.items()]
+        heapq.heapify(self._heap)
+
+    def offer(self, user_id: int, username: str, score: float) -> bool:
+        """Registra el puntaje vigente del usuario; devuelve True si cambió el board"""
+        current = self._scores.get(user_id)
+        if current is not None:
+            if score <= current:
+                return False
+        elif len(self._scores) >= self.k:
+            floor_score, floor_user = self._floor()
+            if score <= floor_score:
+                return False
+            heapq.heappop(self._heap)
+            del self._scores[floor_user]
+            self._names.pop(floor_user, None)
+
+        self._scores[user_id] = score
+        self._names[user_id] = username
+        heapq.heappush(self._heap, (score, user_id))
+        if len(self._heap) > 4 * self.k:
+            self._compact()
+        self._sorted = None
+        return True
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[int, str, float]]:
+        """[(user_id, username, score)] de mayor a menor"""
+        if self._sorted is None:
+            self._sorted = sorted(
+                ((uid, self._names[uid], score) for uid, score in self._scores.items()),
+                key=lambda e: (-e[2], e[0]),
+            )
+        return self._sorted if n is None else self._sorted[:n]
@@ -0,0 +1,27 @@
+# app/leaderboards/routes.py
+from fastapi import APIRouter, HTTPException, Query
+
+from app.leaderboards import service as leaderboard_service
+from app.money import to_major
+
+router = APIRouter(prefix="/v1/leaderboards", tags=["leaderboards"])
+
+
+@router.get("/{board}")
+def get_leaderboard(
+    board: str,
+    period: str = "all_time",
+    limit: int = Query(10, ge=1, le=100),
+):
+    """
+    GET /v1/leaderboards/ganancias?period=daily
+    GET /v1/leaderboards/biggest_win?period=all_time&limit=20
+    Se sirve desde memoria (sin consultas a la DB).
+    """
+    try:
+        entries = leaderboard_service.top(board, period, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    for entry in entries:
+        entry["score"] = to_major(entry["score"])
+    return {"board": board, "period": period, "entries": entries}
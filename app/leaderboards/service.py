@@ -0,0 +1,125 @@
+# app/leaderboards/service.py
+"""
+Leaderboards de ganadores mantenidos incrementalmente por la liquidación de apuestas.
+
+Boards:
+- "ganancias": ganancias acumuladas (all_time = User.ganancias_totales, daily = suma del día UTC)
+- "biggest_win": mayor premio individual (all_time y daily)
+Los puntajes están en centavos, como los montos de la DB.
+
+Nada de ORDER BY por request: record_win() actualiza los TopK en O(log k) y las
+lecturas salen de memoria. snapshot() los guarda en LeaderboardSnapshot y
+warm_start() los recupera al arrancar.
+"""
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlmodel import Session, select, delete
+
+from app import config
+from app.leaderboards.board import TopK
+from app.model import LeaderboardSnapshot, User
+
+BOARDS = ("ganancias", "biggest_win")
+PERIODS = ("all_time", "daily")
+
+_lock = threading.Lock()
+_all_time: Dict[str, TopK] = {}
+_daily: Dict[str, TopK] = {}
+_daily_date: Optional[str] = None
+_daily_sums: Dict[int, int] = {}
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def reset(size: Optional[int] = None) -> None:
+    global _daily_date
+    k = size or config.LEADERBOARD_SIZE
+    with _lock:
+        for board in BOARDS:
+            _all_time[board] = TopK(k)
+            _daily[board] = TopK(k)
+        _daily_date = _today()
+        _daily_sums.clear()
+
+
+def _roll_day_locked(today: str) -> None:
+    global _daily_date
+    if today != _daily_date:
+        for board in BOARDS:
+            _daily[board] = TopK(_daily[board].k)
+        _daily_sums.clear()
+        _daily_date = today
+
+
+def record_win(user: User, win_amount: int) -> None:
+    """Llamar después del commit de una apuesta ganadora"""
+    if win_amount <= 0:
+        return
+    with _lock:
+        _roll_day_locked(_today())
+        _all_time["ganancias"].offer(user.id, user.username, int(user.ganancias_totales or 0))
+        _all_time["biggest_win"].offer(user.id, user.username, int(win_amount))
+        day_total = _daily_sums.get(user.id, 0) + int(win_amount)
+        _daily_sums[user.id] = day_total
+        _daily["ganancias"].offer(user.id, user.username, day_total)
+        _daily["biggest_win"].offer(user.id, user.username, int(win_amount))
+
+
+def top(board: str, period: str = "all_time", limit: int = 10) -> List[dict]:
+    if board not in BOARDS or period not in PERIODS:
+        raise ValueError("Unknown leaderboard")
+    with _lock:
+        _roll_day_locked(_today())
+        entries = (_all_time if period == "all_time" else _daily)[board].top(limit)
+    return [
+        {"rank": i + 1, "user_id": uid, "username": name, "score": score}
+        for i, (uid, name, score) in enumerate(entries)
+    ]
+
+
+def snapshot(db: Session) -> int:
+    """Reemplaza la foto guardada de cada board/período; devuelve filas escritas"""
+    with _lock:
+        _roll_day_locked(_today())
+        boards = [(board, "all_time", _all_time[board].top()) for board in BOARDS]
+        boards += [(board, _daily_date, _daily[board].top()) for board in BOARDS]
+    now = datetime.now(timezone.utc)
+    written = 0
+    for board, period, entries in boards:
+        db.exec(delete(LeaderboardSnapshot).where(
+            LeaderboardSnapshot.board == board, LeaderboardSnapshot.period == period))
+        for rank, (uid, name, score) in enumerate(entries, start=1):
+            db.add(LeaderboardSnapshot(board=board, period=period, rank=rank, user_id=uid,
+                                       username=name, score=score, taken_at=now))
+            written += 1
+    db.commit()
+    return written
+
+
+def warm_start(db: Session) -> None:
+    """Reconstruye los boards al arrancar: ganancias desde User, el resto desde el snapshot"""
+    reset()
+    with _lock:
+        k = _all_time["ganancias"].k
+        for user in db.exec(
+            select(User).where(User.ganancias_totales > 0)
+            .order_by(User.ganancias_totales.desc()).limit(k)
+        ).all():
+            _all_time["ganancias"].offer(user.id, user.username, int(user.ganancias_totales))
+        rows = db.exec(select(LeaderboardSnapshot).where(
+            LeaderboardSnapshot.period.in_(("all_time", _daily_date)))).all()
+        for row in rows:
+            if row.period == "all_time":
+                if row.board != "ganancias":
+                    _all_time[row.board].offer(row.user_id, row.username, row.score)
+            else:
+                _daily[row.board].offer(row.user_id, row.username, row.score)
+                if row.board == "ganancias":
+                    _daily_sums[row.user_id] = row.score
+
+
+reset()
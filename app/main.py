@@ -1,10 +1,19 @@
 # app/main.py
+import asyncio
 from fastapi import FastAPI
-from sqlmodel import SQLModel
+from sqlmodel import SQLModel, Session
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.database import engine
+from app import config
+from app.migrations import (
+    add_missing_columns, backfill_user_identity, deny_duplicate_pending_credits, migrate_money_to_minor,
+)
+from app.background import run_periodically
+from app.analytics import rollups
+from app.games import archive, group_commit, rotation
+from app.middleware import admission, idempotency, rate_limit
 from app.model import User, RouletteSession, Spin, CreditRequest, SlotSession, SlotSpin  # Import all models
 from app.auth.routes import router as auth_router
 
@@ -18,19 +27,67 @@ from app.admin.routes import router as admin_router
 
 from app.credits.routes import router as credits_router
 
+from app.realtime.routes import router as stream_router
+
+from app.leaderboards.routes import router as leaderboards_router
+from app.leaderboards import service as leaderboard_service
+
 
 def init_db():
     SQLModel.metadata.create_all(engine)
+    # create_all no agrega columnas nuevas a tablas que ya existen
+    add_missing_columns(engine)
+    # montos float -> centavos enteros (no hace nada si ya está convertida)
+    migrate_money_to_minor(engine)
+    # username/email normalizados para el directorio de admin
+    backfill_user_identity(engine)
+    # datos viejos con dos 'pending' por usuario impedirían el índice único
+    deny_duplicate_pending_credits(engine)
+    # create_all tampoco agrega índices nuevos a tablas que ya existen; si uno no se
+    # puede crear el arranque falla: sin uq_creditrequest_user_pending no hay otra guarda
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def snapshot_leaderboards():
+    with Session(engine) as db:
+        leaderboard_service.snapshot(db)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
+    with Session(engine) as db:
+        leaderboard_service.warm_start(db)
+    tasks = [
+        asyncio.create_task(run_periodically(
+            config.LEADERBOARD_SNAPSHOT_SECONDS, snapshot_leaderboards, "leaderboard_snapshot")),
+        asyncio.create_task(run_periodically(
+            config.ROLLUP_FLUSH_SECONDS, rollups.run_flush_job, "rollup_flush")),
+    ]
+    if config.SESSION_REVEAL_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_periodically(
+            config.SESSION_REVEAL_INTERVAL_SECONDS, rotation.run_reveal_job, "session_reveal")))
+    if config.ARCHIVE_INTERVAL_SECONDS > 0:
+        tasks.append(asyncio.create_task(run_periodically(
+            config.ARCHIVE_INTERVAL_SECONDS, archive.run_archive_job, "spin_archive")))
     yield
+    for task in tasks:
+        task.cancel()
+    group_commit.shutdown()
+    rollups.run_flush_job()
+    snapshot_leaderboards()
 
 
 app = FastAPI(lifespan=lifespan)
 
+# pools de concurrencia por clase de ruta (auth / bets / reads) con 503 al saturarse
+app.add_middleware(admission.AdmissionMiddleware, controller=admission.controller)
+
+# límites por usuario/IP en giros y apuestas (dentro de CORS para que el 429 lleve sus headers)
+app.add_middleware(rate_limit.RateLimitMiddleware, limiter=rate_limit.limiter)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -41,8 +98,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # los listados paginados (credits, spins, users) mandan la siguiente página acá
+    expose_headers=["X-Next-Cursor"],
 )
 
+# reintentos de apuestas/depósitos/créditos con Idempotency-Key no se re-ejecutan
+app.add_middleware(idempotency.IdempotencyMiddleware, store=idempotency.store)
+
 app.include_router(auth_router)
 app.include_router(profile_router)   # <--- nuevo
 app.include_router(slot_router)
@@ -53,6 +115,10 @@ app.include_router(admin_router)
 
 app.include_router(credits_router)
 
+app.include_router(stream_router)
+
+app.include_router(leaderboards_router)
+
 
 @app.get("/")
 async def root():
@@ -0,0 +1,204 @@
+# app/middleware/admission.py
+"""
+Control de admisión: límite de concurrencia por clase de ruta.
+
+Las rutas sync corren en el threadpool de anyio (40 hilos por defecto). Si la DB
+se pone lenta, todo se encola ahí sin límite hasta que los clientes cortan, y
+unos cuantos logins (Argon2, ~250 ms de CPU cada uno) pueden ocupar los hilos
+que necesitan las apuestas. Por eso cada clase tiene su propio pool:
+
+- auth: login/signup/cambio de contraseña;
+- bets: giros, apuestas, depósitos, créditos, sesiones y el resto de las
+  escrituras (toda ruta sin regla propia que no sea un GET cae acá);
+- exports: descargas del historial en streaming (minutos con un hilo ocupado
+  de a ratos): pocas a la vez para que no se coman el pool de lecturas;
+- reads: el resto de los GETs y la verificación de spins (solo CPU), menos los
+  streams WS/SSE, que viven mucho tiempo.
+
+Cada pool admite `limit` requests a la vez y deja esperar a lo sumo `queue`
+más. Se responde 503 + Retry-After si la cola está llena, o si el request no
+consigue lugar antes de su deadline (ADMISSION_QUEUE_TIMEOUT_SECONDS, o menos si
+el cliente manda X-Request-Timeout en segundos): mejor fallar rápido que
+contestar cuando el cliente ya se fue.
+
+Los waiters son concurrent.futures.Future (como en idempotency): se pueden
+esperar desde cualquier event loop.
+"""
+import asyncio
+import concurrent.futures
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app import config
+
+
+class Pool:
+    def __init__(self, name: str, limit: int, queue: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue = max(0, queue)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: "deque[concurrent.futures.Future]" = deque()
+        self._stats = {"admitted": 0, "shed_queue_full": 0, "shed_deadline": 0}
+        self._max_wait = 0.0
+
+    async def acquire(self, timeout: float) -> bool:
+        """True si el request entra; False si hay que rechazarlo (cola llena o deadline)"""
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                self._stats["admitted"] += 1
+                return True
+            if len(self._waiters) >= self.queue or timeout <= 0:
+                self._stats["shed_queue_full"] += 1
+                return False
+            waiter: concurrent.futures.Future = concurrent.futures.Future()
+            self._waiters.append(waiter)
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(waiter), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    queued = True
+                except ValueError:
+                    queued = False  # el lugar se le asignó justo al vencer el deadline
+                self._stats["shed_deadline"] += 1
+            if not queued:
+                self.release()
+            return False
+        except BaseException:
+            # el cliente se fue (cancelación): devolver el lugar si ya se había asignado
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    return_slot = False
+                else:
+                    return_slot = True
+            if return_slot:
+                self.release()
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._stats["admitted"] += 1
+            self._max_wait = max(self._max_wait, waited)
+        return True
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                # traspaso directo del lugar: _active no cambia
+                if waiter.set_running_or_notify_cancel():
+                    waiter.set_result(True)
+                    return
+            self._active -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(
+                self._stats,
+                active=self._active,
+                queued=len(self._waiters),
+                limit=self.limit,
+                queue_limit=self.queue,
+                max_wait_ms=round(self._max_wait * 1000, 1),
+            )
+
+
+# (clase, método o None para cualquiera, regex del path); gana la primera que matchea
+DEFAULT_ROUTES: Tuple[Tuple[str, Optional[str], str], ...] = (
+    ("auth", "POST", r"^/auth/(login|signup)$"),
+    ("auth", "GET", r"^/auth/create-admin$"),
+    ("auth", "PATCH", r"^/profile/me/password$"),
+    ("bets", "POST", r"^/v1/(roulette|slots)/session/\d+/(bet|test-bet|spin)$"),
+    ("bets", "POST", r"^/v1/(roulette|slots)/session(/\d+/reveal)?$"),
+    ("reads", "POST", r"^/v1/(roulette|slots)/verify$"),  # solo CPU (HMACs), no escribe
+    ("bets", "PATCH", r"^/profile/me/update$"),
+    ("bets", "POST", r"^/games/slots/spin$"),
+    ("bets", "POST", r"^/v1/roulette/user/deposit$"),
+    ("bets", "POST", r"^/v1/(credits/request|admin/credits.*)$"),
+    ("bets", "GET", r"^/profile/add-balance/"),
+    (None, "GET", r"^/v1/stream/"),  # streams de larga vida: sin pool
+    ("exports", "GET", r"^/(profile/me|v1/admin/users/\d+)/export$"),
+    ("reads", "GET", r""),
+    ("reads", "HEAD", r""),
+    ("reads", "OPTIONS", r""),
+    ("bets", None, r""),  # cualquier otra escritura: nada corre sin pool
+)
+
+
+class AdmissionController:
+    def __init__(self, pools: Iterable[Pool], routes=DEFAULT_ROUTES):
+        self.pools: Dict[str, Pool] = {p.name: p for p in pools}
+        self.routes = [(cls, method, re.compile(path)) for cls, method, path in routes]
+
+    def classify(self, method: str, path: str) -> Optional[Pool]:
+        for cls, m, pattern in self.routes:
+            if (m is None or m == method) and pattern.match(path):
+                return self.pools.get(cls) if cls else None
+        return None
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+
+def _deadline(scope: Scope, default: float) -> float:
+    for k, v in scope.get("headers", ()):
+        if k == b"x-request-timeout":
+            try:
+                return max(0.0, min(default, float(v)))
+            except ValueError:
+                break
+    return default
+
+
+async def _send_busy(send: Send, pool: Pool) -> None:
+    body = b'{"detail":"Server busy, retry later"}'
+    await send({"type": "http.response.start", "status": 503,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode()),
+                            (b"retry-after", b"1"),
+                            (b"x-admission-pool", pool.name.encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not config.ADMISSION_ENABLED:
+            return await self.app(scope, receive, send)
+        pool = self.controller.classify(scope["method"], scope["path"])
+        if pool is None:
+            return await self.app(scope, receive, send)
+
+        if not await pool.acquire(_deadline(scope, config.ADMISSION_QUEUE_TIMEOUT_SECONDS)):
+            return await _send_busy(send, pool)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.release()
+
+
+def _pools() -> List[Pool]:
+    return [
+        Pool("auth", config.ADMISSION_AUTH_CONCURRENCY, config.ADMISSION_AUTH_QUEUE),
+        Pool("bets", config.ADMISSION_BET_CONCURRENCY, config.ADMISSION_BET_QUEUE),
+        Pool("exports", config.ADMISSION_EXPORT_CONCURRENCY, config.ADMISSION_EXPORT_QUEUE),
+        Pool("reads", config.ADMISSION_READ_CONCURRENCY, config.ADMISSION_READ_QUEUE),
+    ]
+
+
+controller = AdmissionController(_pools())
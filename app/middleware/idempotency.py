@@ -0,0 +1,202 @@
+# app/middleware/idempotency.py
+"""
+Idempotency-Key para los POST que mueven dinero (apuestas, depósitos, créditos).
+
+- La respuesta del primer request se guarda por (quién, ruta, key) con TTL.
+  Quién es el `sub` del JWT (como en rate_limit): un cliente que renueva el token
+  y reintenta con la misma key recibe la respuesta guardada, no un segundo cobro.
+- Un reintento con la misma key devuelve la respuesta guardada sin re-ejecutar
+  (header Idempotent-Replayed: true).
+- Un duplicado concurrente espera al original en vuelo en vez de competir con él.
+- La misma key con otro body es un error del cliente (422).
+- Respuestas 5xx y 429 no se guardan: se libera la key para que el cliente reintente.
+"""
+import asyncio
+import concurrent.futures
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import config
+from app.middleware.rate_limit import client_identity
+
+IDEMPOTENT_PATHS = (
+    r"^/v1/roulette/session/\d+/bet$",
+    r"^/v1/slots/session/\d+/bet$",
+    r"^/v1/roulette/user/deposit$",
+    r"^/v1/credits/request$",
+)
+MAX_KEY_LENGTH = 255
+MAX_STORED_BODY = 256 * 1024
+WAIT_TIMEOUT_SECONDS = 30.0
+
+
+class StoredResponse:
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class _Entry:
+    def __init__(self, fingerprint: str, expires_at: float):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        # concurrent.futures.Future: se puede esperar desde cualquier event loop
+        self.done: concurrent.futures.Future = concurrent.futures.Future()
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+
+    def _evict_locked(self, now: float) -> None:
+        # las entradas se insertan en orden de expiración (TTL fijo)
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            if not entry.done.done() and entry.expires_at > now:
+                break  # no expulsar un original en vuelo
+            self._entries.popitem(last=False)
+
+    def begin(self, key: tuple, fingerprint: str) -> Tuple[_Entry, bool]:
+        """Devuelve (entrada, es_dueño). El dueño ejecuta; el resto espera/replay."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_locked(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry, False
+            entry = _Entry(fingerprint, now + self.ttl)
+            self._entries[key] = entry
+            return entry, True
+
+    def complete(self, key: tuple, entry: _Entry, response: StoredResponse) -> None:
+        entry.done.set_result(response)
+
+    def release(self, key: tuple, entry: _Entry) -> None:
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set_result(None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = sum(1 for e in self._entries.values() if not e.done.done())
+            return {"entries": len(self._entries), "in_flight": in_flight}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _header(scope: Scope, name: bytes) -> Optional[bytes]:
+    for k, v in scope.get("headers", ()):
+        if k == name:
+            return v
+    return None
+
+
+async def _send_json_error(send: Send, status: int, detail: str) -> None:
+    body = ('{"detail":"%s"}' % detail).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp, store: IdempotencyStore, paths: Iterable[str] = IDEMPOTENT_PATHS):
+        self.app = app
+        self.store = store
+        self.paths = [re.compile(p) for p in paths]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        raw_key = _header(scope, b"idempotency-key")
+        if raw_key is None or not any(p.match(scope["path"]) for p in self.paths):
+            return await self.app(scope, receive, send)
+        if not raw_key or len(raw_key) > MAX_KEY_LENGTH:
+            return await _send_json_error(send, 400, "Invalid Idempotency-Key")
+
+        # quién: el usuario del token (o la IP si no hay token) para que las keys no choquen
+        key = (client_identity(scope), scope["path"], raw_key)
+
+        chunks = []
+        more = True
+        while more:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        while True:
+            entry, owner = self.store.begin(key, fingerprint)
+            if owner:
+                return await self._run_original(scope, receive, body, send, key, entry)
+            if entry.fingerprint != fingerprint:
+                return await _send_json_error(send, 422, "Idempotency-Key reused with a different payload")
+            try:
+                stored = await asyncio.wait_for(asyncio.wrap_future(entry.done), WAIT_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                return await _send_json_error(send, 409, "Original request still in progress")
+            if stored is None:
+                continue  # el original falló y liberó la key: este request pasa a ser el dueño
+            return await self._replay(send, stored)
+
+    async def _run_original(self, scope: Scope, receive: Receive, body: bytes, send: Send,
+                            key: tuple, entry: _Entry) -> None:
+        sent_body = False
+
+        async def replay_receive() -> Message:
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status = 500
+        headers: List[Tuple[bytes, bytes]] = []
+        captured = []
+        size = 0
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status, headers, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size <= MAX_STORED_BODY:
+                    captured.append(chunk)
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            self.store.release(key, entry)
+            raise
+        if status >= 500 or status == 429 or size > MAX_STORED_BODY:
+            self.store.release(key, entry)
+        else:
+            self.store.complete(key, entry, StoredResponse(status, headers, b"".join(captured)))
+
+    async def _replay(self, send: Send, stored: StoredResponse) -> None:
+        await send({"type": "http.response.start", "status": stored.status,
+                    "headers": stored.headers + [(b"idempotent-replayed", b"true")]})
+        await send({"type": "http.response.body", "body": stored.body})
+
+
+store = IdempotencyStore(config.IDEMPOTENCY_TTL_SECONDS, config.IDEMPOTENCY_MAX_ENTRIES)
@@ -0,0 +1,146 @@
+# app/middleware/rate_limit.py
+"""
+Rate limiting en memoria (token bucket) para los endpoints de juego.
+
+- Un bucket por (regla, quién): quién es el `sub` del JWT si el token es válido,
+  si no la IP. Un token inventado no da un bucket nuevo: cae en el de la IP.
+- Cada bucket son dos floats (tokens, último acceso): memoria O(1) por key activa.
+- Los buckets se reparten en shards con su propio lock para no serializar todo
+  el proceso en un solo lock.
+- Un bucket sin uso durante `idle_seconds` ya estaría lleno: se borra (barrido
+  perezoso por orden de último acceso en cada shard).
+- Al agotarse responde 429 con Retry-After (segundos hasta el próximo token).
+"""
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app import config
+from app.auth.jwt import decode_access_token
+
+
+class RateRule(NamedTuple):
+    name: str
+    method: str
+    path: str  # regex sobre scope["path"]
+    rate: float  # tokens por segundo
+    burst: float  # capacidad del bucket
+
+
+DEFAULT_RULES = (
+    RateRule("spin", "POST", r"^/v1/(roulette|slots)/session/\d+/spin$",
+             config.RATE_LIMIT_SPIN_PER_SECOND, config.RATE_LIMIT_SPIN_BURST),
+    RateRule("spin", "POST", r"^/games/slots/spin$",
+             config.RATE_LIMIT_SPIN_PER_SECOND, config.RATE_LIMIT_SPIN_BURST),
+    RateRule("bet", "POST", r"^/v1/(roulette|slots)/session/\d+/(bet|test-bet)$",
+             config.RATE_LIMIT_BET_PER_SECOND, config.RATE_LIMIT_BET_BURST),
+    RateRule("session", "POST", r"^/v1/(roulette|slots)/session$",
+             config.RATE_LIMIT_SESSION_PER_SECOND, config.RATE_LIMIT_SESSION_BURST),
+)
+
+SHARDS = 16
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [tokens, último acceso]; ordenado por último acceso
+        self.buckets: "OrderedDict[tuple, List[float]]" = OrderedDict()
+
+
+class RateLimiter:
+    def __init__(self, idle_seconds: float, shards: int = SHARDS):
+        self.idle_seconds = idle_seconds
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def acquire(self, key: tuple, rate: float, burst: float,
+                now: Optional[float] = None) -> Tuple[bool, float]:
+        """Consume un token. Devuelve (permitido, segundos hasta el próximo token)"""
+        now = time.monotonic() if now is None else now
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.lock:
+            buckets = shard.buckets
+            while buckets:
+                oldest_key, oldest = next(iter(buckets.items()))
+                if now - oldest[1] < self.idle_seconds:
+                    break
+                del buckets[oldest_key]
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [burst, now]
+            else:
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                buckets.move_to_end(key)
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return True, 0.0
+            return False, (1.0 - bucket[0]) / rate if rate > 0 else self.idle_seconds
+
+    def stats(self) -> dict:
+        sizes = []
+        for shard in self._shards:
+            with shard.lock:
+                sizes.append(len(shard.buckets))
+        return {"keys": sum(sizes), "largest_shard": max(sizes)}
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.buckets.clear()
+
+
+def _header(scope: Scope, name: bytes) -> Optional[bytes]:
+    for k, v in scope.get("headers", ()):
+        if k == name:
+            return v
+    return None
+
+
+def client_identity(scope: Scope) -> str:
+    auth = _header(scope, b"authorization")
+    if auth and auth[:7].lower() == b"bearer ":
+        payload = decode_access_token(auth[7:].decode("latin-1"))
+        if payload and payload.get("sub"):
+            return "user:" + str(payload["sub"])
+    return "ip:" + (scope.get("client") or ("unknown", 0))[0]
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, limiter: RateLimiter, rules: Iterable[RateRule] = DEFAULT_RULES):
+        self.app = app
+        self.limiter = limiter
+        self.rules = [(rule, re.compile(rule.path)) for rule in rules]
+
+    def _match(self, scope: Scope) -> Optional[RateRule]:
+        for rule, pattern in self.rules:
+            if scope["method"] == rule.method and pattern.match(scope["path"]):
+                return rule
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not config.RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+        rule = self._match(scope)
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        allowed, retry_after = self.limiter.acquire(
+            (rule.name, client_identity(scope)), rule.rate, rule.burst)
+        if allowed:
+            return await self.app(scope, receive, send)
+
+        body = b'{"detail":"Too many requests"}'
+        await send({"type": "http.response.start", "status": 429,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                                (b"retry-after", str(max(1, math.ceil(retry_after))).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+
+limiter = RateLimiter(config.RATE_LIMIT_IDLE_SECONDS)
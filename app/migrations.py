@@ -0,0 +1,207 @@
+# app/migrations.py
+"""
+Migraciones al arrancar (init_db) o a mano:  python -m app.migrations
+
+- add_missing_columns(): create_all crea tablas nuevas pero no toca las que ya
+  existen, así que las columnas agregadas a un modelo se suman con
+  ALTER TABLE ... ADD COLUMN. Solo columnas nullable o con default escalar
+  (NOT NULL DEFAULT x); renombrar o NOT NULL sin default necesita una migración
+  escrita a mano.
+- migrate_money_to_minor(): las columnas de dinero pasaron de float (unidades)
+  a int (centavos, app.money). Convierte las tablas que todavía las tienen como
+  float; las que ya son enteras se saltean, así que correrla dos veces no hace nada.
+- deny_duplicate_pending_credits(): uq_creditrequest_user_pending no se puede
+  crear si datos viejos tienen dos 'pending' para un usuario; queda la más vieja
+  y las demás se deniegan (con su actividad), antes de crear los índices.
+- backfill_user_identity(): completa username_norm/email_norm de los usuarios
+  creados antes de esas columnas (solo las filas con NULL), en lotes.
+"""
+import re
+from typing import List
+
+from datetime import datetime, timezone
+
+from sqlalchemy import Numeric, inspect, literal, text
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, SQLModel, func, select
+
+from app.money import MINOR_PER_UNIT
+from app.model import CreditRequest, normalize_identity
+from app.users.activity import record_activity
+
+# tabla -> columnas de dinero
+MONEY_COLUMNS = {
+    "user": ("saldo", "ganancias_totales", "perdidas_totales"),
+    "spin": ("bet_amount", "payout"),
+    "slotspin": ("bet_amount", "win_amount"),
+    "creditrequest": ("amount",),
+    "activity": ("amount", "payout"),
+    "leaderboardsnapshot": ("score",),
+    "spinrollup": ("total_bet", "total_won", "net", "biggest_win"),
+}
+
+
+def _column_ddl(engine: Engine, column) -> str:
+    dialect = engine.dialect
+    ddl = f"{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect)}"
+    if column.nullable:
+        return ddl
+    default = column.default
+    if default is None or not default.is_scalar:
+        raise ValueError(f"NOT NULL column without scalar default: {column.table.name}.{column.name}")
+    value = literal(default.arg, type_=column.type).compile(
+        dialect=dialect, compile_kwargs={"literal_binds": True})
+    return f"{ddl} NOT NULL DEFAULT {value}"
+
+
+def add_missing_columns(engine: Engine) -> List[str]:
+    """Agrega a las tablas existentes las columnas nuevas de los modelos. Devuelve 'tabla.columna'"""
+    inspector = inspect(engine)
+    added = []
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            try:
+                ddl = _column_ddl(engine, column)
+            except ValueError as e:
+                print(f"⚠️ No se pudo agregar la columna: {e}")
+                continue
+            table_name = engine.dialect.identifier_preparer.quote(table.name)
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+            added.append(f"{table.name}.{column.name}")
+    if added:
+        print(f"🛠️ Columnas agregadas: {', '.join(added)}")
+    return added
+
+
+def _float_money_columns(engine: Engine, table: str) -> List[str]:
+    inspector = inspect(engine)
+    if not inspector.has_table(table):
+        return []
+    # Integer no es Numeric; FLOAT/REAL/NUMERIC sí
+    return [c["name"] for c in inspector.get_columns(table)
+            if c["name"] in MONEY_COLUMNS[table] and isinstance(c["type"], Numeric)]
+
+
+def _rebuild_sqlite_table(conn: Connection, table: str, columns: List[str]) -> None:
+    """
+    SQLite no cambia tipos con ALTER: se crea la tabla con el mismo DDL y las
+    columnas en INTEGER, se copian las filas convertidas, se reemplaza la vieja
+    y se recrean sus índices.
+    """
+    table_sql, = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :t"), {"t": table}).one()
+    index_sqls = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :t AND sql IS NOT NULL"),
+        {"t": table}).scalars().all()
+    all_columns = [row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')]
+
+    tmp = f"{table}__minor"
+    new_sql = re.sub(r'^CREATE TABLE\s+("?)' + re.escape(table) + r'\1', f'CREATE TABLE "{tmp}"', table_sql)
+    for column in columns:
+        new_sql = re.sub(r'(["\s(,]' + re.escape(column) + r'"?\s+)(FLOAT|REAL|DOUBLE|NUMERIC)\b',
+                         r"\1INTEGER", new_sql, flags=re.IGNORECASE)
+
+    select_list = ", ".join(
+        f'CAST(ROUND("{c}" * {MINOR_PER_UNIT}) AS INTEGER)' if c in columns else f'"{c}"'
+        for c in all_columns
+    )
+    column_list = ", ".join(f'"{c}"' for c in all_columns)
+    conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{tmp}"')
+    conn.exec_driver_sql(new_sql)
+    conn.exec_driver_sql(f'INSERT INTO "{tmp}" ({column_list}) SELECT {select_list} FROM "{table}"')
+    conn.exec_driver_sql(f'DROP TABLE "{table}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{tmp}" RENAME TO "{table}"')
+    for index_sql in index_sqls:
+        conn.exec_driver_sql(index_sql)
+
+
+def migrate_money_to_minor(engine: Engine) -> List[str]:
+    """Convierte a centavos enteros las columnas de dinero que siguen en float. Devuelve 'tabla.columna'"""
+    migrated = []
+    for table in MONEY_COLUMNS:
+        columns = _float_money_columns(engine, table)
+        if not columns:
+            continue
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                # pysqlite no abre transacción para DDL: BEGIN explícito para que
+                # el reemplazo de la tabla sea todo o nada
+                conn.exec_driver_sql("BEGIN")
+                _rebuild_sqlite_table(conn, table, columns)
+            else:
+                quote = engine.dialect.identifier_preparer.quote
+                for column in columns:
+                    conn.execute(text(
+                        f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(column)} TYPE BIGINT "
+                        f"USING ROUND({quote(column)} * {MINOR_PER_UNIT})"))
+        migrated += [f"{table}.{c}" for c in columns]
+    if migrated:
+        print(f"🛠️ Dinero convertido a centavos: {', '.join(migrated)}")
+    return migrated
+
+
+def deny_duplicate_pending_credits(engine: Engine) -> int:
+    """Deja una sola solicitud 'pending' por usuario (la más vieja). Devuelve cuántas denegó"""
+    denied = 0
+    with Session(engine) as db:
+        users = db.exec(
+            select(CreditRequest.user_id)
+            .where(CreditRequest.status == "pending")
+            .group_by(CreditRequest.user_id)
+            .having(func.count() > 1)
+        ).all()
+        for user_id in users:
+            extra = db.exec(
+                select(CreditRequest)
+                .where(CreditRequest.user_id == user_id, CreditRequest.status == "pending")
+                .order_by(CreditRequest.created_at, CreditRequest.id)
+            ).all()[1:]
+            for req in extra:
+                req.status = "denied"
+                req.reviewed_at = datetime.now(timezone.utc)
+                req.note = (req.note or "") + " | Denegada al migrar: otra solicitud pendiente del usuario"
+                db.add(req)
+                record_activity(db, req.user_id, "credit_denied", amount=req.amount, ref_id=req.id,
+                                created_at=req.reviewed_at)
+            denied += len(extra)
+        db.commit()
+    if denied:
+        print(f"🛠️ Solicitudes pendientes duplicadas denegadas: {denied}")
+    return denied
+
+
+def backfill_user_identity(engine: Engine, batch_size: int = 1000) -> int:
+    """Normaliza username/email de los usuarios que no los tienen. Devuelve cuántos"""
+    # en Python y no con lower() de SQL: tiene que dar lo mismo que normalize_identity
+    done = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                'SELECT id, username, email FROM "user" WHERE username_norm IS NULL '
+                'ORDER BY id LIMIT :n'), {"n": batch_size}).all()
+            if not rows:
+                break
+            conn.execute(
+                text('UPDATE "user" SET username_norm = :u, email_norm = :e WHERE id = :id'),
+                [{"id": r.id, "u": normalize_identity(r.username), "e": normalize_identity(r.email)}
+                 for r in rows])
+        done += len(rows)
+    if done:
+        print(f"🛠️ Usuarios normalizados: {done}")
+    return done
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    SQLModel.metadata.create_all(engine)
+    add_missing_columns(engine)
+    migrate_money_to_minor(engine)
+    backfill_user_identity(engine)
+    deny_duplicate_pending_credits(engine)
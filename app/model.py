@@ -1,11 +1,19 @@
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 from datetime import datetime, timezone, date
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import UniqueConstraint, Index, event, text
 
 
 class User(SQLModel, table=True):
-    __table_args__ = (UniqueConstraint("username"),)
+    # el directorio de admin (app.admin.search) busca por prefijo sobre las
+    # columnas normalizadas y filtra por rol/estado en orden de username
+    __table_args__ = (
+        UniqueConstraint("username"),
+        Index("ix_user_username_norm_id", "username_norm", "id"),
+        Index("ix_user_email_norm_id", "email_norm", "id"),
+        Index("ix_user_role_username_norm_id", "role", "username_norm", "id"),
+        Index("ix_user_active_username_norm_id", "is_Active", "username_norm", "id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
 
     # Datos de login
@@ -23,9 +31,10 @@ class User(SQLModel, table=True):
     numero_documento: Optional[str] = None 
 
     # ===== NUEVOS CAMPOS PARA LA PARTE DERECHA =====
-    saldo: float = Field(default=500.0)
-    ganancias_totales: float = Field(default=0.0)
-    perdidas_totales: float = Field(default=0.0)
+    # montos en centavos (app.money)
+    saldo: int = Field(default=50000)
+    ganancias_totales: int = Field(default=0)
+    perdidas_totales: int = Field(default=0)
 
     role: str
     is_Active: bool
@@ -33,12 +42,29 @@ class User(SQLModel, table=True):
         default_factory=lambda: datetime.now(timezone.utc)
     )
 
+    # username/email en minúsculas y sin espacios, los completa normalize_identity
+    username_norm: Optional[str] = None
+    email_norm: Optional[str] = None
+
+
+def normalize_identity(value: Optional[str]) -> Optional[str]:
+    return value.strip().casefold() if value is not None else None
+
+
+@event.listens_for(User, "before_insert")
+@event.listens_for(User, "before_update")
+def _normalize_user_identity(mapper, connection, user: User) -> None:
+    # cualquier alta o cambio de username/email (signup, perfil, scripts) mantiene las columnas
+    user.username_norm = normalize_identity(user.username)
+    user.email_norm = normalize_identity(user.email)
+
 
 class RouletteSession(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     # server_seed (hex) guardado cifrado/en DB; en producción deberías cifrarlo o usar KMS
     server_seed: str
     server_seed_hash: str
+    # tope de nonces reservados (leases de app.games.session_cache), no el conteo de giros
     nonce: int = Field(default=0)
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc))
@@ -49,13 +75,24 @@ class RouletteSession(SQLModel, table=True):
 
 
 class Spin(SQLModel, table=True):
+    # historial por usuario en orden temporal (export, búsquedas); la búsqueda de
+    # admin (app.admin.search) usa además los de fecha y tipo de apuesta
+    __table_args__ = (
+        Index("ix_spin_user_ts_id", "user_id", "timestamp", "id"),
+        Index("ix_spin_ts_id", "timestamp", "id"),
+        Index("ix_spin_bettype_ts_id", "bet_type", "timestamp", "id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     session_id: int = Field(foreign_key="roulettesession.id")
     nonce: int
+    # con SPIN_STORAGE=compact client_seed, hmac_hex y color quedan vacíos y se
+    # reconstruyen al leer (app.games.compact)
     client_seed: str
     hmac_hex: str
     pocket: int
     color: str
+    hmac_digest: Optional[bytes] = None      # 32 bytes crudos del HMAC (modo compacto)
+    client_seed_id: Optional[int] = Field(default=None, foreign_key="clientseed.id")
     timestamp: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc))
 
@@ -65,15 +102,29 @@ class Spin(SQLModel, table=True):
     bet_type: Optional[str] = None
     # texto JSON con los detalles (ej. '{"number":17}')
     bet_payload: Optional[str] = None
-    bet_amount: float = Field(default=0.0)
-    payout: float = Field(default=0.0)           # ganancia neta o -stake
+    bet_amount: int = Field(default=0)           # centavos
+    payout: int = Field(default=0)               # ganancia neta o -stake, en centavos
 
     session: Optional[RouletteSession] = Relationship(back_populates="spins")
 
 class CreditRequest(SQLModel, table=True):
+    # índices para el listado admin paginado por (created_at, id)
+    __table_args__ = (
+        Index("ix_creditrequest_created_id", "created_at", "id"),
+        Index("ix_creditrequest_status_created_id", "status", "created_at", "id"),
+        Index("ix_creditrequest_user_created_id", "user_id", "created_at", "id"),
+        # a lo sumo una solicitud 'pending' por usuario (índice único parcial)
+        Index(
+            "uq_creditrequest_user_pending",
+            "user_id",
+            unique=True,
+            sqlite_where=text("status = 'pending'"),
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
-    amount: float
+    amount: int                      # centavos
     status: str = Field(default="pending")  # pending / approved / denied
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     reviewed_at: Optional[datetime] = None
@@ -89,7 +140,7 @@ class SlotSession(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     server_seed: str  # Seed del servidor (se mantiene secreto hasta reveal)
     server_seed_hash: str  # Hash público del server seed
-    nonce: int = Field(default=0)  # Contador de spins
+    nonce: int = Field(default=0)  # Tope de nonces reservados (ver app.games.session_cache)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     revealed: bool = Field(default=False)  # Si el seed fue revelado
     
@@ -99,6 +150,10 @@ class SlotSession(SQLModel, table=True):
 
 class SlotSpin(SQLModel, table=True):
     """Registro de cada giro de slot machine"""
+    __table_args__ = (
+        Index("ix_slotspin_user_ts_id", "user_id", "timestamp", "id"),
+        Index("ix_slotspin_ts_id", "timestamp", "id"),  # búsqueda de admin por fecha
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     session_id: int = Field(foreign_key="slotsession.id")
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
@@ -107,17 +162,110 @@ class SlotSpin(SQLModel, table=True):
     nonce: int
     client_seed: str
     hmac_hex: str
+    hmac_digest: Optional[bytes] = None  # Modo compacto: HMAC crudo (hmac_hex queda vacío)
+    client_seed_id: Optional[int] = Field(default=None, foreign_key="clientseed.id")
     
     # Resultado del giro
     symbols: str  # JSON con los símbolos resultantes, ej: '["🍒","🍋","🍊"]'
+    symbol_code: Optional[int] = None  # Modo compacto: índices de SLOT_SYMBOLS empaquetados
     multiplier: float = Field(default=0.0)  # Multiplicador ganado
     
     # Apuesta y ganancia
-    bet_amount: float = Field(default=0.0)
+    bet_amount: int = Field(default=0)  # Centavos, por línea
     lines: int = Field(default=1)  # Número de líneas apostadas
-    win_amount: float = Field(default=0.0)  # Cantidad ganada
+    win_amount: int = Field(default=0)  # Cantidad ganada, en centavos
     
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     
     # Relación inversa
     session: Optional[SlotSession] = Relationship(back_populates="spins")
+
+
+class Activity(SQLModel, table=True):
+    """Feed unificado del jugador: cada evento de juego o de billetera es una fila"""
+    __table_args__ = (
+        Index("ix_activity_user_created_id", "user_id", "created_at", "id"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    # roulette_bet / slot_bet / deposit / adjustment / credit_request / credit_approved / credit_denied
+    kind: str
+    game: Optional[str] = None          # "roulette" / "slots" para apuestas
+    amount: int = Field(default=0)      # apuesta, depósito o monto solicitado (centavos)
+    payout: int = Field(default=0)      # cambio neto en el saldo (centavos)
+    ref_id: Optional[int] = None        # id del Spin / SlotSpin / CreditRequest
+    detail: Optional[str] = None        # JSON con datos propios del evento
+
+
+class LeaderboardSnapshot(SQLModel, table=True):
+    """Foto periódica de los leaderboards en memoria (para reiniciar sin perderlos)"""
+    __table_args__ = (
+        Index("ix_leaderboardsnapshot_board_period_rank", "board", "period", "rank"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    board: str              # "ganancias" / "biggest_win"
+    period: str             # "all_time" o la fecha UTC "YYYY-MM-DD"
+    rank: int
+    user_id: int = Field(foreign_key="user.id")
+    username: str
+    score: int              # centavos
+    taken_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class ClientSeed(SQLModel, table=True):
+    """Client seeds internados por sesión: los spins compactos guardan solo el id"""
+    __table_args__ = (UniqueConstraint("game", "session_id", "seed"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    game: str                        # "roulette" / "slots"
+    session_id: int
+    seed: str
+
+
+class GameRollup(SQLModel, table=True):
+    """Totales de apuestas por juego y hora/día (app.analytics.rollups), sumados al liquidar"""
+    __table_args__ = (UniqueConstraint("period", "game", "bucket"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    period: str                      # "hour" / "day"
+    game: str                        # "roulette" / "slots"
+    bucket: datetime                 # inicio de la hora/día, UTC
+    bets: int = Field(default=0)
+    wagered: int = Field(default=0)  # apostado, en centavos
+    paid_out: int = Field(default=0)  # premios brutos devueltos, en centavos
+    players: int = Field(default=0)  # jugadores distintos en el bucket
+
+
+class GameRollupPlayer(SQLModel, table=True):
+    """Jugadores ya contados en cada bucket de GameRollup (para players exacto)"""
+    __table_args__ = (UniqueConstraint("period", "game", "bucket", "user_id"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    period: str
+    game: str
+    bucket: datetime
+    user_id: int = Field(foreign_key="user.id")
+
+
+class SpinRollup(SQLModel, table=True):
+    """Totales por usuario y juego de los spins ya movidos al archivo (app.games.archive)"""
+    __table_args__ = (UniqueConstraint("user_id", "game"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    game: str                        # "roulette" / "slots"
+    spins: int = Field(default=0)
+    # montos en centavos
+    total_bet: int = Field(default=0)        # suma de bet_amount (en slots, por línea)
+    total_won: int = Field(default=0)        # ganancias brutas
+    net: int = Field(default=0)              # resultado neto para el jugador
+    biggest_win: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class SpinArchiveMonth(SQLModel, table=True):
+    """Meses archivados que tienen spins de cada usuario (para abrir solo esos archivos)"""
+    __table_args__ = (UniqueConstraint("user_id", "game", "month"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    game: str
+    month: str                       # "YYYY-MM"
+    rows: int = Field(default=0)
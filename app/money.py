@@ -0,0 +1,54 @@
+# app/money.py
+"""
+Dinero como enteros en unidades menores (centavos).
+
+Saldos, apuestas, premios, créditos y totales se guardan y se operan como int:
+las sumas en SQL son exactas y las comparaciones de saldo no tienen error de
+redondeo. Los decimales existen solo en el borde de la API: los modelos de
+request parsean con Money (y rechazan fracciones de centavo) y las rutas
+convierten las respuestas con to_major().
+"""
+from decimal import ROUND_FLOOR, Decimal, InvalidOperation
+from typing import Annotated, Any, Optional
+
+from pydantic import BeforeValidator, PlainSerializer, WithJsonSchema
+
+MINOR_PER_UNIT = 100
+
+
+def to_minor(amount: Any) -> int:
+    """Monto decimal (float, str, Decimal) -> centavos. Fracciones de centavo son error"""
+    if isinstance(amount, bool):
+        raise ValueError("Invalid amount")
+    try:
+        minor = Decimal(str(amount)) * MINOR_PER_UNIT
+    except InvalidOperation:
+        raise ValueError("Invalid amount")
+    if not minor.is_finite():
+        raise ValueError("Invalid amount")
+    if minor != minor.to_integral_value():
+        raise ValueError("Amount must have at most 2 decimals")
+    return int(minor)
+
+
+def to_major(minor: Optional[int]) -> Optional[float]:
+    """Centavos -> monto decimal para la respuesta"""
+    if minor is None:
+        return None
+    return minor / MINOR_PER_UNIT
+
+
+def scale(minor: int, factor: float) -> int:
+    """Monto por un multiplicador (p.ej. de un paytable); redondea hacia abajo al centavo"""
+    product = Decimal(minor) * Decimal(str(factor))
+    return int(product.to_integral_value(rounding=ROUND_FLOOR))
+
+
+# campo de request: entra como decimal y queda en centavos (model_dump() da el int;
+# solo el dump a JSON vuelve a decimal)
+Money = Annotated[
+    int,
+    BeforeValidator(to_minor),
+    PlainSerializer(to_major, return_type=float, when_used="json"),
+    WithJsonSchema({"type": "number"}),
+]
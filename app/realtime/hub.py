@@ -0,0 +1,130 @@
+# app/realtime/hub.py
+"""
+Pub/sub en proceso para empujar el saldo a los clientes (WebSocket / SSE).
+
+- Suscriptores indexados por user_id; cada conexión tiene su propia cola acotada.
+- publish() serializa el evento UNA vez y lo reparte a todas las conexiones.
+- Backpressure por conexión: si un cliente lento llena su cola se descarta el
+  mensaje más viejo (son snapshots de saldo: el último es el que importa) y el
+  publicador nunca se bloquea.
+- publish() puede llamarse desde los hilos del threadpool (rutas sync): la
+  entrega se agenda en el event loop de cada conexión con call_soon_threadsafe.
+"""
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Iterable, List
+
+from sqlmodel import Session, select
+
+from app.model import User
+from app.money import to_major
+from app.users import versions
+
+QUEUE_SIZE = 16
+
+# campos extra de los eventos que son montos (en centavos adentro, decimales al cliente)
+MONEY_FIELDS = ("amount", "bet_amount", "payout")
+
+
+class Subscription:
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop, maxsize: int = QUEUE_SIZE):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def offer(self, message: str) -> None:
+        """Se ejecuta en el loop de la conexión"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class BalanceHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: Dict[int, List[Subscription]] = {}
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """Debe llamarse desde el event loop que va a consumir la cola"""
+        sub = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subs.setdefault(user_id, []).append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subs.get(sub.user_id, [])
+            if sub in subs:
+                subs.remove(sub)
+            if not subs:
+                self._subs.pop(sub.user_id, None)
+
+    def has_subscribers(self, user_id: int) -> bool:
+        with self._lock:
+            return bool(self._subs.get(user_id))
+
+    def publish(self, user_id: int, event: Dict[str, Any]) -> int:
+        """Encola el evento en todas las conexiones del usuario; devuelve cuántas"""
+        with self._lock:
+            subs = list(self._subs.get(user_id, ()))
+        if not subs:
+            return 0
+        message = json.dumps(event)
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, message)
+            except RuntimeError:
+                # loop cerrado: la conexión ya se fue
+                self.unsubscribe(sub)
+        return len(subs)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._subs),
+                "connections": sum(len(s) for s in self._subs.values()),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._subs.clear()
+
+
+hub = BalanceHub()
+
+
+def balance_snapshot(user: User, event: str, **extra: Any) -> Dict[str, Any]:
+    data = {
+        "event": event,
+        "user_id": user.id,
+        "saldo": to_major(user.saldo),
+        "ganancias_totales": to_major(user.ganancias_totales),
+        "perdidas_totales": to_major(user.perdidas_totales),
+    }
+    for key, value in extra.items():
+        data[key] = to_major(value) if key in MONEY_FIELDS else value
+    return data
+
+
+def balance_changed(user: User, event: str, **extra: Any) -> None:
+    """
+    Llamar DESPUÉS del commit de cualquier cambio de saldo: invalida el ETag
+    del usuario y empuja el nuevo saldo a sus conexiones abiertas.
+    """
+    versions.bump(user.id)
+    hub.publish(user.id, balance_snapshot(user, event, **extra))
+
+
+def balances_changed(db: Session, user_ids: Iterable[int], event: str) -> None:
+    """Versión por lote (aprobación masiva): solo lee a los usuarios conectados"""
+    ids = set(user_ids)
+    for user_id in ids:
+        versions.bump(user_id)
+    connected = [uid for uid in ids if hub.has_subscribers(uid)]
+    if not connected:
+        return
+    for user in db.exec(select(User).where(User.id.in_(connected))).all():
+        hub.publish(user.id, balance_snapshot(user, event))
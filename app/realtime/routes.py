@@ -0,0 +1,85 @@
+# app/realtime/routes.py
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from sqlmodel import Session
+
+from app.database import get_session
+from app.auth.services import get_user_from_token
+from app.realtime.hub import hub, balance_snapshot
+
+router = APIRouter(prefix="/v1/stream", tags=["stream"])
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+SSE_KEEPALIVE_SECONDS = 15
+
+
+@router.websocket("/balance")
+async def balance_ws(websocket: WebSocket, token: str, db: Session = Depends(get_session)):
+    """
+    WS /v1/stream/balance?token=<jwt>
+    Envía el saldo actual al conectar y luego cada cambio (apuestas, depósitos, créditos).
+    """
+    user = await run_in_threadpool(get_user_from_token, db, token)
+    if not user:
+        await websocket.close(code=4401)
+        return
+    await websocket.accept()
+    sub = hub.subscribe(user.id)
+    receiver = getter = None
+    try:
+        await websocket.send_json(balance_snapshot(user, "snapshot"))
+        receiver = asyncio.ensure_future(websocket.receive())
+        while True:
+            getter = asyncio.ensure_future(sub.queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                if receiver.result()["type"] == "websocket.disconnect":
+                    break
+                # mensajes del cliente se ignoran (ping de la app, etc.)
+                receiver = asyncio.ensure_future(websocket.receive())
+                continue
+            await websocket.send_text(getter.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # si el envío falla (cliente caído a mitad) no deben quedar futures colgados
+        for pending in (receiver, getter):
+            if pending is not None and not pending.done():
+                pending.cancel()
+        hub.unsubscribe(sub)
+
+
+@router.get("/balance/sse")
+async def balance_sse(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)):
+    """
+    GET /v1/stream/balance/sse (Authorization: Bearer <jwt>)
+    Misma información que el WebSocket como Server-Sent Events.
+    """
+    user = await run_in_threadpool(get_user_from_token, db, token)
+    if not user:
+        raise HTTPException(status_code=401, detail="Token inválido o expirado")
+    first = json.dumps(balance_snapshot(user, "snapshot"))
+    sub = hub.subscribe(user.id)
+
+    async def events():
+        try:
+            yield f"data: {first}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(sub.queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {message}\n\n"
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
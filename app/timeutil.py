@@ -0,0 +1,18 @@
+# app/timeutil.py
+"""
+Fechas en UTC. Las columnas guardan UTC sin zona (así las devuelve SQLite);
+la API y los cálculos usan datetimes con zona. Estos helpers pasan de uno a otro.
+"""
+from datetime import datetime, timezone
+
+
+def naive_utc(ts: datetime) -> datetime:
+    """`ts` en UTC sin zona (un naive se asume ya en UTC)"""
+    if ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def aware_utc(ts: datetime) -> datetime:
+    """`ts` con zona; un naive se asume en UTC"""
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
@@ -0,0 +1,156 @@
+# app/users/activity.py
+"""
+Escritura y lectura del feed de actividad (tabla Activity).
+
+record_activity() solo hace db.add(): quien la llama la incluye en el mismo
+commit que el evento, así el feed nunca queda desincronizado de los saldos.
+La lectura es un solo range scan sobre (user_id, created_at, id).
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlmodel import Session, select, or_, and_
+
+from app.games import compact
+from app.model import Activity, CreditRequest, SlotSpin, Spin
+from app.money import to_major
+from app.pagination import encode_cursor, decode_cursor
+
+
+def record_activity(
+    db: Session,
+    user_id: int,
+    kind: str,
+    amount: int = 0,
+    payout: int = 0,
+    game: Optional[str] = None,
+    ref_id: Optional[int] = None,
+    detail: Optional[Dict[str, Any]] = None,
+    created_at: Optional[datetime] = None,
+) -> Activity:
+    row = Activity(
+        user_id=user_id,
+        kind=kind,
+        amount=int(amount),
+        payout=int(payout),
+        game=game,
+        ref_id=ref_id,
+        detail=json.dumps(detail) if detail else None,
+    )
+    if created_at is not None:
+        row.created_at = created_at
+    db.add(row)
+    return row
+
+
+def page_activity(
+    db: Session,
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    kind: Optional[str] = None,
+) -> Tuple[List[Activity], Optional[str]]:
+    """Actividad más reciente primero; devuelve (filas, next_cursor)"""
+    stmt = (
+        select(Activity)
+        .where(Activity.user_id == user_id)
+        .order_by(Activity.created_at.desc(), Activity.id.desc())
+    )
+    if kind:
+        stmt = stmt.where(Activity.kind == kind)
+    if cursor:
+        c_created, c_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            Activity.created_at < c_created,
+            and_(Activity.created_at == c_created, Activity.id < c_id),
+        ))
+    rows = db.exec(stmt.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+def activity_to_dict(row: Activity) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "kind": row.kind,
+        "game": row.game,
+        "amount": to_major(row.amount),
+        "payout": to_major(row.payout),
+        "ref_id": row.ref_id,
+        "detail": json.loads(row.detail) if row.detail else None,
+        "created_at": row.created_at.isoformat(),
+    }
+
+
+def backfill_activity(db: Session, chunk_size: int = 1000) -> int:
+    """
+    Carga en Activity el historial previo a la tabla (spins con usuario y
+    solicitudes de crédito). Solo para una DB cuyo feed está vacío.
+    """
+    if db.exec(select(Activity.id).limit(1)).first() is not None:
+        raise ValueError("Activity already has rows")
+    total = 0
+    last_id = 0
+    while True:
+        spins = db.exec(
+            select(Spin).where(Spin.id > last_id, Spin.user_id.is_not(None))
+            .order_by(Spin.id).limit(chunk_size)
+        ).all()
+        if not spins:
+            break
+        for s in spins:
+            compact.hydrate(db, "roulette", s)
+            record_activity(db, s.user_id, "roulette_bet", amount=s.bet_amount, payout=s.payout,
+                            game="roulette", ref_id=s.id, created_at=s.timestamp,
+                            detail={"pocket": s.pocket, "color": s.color, "bet_type": s.bet_type})
+        last_id = spins[-1].id
+        total += len(spins)
+        db.commit()
+    last_id = 0
+    while True:
+        spins = db.exec(
+            select(SlotSpin).where(SlotSpin.id > last_id, SlotSpin.user_id.is_not(None))
+            .order_by(SlotSpin.id).limit(chunk_size)
+        ).all()
+        if not spins:
+            break
+        for s in spins:
+            compact.hydrate(db, "slots", s)
+            total_bet = s.bet_amount * s.lines
+            record_activity(db, s.user_id, "slot_bet", amount=total_bet, payout=s.win_amount - total_bet,
+                            game="slots", ref_id=s.id, created_at=s.timestamp,
+                            detail={"symbols": json.loads(s.symbols), "multiplier": s.multiplier})
+        last_id = spins[-1].id
+        total += len(spins)
+        db.commit()
+    last_id = 0
+    while True:
+        reqs = db.exec(
+            select(CreditRequest).where(CreditRequest.id > last_id)
+            .order_by(CreditRequest.id).limit(chunk_size)
+        ).all()
+        if not reqs:
+            break
+        for req in reqs:
+            record_activity(db, req.user_id, "credit_request", amount=req.amount,
+                            ref_id=req.id, created_at=req.created_at)
+            if req.status in ("approved", "denied") and req.reviewed_at:
+                record_activity(db, req.user_id, f"credit_{req.status}", amount=req.amount,
+                                payout=req.amount if req.status == "approved" else 0,
+                                ref_id=req.id, created_at=req.reviewed_at)
+        last_id = reqs[-1].id
+        total += len(reqs)
+        db.commit()
+    return total
+
+
+if __name__ == "__main__":
+    # python -m app.users.activity  -> backfill de una DB existente
+    from app.database import engine
+
+    with Session(engine) as s:
+        print(f"{backfill_activity(s)} eventos cargados en Activity")
@@ -0,0 +1,182 @@
+# app/users/export.py
+"""
+Export del historial de apuestas de un usuario (ruleta + slots) en CSV o NDJSON.
+
+Memoria constante sin importar el tamaño del historial:
+- cada juego se lee en bloques keyset sobre (timestamp, id) usando el índice
+  (user_id, timestamp, id), solo con las columnas necesarias;
+- los dos flujos ya ordenados se mezclan con heapq.merge (perezoso);
+- cada fila se codifica y se entrega al StreamingResponse apenas se lee.
+
+Los spins ya archivados (app.games.archive) se leen de sus archivos mensuales
+y se mezclan en orden con los de la DB.
+"""
+import csv
+import heapq
+import io
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select, or_, and_
+
+from app.games import archive, compact
+from app.model import Spin, SlotSpin
+from app.money import to_major
+from app.timeutil import naive_utc
+
+CHUNK_SIZE = 500
+
+EXPORT_COLUMNS = [
+    "timestamp", "game", "spin_id", "session_id", "nonce", "client_seed", "hmac_hex",
+    "bet_type", "stake", "net", "result",
+]
+
+
+def _iter_chunks(db: Session, model, columns, user_id: int,
+                 date_from: Optional[datetime], date_to: Optional[datetime],
+                 chunk_size: int) -> Iterator[Any]:
+    last = None
+    while True:
+        stmt = (
+            select(*columns)
+            .where(model.user_id == user_id)
+            .order_by(model.timestamp, model.id)
+            .limit(chunk_size)
+        )
+        if date_from is not None:
+            stmt = stmt.where(model.timestamp >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(model.timestamp < date_to)
+        if last is not None:
+            stmt = stmt.where(or_(
+                model.timestamp > last[0],
+                and_(model.timestamp == last[0], model.id > last[1]),
+            ))
+        rows = db.exec(stmt).all()
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1].timestamp, rows[-1].id)
+
+
+def _with_archived(db: Session, game: str, hot: Iterator[Any], user_id: int,
+                   date_from: Optional[datetime], date_to: Optional[datetime]) -> Iterator[Any]:
+    archived = (SimpleNamespace(**row) for row in
+                archive.iter_archived(db, game, user_id, date_from, date_to))
+    last_id = None
+    for r in heapq.merge(archived, hot, key=lambda r: (r.timestamp, r.id)):
+        if r.id == last_id:
+            continue  # fila de un lote a medio archivar: está en la DB y en el archivo
+        last_id = r.id
+        yield r
+
+
+def iter_roulette_history(db: Session, user_id: int, date_from: Optional[datetime] = None,
+                          date_to: Optional[datetime] = None,
+                          chunk_size: int = CHUNK_SIZE,
+                          include_archived: bool = True) -> Iterator[Dict[str, Any]]:
+    columns = (Spin.id, Spin.timestamp, Spin.session_id, Spin.nonce, Spin.client_seed,
+               Spin.hmac_hex, Spin.bet_type, Spin.bet_amount, Spin.payout, Spin.pocket, Spin.color,
+               Spin.hmac_digest, Spin.client_seed_id)
+    rows = _iter_chunks(db, Spin, columns, user_id, date_from, date_to, chunk_size)
+    if include_archived:
+        rows = _with_archived(db, "roulette", rows, user_id, date_from, date_to)
+    for r in rows:
+        full = compact.expand(db, "roulette", r)
+        yield {
+            "timestamp": r.timestamp,
+            "game": "roulette",
+            "spin_id": r.id,
+            "session_id": r.session_id,
+            "nonce": r.nonce,
+            "client_seed": full.get("client_seed", r.client_seed),
+            "hmac_hex": full.get("hmac_hex", r.hmac_hex),
+            "bet_type": r.bet_type,
+            "stake": to_major(r.bet_amount),
+            "net": to_major(r.payout),
+            "result": f"{r.pocket} {full.get('color', r.color)}",
+        }
+
+
+def iter_slot_history(db: Session, user_id: int, date_from: Optional[datetime] = None,
+                      date_to: Optional[datetime] = None,
+                      chunk_size: int = CHUNK_SIZE,
+                      include_archived: bool = True) -> Iterator[Dict[str, Any]]:
+    columns = (SlotSpin.id, SlotSpin.timestamp, SlotSpin.session_id, SlotSpin.nonce,
+               SlotSpin.client_seed, SlotSpin.hmac_hex, SlotSpin.bet_amount, SlotSpin.lines,
+               SlotSpin.win_amount, SlotSpin.symbols, SlotSpin.hmac_digest, SlotSpin.client_seed_id,
+               SlotSpin.symbol_code)
+    rows = _iter_chunks(db, SlotSpin, columns, user_id, date_from, date_to, chunk_size)
+    if include_archived:
+        rows = _with_archived(db, "slots", rows, user_id, date_from, date_to)
+    for r in rows:
+        stake = r.bet_amount * r.lines
+        full = compact.expand(db, "slots", r)
+        yield {
+            "timestamp": r.timestamp,
+            "game": "slots",
+            "spin_id": r.id,
+            "session_id": r.session_id,
+            "nonce": r.nonce,
+            "client_seed": full.get("client_seed", r.client_seed),
+            "hmac_hex": full.get("hmac_hex", r.hmac_hex),
+            "bet_type": f"lines:{r.lines}",
+            "stake": to_major(stake),
+            "net": to_major(r.win_amount - stake),
+            "result": " ".join(json.loads(full.get("symbols", r.symbols))),
+        }
+
+
+def iter_history(db: Session, user_id: int, date_from: Optional[datetime] = None,
+                 date_to: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    """Ruleta y slots mezclados por timestamp (ambos flujos ya vienen ordenados)"""
+    return heapq.merge(
+        iter_roulette_history(db, user_id, date_from, date_to),
+        iter_slot_history(db, user_id, date_from, date_to),
+        key=lambda row: (row["timestamp"], row["game"], row["spin_id"]),
+    )
+
+
+def encode_csv(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({**row, "timestamp": row["timestamp"].isoformat()})
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def encode_ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps({**row, "timestamp": row["timestamp"].isoformat()}) + "\n"
+
+
+ENCODERS = {
+    "csv": (encode_csv, "text/csv"),
+    "ndjson": (encode_ndjson, "application/x-ndjson"),
+}
+
+
+def export_response(db: Session, user_id: int, fmt: str, date_from: Optional[datetime],
+                    date_to: Optional[datetime], filename: str) -> StreamingResponse:
+    if fmt not in ENCODERS:
+        raise ValueError("format must be csv or ndjson")
+    encoder, media_type = ENCODERS[fmt]
+    # los timestamps se guardan en UTC sin zona: los límites se comparan igual
+    if date_from is not None:
+        date_from = naive_utc(date_from)
+    if date_to is not None:
+        date_to = naive_utc(date_to)
+    rows = iter_history(db, user_id, date_from, date_to)
+    return StreamingResponse(
+        encoder(rows),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
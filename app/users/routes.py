@@ -1,15 +1,22 @@
 # app/profile/routes.py
-from datetime import date
+from datetime import date, datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
 from pydantic import BaseModel
 from sqlmodel import Session
 from fastapi.security import OAuth2AuthorizationCodeBearer
-from app.users.dependencies import get_current_user
+from app.users.dependencies import get_current_user, oauth2_scheme
+from app.users import versions
+from app.realtime.hub import balance_changed
+from app.users.activity import record_activity, page_activity, activity_to_dict
+from app.users.export import export_response
+from app.auth.jwt import decode_access_token
+from app.auth.services import get_user_from_token
 from app.database import get_session
 from app.users.services import get_profile_by_username, update_user_contact
 from app.model import User
+from app.money import to_major, to_minor
 from app.users.schemas import UserUpdateConctact, PerfilResponse, UserUpdatePassword
 from app.auth.utils import verify_password, get_password_hash
 
@@ -18,15 +25,33 @@ router = APIRouter(prefix="/profile", tags=["Profile"])
 
 
 @router.get("/{username}", response_model=PerfilResponse)
-def get_profile(username: str, db: Session = Depends(get_session)):
+def get_profile(
+    username: str,
+    response: Response,
+    db: Session = Depends(get_session),
+    if_none_match: Optional[str] = Header(None),
+):
     """
     NO usa JWT. El front envía el username en la URL:
     GET /profile/anago2025
+    Responde 304 sin tocar la DB si If-None-Match coincide con la versión actual.
     """
+    etag = versions.cached_etag(username, "perfil")
+    if versions.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
     user: User | None = get_profile_by_username(db, username)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
+    # el ETag se calcula ANTES de leer: si los datos cambian en medio, queda viejo
+    # y el próximo poll recarga. La primera vez que se ve al usuario recién ahora
+    # se sabe su id: se fija la versión y se vuelve a leer.
+    if etag is None:
+        versions.remember(user.id, user.username)
+        etag = versions.etag_for(user.id, "perfil")
+        db.refresh(user)
+    response.headers["ETag"] = etag
     return PerfilResponse(
         nombres=user.name,
         apellidos=user.apellidos,
@@ -36,9 +61,9 @@ def get_profile(username: str, db: Session = Depends(get_session)):
         fecha_nacimiento=user.fecha_nacimiento,
         tipo_documento=user.tipo_documento,
         numero_documento=user.numero_documento,
-        saldo=user.saldo,
-        ganancias_totales=user.ganancias_totales,
-        perdidas_totales=user.perdidas_totales,
+        saldo=to_major(user.saldo),
+        ganancias_totales=to_major(user.ganancias_totales),
+        perdidas_totales=to_major(user.perdidas_totales),
     )
 
 
@@ -57,6 +82,7 @@ def update_user(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    versions.bump(current_user.id)
 
     return UserUpdateConctact(
         email=current_user.email,
@@ -86,9 +112,68 @@ def update_Password(
 
 @router.get("/me/saldo")
 def User_saldo(
+    response: Response,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session),
+    if_none_match: Optional[str] = Header(None),
+):
+    # el token se valida sin DB; si el ETag sigue vigente no hace falta leer al usuario.
+    # Un usuario borrado o desactivado deja de tener ETag (versions.forget) y cae a la DB.
+    payload = decode_access_token(token)
+    username = payload.get("sub") if payload else None
+    etag = versions.cached_etag(username, "saldo") if username else None
+    if versions.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    current_user = get_user_from_token(db, token)
+    if not current_user:
+        raise HTTPException(
+            status_code=401,
+            detail="Token invalido o usuario no encontrado"
+        )
+    if etag is None:
+        # primera lectura del usuario en este proceso (ver get_profile)
+        versions.remember(current_user.id, current_user.username)
+        etag = versions.etag_for(current_user.id, "saldo")
+        db.refresh(current_user)
+    response.headers["ETag"] = etag
+    return { "saldo": to_major(current_user.saldo) }
+
+@router.get("/me/activity")
+def my_activity(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    kind: Optional[str] = None,
+    db: Session = Depends(get_session),
     current_user: User = Depends(get_current_user),
 ):
-    return { "saldo": current_user.saldo }
+    """
+    Historial mezclado (ruleta, slots, depósitos y créditos), más reciente primero.
+    Siguiente página: GET /profile/me/activity?cursor=<next_cursor>
+    """
+    try:
+        rows, next_cursor = page_activity(db, current_user.id, cursor=cursor, limit=limit, kind=kind)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": [activity_to_dict(r) for r in rows], "next_cursor": next_cursor}
+
+@router.get("/me/export")
+def export_my_history(
+    format: str = "csv",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Descarga todo el historial de apuestas (ruleta + slots) en streaming.
+    GET /profile/me/export?format=ndjson&date_from=2025-01-01
+    """
+    try:
+        return export_response(db, current_user.id, format, date_from, date_to,
+                               f"historial_{current_user.username}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 #### solo development ####
 @router.get("/id/{user_id}")
@@ -125,21 +210,27 @@ def add_balance_to_user(
     """
     if amount <= 0:
         raise HTTPException(status_code=400, detail="El monto debe ser mayor a 0")
+    try:
+        minor = to_minor(amount)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     user = db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
-    user.saldo += amount
+    user.saldo += minor
     db.add(user)
+    record_activity(db, user.id, "deposit", amount=minor, payout=minor)
     db.commit()
     db.refresh(user)
+    balance_changed(user, "deposit", amount=minor)
     
     return {
         "message": "Saldo agregado exitosamente",
         "user_id": user.id,
         "username": user.username,
-        "saldo_anterior": user.saldo - amount,
-        "monto_agregado": amount,
-        "saldo_nuevo": user.saldo
+        "saldo_anterior": to_major(user.saldo - minor),
+        "monto_agregado": to_major(minor),
+        "saldo_nuevo": to_major(user.saldo)
     }
@@ -24,7 +24,7 @@ class PerfilResponse(BaseModel):
     tipo_documento: Optional[str]
     numero_documento: Optional[str]
 
-    # Columna derecha
+    # Columna derecha (montos decimales; en la DB son centavos)
     saldo: float
     ganancias_totales: float
     perdidas_totales: float
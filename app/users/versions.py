@@ -0,0 +1,120 @@
+# app/users/versions.py
+"""
+Versión en memoria por usuario para ETags de perfil/saldo.
+
+Cada cambio de saldo o de perfil llama a bump(user_id) DESPUÉS del commit.
+Los GET condicionales comparan If-None-Match contra este mapa y responden 304
+sin tocar la DB. EPOCH cambia en cada arranque, así que un ETag emitido por un
+proceso anterior nunca coincide (los contadores arrancan de cero).
+Es estado por proceso: con varios workers cada uno valida solo sus propios ETags.
+
+/me/saldo responde 304 solo con el JWT, sin leer al usuario: un usuario borrado o
+desactivado seguiría recibiendo 304 hasta que venza su token. Para eso forget()
+lo saca de los mapas (lo llaman los listeners de User de abajo al borrarlo o poner
+is_Active = False) y la próxima consulta vuelve a la DB. Solo alcanza al proceso
+que hizo el cambio: en los demás workers el 304 dura hasta que desalojen al
+usuario o venza el token.
+
+Los dos mapas son LRU de USER_VERSIONS_CACHE_SIZE entradas. Las versiones salen
+de un reloj global que solo avanza: un usuario desalojado vuelve con la hora
+actual, que es >= a su último bump, así que nunca reaparece una versión vieja
+que coincida con un ETag emitido antes de un cambio.
+"""
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event, inspect
+
+from app import config
+from app.model import User
+
+EPOCH = secrets.token_hex(4)
+
+_lock = threading.Lock()
+_clock = 0
+_versions: "OrderedDict[int, int]" = OrderedDict()
+_ids_by_username: "OrderedDict[str, int]" = OrderedDict()
+
+
+def _put(lru: OrderedDict, key, value) -> None:
+    lru[key] = value
+    lru.move_to_end(key)
+    while len(lru) > config.USER_VERSIONS_CACHE_SIZE:
+        lru.popitem(last=False)
+
+
+def _version(user_id: int) -> int:
+    version = _versions.get(user_id)
+    if version is None:
+        version = _clock
+        _put(_versions, user_id, version)
+    else:
+        _versions.move_to_end(user_id)
+    return version
+
+
+def bump(user_id: int) -> None:
+    global _clock
+    with _lock:
+        _clock += 1
+        _put(_versions, user_id, _clock)
+
+
+def remember(user_id: int, username: str) -> None:
+    with _lock:
+        _put(_ids_by_username, username, user_id)
+        _version(user_id)
+
+
+def etag_for(user_id: int, resource: str) -> str:
+    with _lock:
+        version = _version(user_id)
+    return f'"{resource}-{EPOCH}-{user_id}-{version}"'
+
+
+def cached_etag(username: str, resource: str) -> Optional[str]:
+    """ETag actual si ya conocemos al usuario; None obliga a leer la DB"""
+    with _lock:
+        user_id = _ids_by_username.get(username)
+        if user_id is not None:
+            _ids_by_username.move_to_end(username)
+    if user_id is None:
+        return None
+    return etag_for(user_id, resource)
+
+
+def forget(user_id: int) -> None:
+    """Olvida al usuario: su próximo GET condicional lee la DB"""
+    with _lock:
+        _versions.pop(user_id, None)
+        for username in [u for u, uid in _ids_by_username.items() if uid == user_id]:
+            del _ids_by_username[username]
+
+
+@event.listens_for(User, "after_update")
+def _forget_deactivated(mapper, connection, user: User) -> None:
+    history = inspect(user).attrs.is_Active.history
+    if history.has_changes() and not user.is_Active:
+        forget(user.id)
+
+
+@event.listens_for(User, "after_delete")
+def _forget_deleted(mapper, connection, user: User) -> None:
+    forget(user.id)
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def reset() -> None:
+    global _clock
+    with _lock:
+        _clock = 0
+        _versions.clear()
+        _ids_by_username.clear()
@@ -0,0 +1,172 @@
+# benchmarks/run.py
+"""
+Micro-benchmarks de la matemática de juegos y helpers criptográficos.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.run                 # mide y compara contra baseline.json
+    python -m benchmarks.run --save          # mide y guarda como nuevo baseline
+    python -m benchmarks.run -k hmac -k jwt  # solo los casos cuyo nombre contiene el filtro
+
+Metodología:
+- Cada caso se calibra con timeit.autorange hasta que un lote dura >= --min-time.
+- Se repite el lote --repeat veces con el GC desactivado (comportamiento de timeit)
+  y se usa el mejor tiempo (menos ruido del SO) para ops/sec; la mediana se reporta
+  para ver la dispersión.
+- Contra el baseline, un caso es regresión si sus ops/sec caen más de --tolerance.
+  El proceso sale con código 1 si hay regresiones (útil en CI antes del deploy).
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from app.auth.jwt import create_access_token, decode_access_token
+from app.auth.utils import get_password_hash, verify_password
+from app.games import provably_fair
+from app.games.roulette import service as roulette_service
+from app.games.slots import service as slot_service
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+SERVER_SEED = "5f" * 32
+CLIENT_SEED = "bench-client-seed"
+HMAC_HEX = roulette_service.hmac_sha256_hex(SERVER_SEED, f"{CLIENT_SEED}:0")
+TOKEN = create_access_token({"sub": "bench-user"})
+PASSWORD = "bench-password-123"
+PASSWORD_HASH = get_password_hash(PASSWORD)
+
+
+BET_STRAIGHT = {"type": "straight", "number": 17, "amount": 1000}  # centavos
+BET_COLUMN = {"type": "column", "which": 2, "amount": 1000}
+COMPILED_STRAIGHT = roulette_service.compile_bet(BET_STRAIGHT)
+COMPILED_COLUMN = roulette_service.compile_bet(BET_COLUMN)
+SYMBOLS_WIN = ["🍒", "🍒", "🍒"]
+
+
+def _cases() -> List[Tuple[str, Callable[[], object]]]:
+    return [
+        ("roulette.hmac_sha256_hex",
+         lambda: roulette_service.hmac_sha256_hex(SERVER_SEED, f"{CLIENT_SEED}:42")),
+        ("slots.hmac_sha256_hex",
+         lambda: slot_service.hmac_sha256_hex(SERVER_SEED, f"{CLIENT_SEED}:42")),
+        ("provably_fair.spin_hmac_hex",
+         lambda: provably_fair.spin_hmac_hex(SERVER_SEED, CLIENT_SEED, 42)),
+        ("provably_fair.derive_batch.x100",
+         lambda: provably_fair.derive_batch(SERVER_SEED, CLIENT_SEED, 0, 100)),
+        ("roulette.derive_integer_from_hex",
+         lambda: roulette_service.derive_integer_from_hex(HMAC_HEX)),
+        ("roulette.pocket_color",
+         lambda: roulette_service.pocket_color(17)),
+        # la apuesta se compila una vez por request (validación) y se evalúa con un lookup
+        ("roulette.compile_bet.straight",
+         lambda: roulette_service.compile_bet(BET_STRAIGHT)),
+        ("roulette.compile_bet.column",
+         lambda: roulette_service.compile_bet(BET_COLUMN)),
+        ("roulette.evaluate_compiled.straight",
+         lambda: roulette_service.evaluate_compiled(COMPILED_STRAIGHT, 17)),
+        ("roulette.evaluate_compiled.column",
+         lambda: roulette_service.evaluate_compiled(COMPILED_COLUMN, 17)),
+        ("slots.derive_symbols_from_hmac",
+         lambda: slot_service.derive_symbols_from_hmac(HMAC_HEX)),
+        ("slots.calculate_multiplier",
+         lambda: slot_service.calculate_multiplier(SYMBOLS_WIN)),
+        ("auth.create_access_token",
+         lambda: create_access_token({"sub": "bench-user"})),
+        ("auth.decode_access_token",
+         lambda: decode_access_token(TOKEN)),
+        ("auth.get_password_hash",
+         lambda: get_password_hash(PASSWORD)),
+        ("auth.verify_password",
+         lambda: verify_password(PASSWORD, PASSWORD_HASH)),
+    ]
+
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """Calibra el número de loops y devuelve best/median por operación y ops/sec."""
+    timer = timeit.Timer(fn)
+    fn()  # warm-up (caches, imports perezosos)
+    loops, elapsed = timer.autorange()
+    if elapsed < min_time:
+        loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+    runs = [t / loops for t in timer.repeat(repeat=repeat, number=loops)]
+    best = min(runs)
+    return {
+        "loops": loops,
+        "best_s": best,
+        "median_s": statistics.median(runs),
+        "ops_per_sec": 1.0 / best,
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> List[str]:
+    """Devuelve los nombres de casos que regresionaron más allá de la tolerancia."""
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if res["ops_per_sec"] < base["ops_per_sec"] * (1.0 - tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def _format_row(name: str, res: Dict[str, float], base: Dict[str, float] | None) -> str:
+    delta = ""
+    if base:
+        change = (res["ops_per_sec"] / base["ops_per_sec"] - 1.0) * 100.0
+        delta = f"{change:+8.1f}%"
+    return (f"{name:<36} {res['ops_per_sec']:>14,.0f} ops/s"
+            f"  best={res['best_s'] * 1e6:>10.2f}us"
+            f"  median={res['median_s'] * 1e6:>10.2f}us  {delta}")
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="filters", action="append", default=[],
+                        help="solo casos cuyo nombre contenga este texto (repetible)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="duración mínima (s) de cada lote medido")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="caída máxima de ops/sec aceptada contra el baseline (0.10 = 10%%)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="guardar resultados como baseline")
+    args = parser.parse_args(argv)
+
+    baseline_doc = {}
+    if args.baseline.exists():
+        baseline_doc = json.loads(args.baseline.read_text())
+    baseline = baseline_doc.get("results", {})
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, fn in _cases():
+        if args.filters and not any(f in name for f in args.filters):
+            continue
+        results[name] = measure(fn, args.repeat, args.min_time)
+        print(_format_row(name, results[name], baseline.get(name)))
+
+    if args.save:
+        merged = dict(baseline)
+        merged.update(results)
+        args.baseline.write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": merged,
+        }, indent=2, sort_keys=True) + "\n")
+        print(f"baseline guardado en {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"REGRESIONES (> {args.tolerance:.0%}): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
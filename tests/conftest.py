@@ -7,6 +7,29 @@ from sqlmodel.pool import StaticPool
 from app.main import app
 from app.database import get_session
 from app.model import User
+from app.users import versions
+from app.games import compact, provably_fair, session_cache
+from app.realtime.hub import hub
+from app.leaderboards import service as leaderboard_service
+from app.analytics import rollups
+from app.analytics.monitor import monitor
+from app.middleware import idempotency, rate_limit
+
+
+@pytest.fixture(autouse=True)
+def reset_in_process_state():
+    # cada test usa una DB nueva: los caches en memoria no deben sobrevivir
+    versions.reset()
+    provably_fair.clear_cache()
+    compact.clear()
+    session_cache.clear()
+    hub.reset()
+    leaderboard_service.reset()
+    monitor.reset()
+    rollups.reset()
+    idempotency.store.clear()
+    rate_limit.limiter.clear()
+    yield
 
 @pytest.fixture(name="session")
 def session_fixture():
@@ -0,0 +1,166 @@
+# tests/unit/test_admin_credits.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, SQLModel, select
+
+from app.admin import service as admin_service
+from app.migrations import deny_duplicate_pending_credits
+from app.model import Activity, CreditRequest
+
+
+def _signup_and_request(client: TestClient, username: str, amount: float) -> dict:
+    res = client.post("/auth/signup", json={
+        "username": username,
+        "password": "secret123",
+        "email": f"{username}@example.com",
+    })
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    client.post("/v1/credits/request", headers=headers, json={"amount": amount})
+    return headers
+
+
+@pytest.fixture
+def player_headers(client: TestClient):
+    return [
+        _signup_and_request(client, "credit_a", 10.0),
+        _signup_and_request(client, "credit_b", 20.0),
+        _signup_and_request(client, "credit_c", 30.0),
+    ]
+
+
+def test_admin_lists_with_usernames_and_keyset_pages(client: TestClient, admin_headers, player_headers):
+    first = client.get("/v1/admin/credits?limit=2", headers=admin_headers)
+    assert first.status_code == 200
+    page1 = first.json()
+    assert [r["username"] for r in page1] == ["credit_c", "credit_b"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(f"/v1/admin/credits?limit=2&cursor={cursor}", headers=admin_headers)
+    assert second.status_code == 200
+    assert [r["username"] for r in second.json()] == ["credit_a"]
+    assert "X-Next-Cursor" not in second.headers
+
+    # el frontend (otro origen) tiene que poder leer el header
+    cors = client.get("/v1/admin/credits?limit=2", headers={**admin_headers, "Origin": "http://localhost:5173"})
+    assert "X-Next-Cursor" in cors.headers["access-control-expose-headers"]
+
+
+def test_admin_filters_by_amount(client: TestClient, admin_headers, player_headers):
+    res = client.get("/v1/admin/credits?min_amount=15&max_amount=25", headers=admin_headers)
+    assert [r["amount"] for r in res.json()] == [20.0]
+
+
+def test_player_only_sees_own_requests(client: TestClient, player_headers):
+    res = client.get("/v1/admin/credits?user_id=1", headers=player_headers[1])
+    assert res.status_code == 200
+    assert [r["username"] for r in res.json()] == ["credit_b"]
+
+
+def test_invalid_cursor_is_400(client: TestClient, admin_headers):
+    res = client.get("/v1/admin/credits?cursor=not-a-cursor", headers=admin_headers)
+    assert res.status_code == 400
+
+
+def test_bulk_approve_credits_balances_once(client: TestClient, admin_headers, player_headers):
+    listed = client.get("/v1/admin/credits?status=pending", headers=admin_headers).json()
+    ids = sorted(r["id"] for r in listed)
+
+    res = client.post("/v1/admin/credits/bulk", headers=admin_headers,
+                      json={"action": "approve", "ids": ids + [9999]})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["summary"] == {"approved": 3, "not_found": 1}
+
+    again = client.post("/v1/admin/credits/bulk", headers=admin_headers,
+                        json={"action": "approve", "ids": ids})
+    assert again.json()["summary"] == {"already_processed": 3}
+
+    saldo = client.get("/profile/me/saldo", headers=player_headers[2]).json()["saldo"]
+    assert saldo == 1030.0
+
+
+def test_bulk_fallback_without_returning_credits_only_rows_it_changed(
+        client: TestClient, session: Session, admin_headers, player_headers, monkeypatch):
+    ids = sorted(r.id for r in session.exec(
+        select(CreditRequest).where(CreditRequest.status == "pending")).all())
+    engine = session.get_bind()
+    monkeypatch.setattr(engine.dialect, "update_returning", False)
+    raced = ids[-1]  # la de credit_c
+
+    raced_once = []
+
+    def other_admin(conn, cursor, statement, parameters, context, executemany):
+        # otro admin aprueba `raced` entre el SELECT de candidatas y el primer UPDATE
+        if statement.startswith("UPDATE creditrequest") and not raced_once:
+            raced_once.append(True)
+            cursor.connection.execute("UPDATE creditrequest SET status = 'approved' WHERE id = ?", (raced,))
+
+    event.listen(engine, "before_cursor_execute", other_admin)
+    try:
+        results = admin_service.bulk_review_credit_requests(session, "approve", 1, ids)
+    finally:
+        event.remove(engine, "before_cursor_execute", other_admin)
+    assert {r["id"]: r["outcome"] for r in results} == {
+        ids[0]: "approved", ids[1]: "approved", raced: "already_processed"}
+    saldo = client.get("/profile/me/saldo", headers=player_headers[2]).json()["saldo"]
+    assert saldo == 1000.0
+
+
+def test_bulk_deny_by_filter(client: TestClient, admin_headers, player_headers):
+    res = client.post("/v1/admin/credits/bulk", headers=admin_headers, json={
+        "action": "deny",
+        "filter": {"min_amount": 15},
+        "note": "limite",
+    })
+    assert res.status_code == 200
+    assert res.json()["summary"] == {"denied": 2}
+
+    denied = client.get("/v1/admin/credits?status=denied", headers=admin_headers).json()
+    assert all(r["note"].endswith("| Deny note: limite") for r in denied)
+
+
+def test_bulk_requires_admin(client: TestClient, player_headers):
+    res = client.post("/v1/admin/credits/bulk", headers=player_headers[0],
+                      json={"action": "approve", "ids": [1]})
+    assert res.status_code == 403
+
+
+def test_second_pending_request_rejected_by_constraint(client: TestClient, admin_headers, player_headers):
+    dup = client.post("/v1/credits/request", headers=player_headers[0], json={"amount": 5.0})
+    assert dup.status_code == 400
+    assert "pendiente" in dup.json()["detail"]
+
+    pending = client.get("/v1/admin/credits?status=pending", headers=player_headers[0]).json()
+    assert len(pending) == 1
+    client.post(f"/v1/admin/credits/{pending[0]['id']}/approve", headers=admin_headers, json={})
+
+    again = client.post("/v1/credits/request", headers=player_headers[0], json={"amount": 5.0})
+    assert again.status_code == 200
+    assert again.json()["status"] == "pending"
+
+
+def test_other_integrity_errors_are_not_reported_as_pending(session):
+    with pytest.raises(IntegrityError):
+        admin_service.create_credit_request(session, None, 500)  # user_id NOT NULL
+
+
+def test_duplicate_pending_rows_are_denied_before_the_index():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_creditrequest_user_pending"))
+        for i, created in enumerate(("2024-01-02", "2024-01-01", "2024-01-03")):
+            conn.execute(text(
+                "INSERT INTO creditrequest (id, user_id, amount, status, created_at) "
+                "VALUES (:id, 7, 100, 'pending', :c)"), {"id": i + 1, "c": created})
+
+    assert deny_duplicate_pending_credits(engine) == 2
+    with Session(engine) as db:
+        pending = db.exec(select(CreditRequest).where(CreditRequest.status == "pending")).all()
+        assert [r.id for r in pending] == [2]  # queda la más vieja
+        assert len(db.exec(select(Activity).where(Activity.kind == "credit_denied")).all()) == 2
+    for index in CreditRequest.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    assert deny_duplicate_pending_credits(engine) == 0
@@ -0,0 +1,77 @@
+# tests/unit/test_admission.py
+import asyncio
+import re
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.middleware.admission import AdmissionController, Pool
+
+
+def test_pool_queues_then_hands_over_slot():
+    async def scenario():
+        pool = Pool("bets", limit=1, queue=1)
+        assert await pool.acquire(1.0)
+
+        waiter = asyncio.ensure_future(pool.acquire(1.0))
+        await asyncio.sleep(0.01)
+        assert pool.stats()["queued"] == 1
+        # cola llena: se rechaza enseguida
+        assert not await pool.acquire(1.0)
+
+        pool.release()
+        assert await waiter
+        pool.release()
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0 and stats["queued"] == 0
+    assert stats["admitted"] == 2 and stats["shed_queue_full"] == 1
+
+
+def test_pool_sheds_after_deadline():
+    async def scenario():
+        pool = Pool("auth", limit=1, queue=10)
+        await pool.acquire(1.0)
+        assert not await pool.acquire(0.02)
+        pool.release()
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["shed_deadline"] == 1
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_routes_are_classified_by_class():
+    controller = AdmissionController([Pool("auth", 1, 1), Pool("bets", 1, 1), Pool("exports", 1, 1),
+                                      Pool("reads", 1, 1)])
+    assert controller.classify("POST", "/auth/login").name == "auth"
+    assert controller.classify("POST", "/v1/slots/session/3/bet").name == "bets"
+    assert controller.classify("GET", "/profile/me/saldo").name == "reads"
+    assert controller.classify("GET", "/v1/stream/balance/sse") is None
+    assert controller.classify("GET", "/profile/me/export").name == "exports"
+    assert controller.classify("GET", "/v1/admin/users/7/export").name == "exports"
+    assert controller.classify("POST", "/v1/roulette/verify").name == "reads"
+
+
+def test_every_http_route_lands_in_a_pool():
+    controller = AdmissionController([Pool(n, 1, 1) for n in ("auth", "bets", "exports", "reads")])
+    for route in app.routes:
+        if route.path.startswith("/v1/stream/"):
+            continue
+        path = re.sub(r"\{[^}]+\}", "1", route.path)
+        for method in getattr(route, "methods", None) or ():
+            assert controller.classify(method, path) is not None, (method, route.path)
+    assert controller.classify("POST", "/v1/slots/session/4/reveal").name == "bets"
+    assert controller.classify("POST", "/v1/roulette/verify").name == "reads"
+    assert controller.classify("PATCH", "/profile/me/update").name == "bets"
+
+
+def test_admission_stats_admin_only(client: TestClient, auth_headers, admin_headers):
+    assert client.get("/v1/admin/admission", headers=auth_headers).status_code == 403
+    res = client.get("/v1/admin/admission", headers=admin_headers)
+    assert res.status_code == 200
+    body = res.json()
+    assert set(body) == {"auth", "bets", "exports", "reads"}
+    assert body["auth"]["admitted"] >= 1
+    assert body["reads"]["active"] == 1  # este mismo request
@@ -0,0 +1,19 @@
+# tests/unit/test_benchmarks.py
+from benchmarks.run import compare, measure
+
+
+def test_measure_reports_ops_per_sec():
+    res = measure(lambda: sum(range(10)), repeat=2, min_time=0.01)
+    assert res["loops"] >= 1
+    assert res["best_s"] <= res["median_s"]
+    assert res["ops_per_sec"] > 0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    baseline = {"a": {"ops_per_sec": 100.0}, "b": {"ops_per_sec": 100.0}}
+    results = {
+        "a": {"ops_per_sec": 95.0},   # dentro de la tolerancia
+        "b": {"ops_per_sec": 80.0},   # regresión
+        "c": {"ops_per_sec": 1.0},    # sin baseline, se ignora
+    }
+    assert compare(results, baseline, tolerance=0.10) == ["b"]
@@ -0,0 +1,85 @@
+# tests/unit/test_compact_storage.py
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+from sqlmodel import Session, select
+
+from app import config
+from app.games import compact, provably_fair
+from app.games.slots import service as slot_service
+from app.migrations import add_missing_columns
+from app.model import Activity, ClientSeed, RouletteSession, SlotSpin, Spin
+
+
+def test_roulette_compact_rows_read_back_in_full(
+        client: TestClient, session: Session, auth_headers, monkeypatch):
+    session_id = client.post("/v1/roulette/session").json()["session_id"]
+    spin_url = f"/v1/roulette/session/{session_id}/spin"
+    full = client.post(spin_url, json={"client_seed": "abc"}).json()
+
+    monkeypatch.setattr(config, "SPIN_STORAGE", "compact")
+    spin = client.post(spin_url, json={"client_seed": "abc"}).json()
+    bet = client.post(f"/v1/roulette/session/{session_id}/bet", headers=auth_headers, json={
+        "client_seed": "abc", "bet": {"type": "color", "side": "red", "amount": 1.0}}).json()
+
+    server_seed = session.get(RouletteSession, session_id).server_seed
+    for res in (spin, bet["spin"]):
+        assert res["hmac_hex"] == provably_fair.spin_hmac_hex(server_seed, "abc", res["nonce"])
+        assert res["color"] in ("red", "black", "green")
+
+    rows = session.exec(select(Spin).order_by(Spin.nonce)).all()
+    assert rows[0].hmac_digest is None and rows[0].hmac_hex == full["hmac_hex"]
+    for row in rows[1:]:
+        assert (row.hmac_hex, row.client_seed, row.color) == ("", "", "")
+        assert len(row.hmac_digest) == 32
+    # el client seed se guarda una sola vez por sesión
+    assert len(session.exec(select(ClientSeed)).all()) == 1
+
+    # formatos mezclados en el listado: todo vuelve completo
+    listed = client.get(f"/v1/roulette/session/{session_id}/spins").json()["spins"]
+    assert [s["hmac_hex"] for s in listed] == [full["hmac_hex"], spin["hmac_hex"], bet["spin"]["hmac_hex"]]
+    assert all(s["client_seed"] == "abc" for s in listed)
+    assert listed[2]["color"] == bet["spin"]["color"]
+
+    activity = session.exec(select(Activity).where(Activity.kind == "roulette_bet")).one()
+    assert json.loads(activity.detail)["color"] == bet["spin"]["color"]
+
+
+def test_slots_compact_symbols_and_export(
+        client: TestClient, session: Session, auth_headers, monkeypatch):
+    monkeypatch.setattr(config, "SPIN_STORAGE", "compact")
+    session_id = client.post("/v1/slots/session").json()["session_id"]
+    bet = client.post(f"/v1/slots/session/{session_id}/bet", headers=auth_headers,
+                      json={"client_seed": "s1", "bet": {"amount": 1.0}}).json()
+
+    row = session.exec(select(SlotSpin)).one()
+    assert row.symbols == "" and row.symbol_code is not None
+    assert compact.unpack_symbols(row.symbol_code, slot_service.SLOT_SYMBOLS) == bet["spin"]["symbols"]
+
+    exported = json.loads(client.get("/profile/me/export?format=ndjson", headers=auth_headers).text)
+    assert exported["client_seed"] == "s1"
+    assert exported["hmac_hex"] == bet["spin"]["hmac_hex"]
+    assert exported["result"] == " ".join(bet["spin"]["symbols"])
+
+
+def test_symbol_codes_round_trip():
+    alphabet = slot_service.SLOT_SYMBOLS
+    for symbols in (["🍒", "🍒", "🍒"], ["7️⃣", "💎", "🍋"]):
+        assert compact.unpack_symbols(compact.pack_symbols(symbols, alphabet), alphabet) == symbols
+    assert compact.pack_symbols(["🍒", "🍒", "X"], alphabet) is None
+
+
+def test_add_missing_columns_on_existing_tables():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE spinrollup (id INTEGER PRIMARY KEY, user_id INTEGER, game VARCHAR)"))
+        conn.execute(text("INSERT INTO spinrollup (user_id, game) VALUES (1, 'slots')"))
+
+    added = add_missing_columns(engine)
+    assert "spinrollup.net" in added and "spinrollup.updated_at" not in added  # NOT NULL sin default
+    columns = {c["name"] for c in inspect(engine).get_columns("spinrollup")}
+    assert {"spins", "total_bet", "net"} <= columns
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT spins, net FROM spinrollup")).one() == (0, 0.0)
+    assert add_missing_columns(engine) == []
@@ -0,0 +1,74 @@
+# tests/unit/test_export.py
+import csv
+import io
+import json
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlmodel import Session
+
+from app.model import Spin
+
+from app.users.export import iter_roulette_history
+
+
+def _play(client: TestClient, headers, roulette_bets: int, slot_bets: int):
+    roulette_id = client.post("/v1/roulette/session").json()["session_id"]
+    slots_id = client.post("/v1/slots/session").json()["session_id"]
+    for i in range(roulette_bets):
+        client.post(f"/v1/roulette/session/{roulette_id}/bet", headers=headers, json={
+            "client_seed": f"r{i}", "bet": {"type": "color", "side": "red", "amount": 1.0}})
+    for i in range(slot_bets):
+        client.post(f"/v1/slots/session/{slots_id}/bet", headers=headers, json={
+            "client_seed": f"s{i}", "bet": {"amount": 1.0}})
+
+
+def test_export_csv_merges_games_in_time_order(client: TestClient, auth_headers):
+    _play(client, auth_headers, roulette_bets=3, slot_bets=2)
+
+    res = client.get("/profile/me/export?format=csv", headers=auth_headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert [r["game"] for r in rows] == ["roulette"] * 3 + ["slots"] * 2
+    assert [r["timestamp"] for r in rows] == sorted(r["timestamp"] for r in rows)
+
+
+def test_export_ndjson_respects_date_range(client: TestClient, auth_headers):
+    _play(client, auth_headers, roulette_bets=1, slot_bets=1)
+
+    res = client.get("/profile/me/export?format=ndjson&date_to=2000-01-01", headers=auth_headers)
+    assert res.status_code == 200
+    assert res.text == ""
+
+    res = client.get("/profile/me/export?format=ndjson", headers=auth_headers)
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert {line["game"] for line in lines} == {"roulette", "slots"}
+
+
+def test_export_date_bounds_with_offset_are_compared_in_utc(
+        client: TestClient, auth_headers, session: Session):
+    _play(client, auth_headers, roulette_bets=1, slot_bets=0)
+    session.exec(update(Spin).values(timestamp=datetime(2026, 1, 1, 10, 0)))  # 10:00Z
+    session.commit()
+
+    def exported(date_to: str):
+        res = client.get("/profile/me/export", headers=auth_headers,
+                         params={"format": "ndjson", "date_to": date_to})
+        return [json.loads(line) for line in res.text.splitlines()]
+
+    assert exported("2026-01-01T10:30:00+02:00") == []  # 08:30Z
+    assert len(exported("2026-01-01T12:30:00+02:00")) == 1  # 10:30Z
+
+
+def test_history_reads_in_keyset_chunks(client: TestClient, auth_headers, session: Session):
+    _play(client, auth_headers, roulette_bets=5, slot_bets=0)
+    rows = list(iter_roulette_history(session, user_id=1, chunk_size=2))
+    assert [r["nonce"] for r in rows] == [0, 1, 2, 3, 4]
+
+
+def test_admin_export_requires_admin(client: TestClient, auth_headers, admin_headers):
+    assert client.get("/v1/admin/users/1/export", headers=auth_headers).status_code == 403
+    assert client.get("/v1/admin/users/1/export?format=xml", headers=admin_headers).status_code == 400
+    assert client.get("/v1/admin/users/1/export", headers=admin_headers).status_code == 200
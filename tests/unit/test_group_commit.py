@@ -0,0 +1,118 @@
+# tests/unit/test_group_commit.py
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app import config
+from app.main import app
+from app.database import get_session
+from app.games import group_commit
+from app.model import Activity, SlotSpin, User
+from app.auth.utils import get_password_hash
+
+
+@pytest.fixture(name="file_engine")
+def file_engine_fixture(tmp_path):
+    # el committer usa otra conexión: hace falta una DB en archivo, no :memory:
+    engine = create_engine(f"sqlite:///{tmp_path / 'gc.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(User(username="gc", email="gc@test.com", password_hash=get_password_hash("x"), saldo=10000,
+                    role="user", is_Active=True))
+        db.commit()
+    yield engine
+    group_commit.shutdown()
+    engine.dispose()
+
+
+def _add_to_balance(amount):
+    def work(tx: Session):
+        user = tx.exec(select(User).where(User.username == "gc")).one()
+        if amount < 0 and user.saldo < -amount:
+            raise ValueError("Insufficient balance")
+        user.saldo += amount
+        tx.add(user)
+        return user
+    return work
+
+
+def test_concurrent_jobs_share_commits(file_engine):
+    committer = group_commit.GroupCommitter(file_engine, window_ms=20, max_batch=64)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(committer.submit(_add_to_balance(100)))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    committer.stop()
+
+    assert len(results) == 8
+    stats = committer.stats()
+    assert stats["jobs"] == 8
+    assert stats["batches"] < 8
+    with Session(file_engine) as db:
+        assert db.exec(select(User.saldo)).one() == 10800
+
+
+def test_failed_job_only_fails_its_caller(file_engine):
+    committer = group_commit.GroupCommitter(file_engine, window_ms=20)
+    outcomes = {}
+
+    def worker(name, amount):
+        try:
+            committer.submit(_add_to_balance(amount))
+            outcomes[name] = "ok"
+        except ValueError as e:
+            outcomes[name] = str(e)
+
+    threads = [
+        threading.Thread(target=worker, args=("a", 500)),
+        threading.Thread(target=worker, args=("b", -100000)),
+        threading.Thread(target=worker, args=("c", 500)),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    committer.stop()
+
+    assert outcomes == {"a": "ok", "b": "Insufficient balance", "c": "ok"}
+    with Session(file_engine) as db:
+        assert db.exec(select(User.saldo)).one() == 11000
+
+
+def test_slots_bet_settles_through_group_commit(file_engine, monkeypatch):
+    monkeypatch.setattr(config, "GROUP_COMMIT_ENABLED", True)
+
+    def get_session_override():
+        with Session(file_engine) as db:
+            yield db
+
+    app.dependency_overrides[get_session] = get_session_override
+    try:
+        client = TestClient(app)
+        token = client.post("/auth/login", json={"username": "gc", "password": "x"}).json()["access_token"]
+        session_id = client.post("/v1/slots/session").json()["session_id"]
+        res = client.post(
+            f"/v1/slots/session/{session_id}/bet",
+            json={"client_seed": "seed", "bet": {"amount": 10, "lines": 1}},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert res.status_code == 200
+    body = res.json()
+    assert body["balance"] == 100.0 - 10 + body["spin"]["win_amount"]
+    assert group_commit.stats()[str(file_engine.url)]["jobs"] == 1
+    with Session(file_engine) as db:
+        assert db.exec(select(SlotSpin)).one().user_id is not None
+        assert db.exec(select(Activity)).one().kind == "slot_bet"
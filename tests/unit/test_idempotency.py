@@ -0,0 +1,94 @@
+# tests/unit/test_idempotency.py
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.auth.jwt import create_access_token
+from app.middleware.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+
+def test_bet_retry_is_replayed_not_reexecuted(client: TestClient, auth_headers):
+    session_id = client.post("/v1/roulette/session").json()["session_id"]
+    headers = {**auth_headers, "Idempotency-Key": "bet-1"}
+    bet = {"client_seed": "retry", "bet": {"type": "color", "side": "red", "amount": 10.0}}
+
+    first = client.post(f"/v1/roulette/session/{session_id}/bet", headers=headers, json=bet)
+    retry = client.post(f"/v1/roulette/session/{session_id}/bet", headers=headers, json=bet)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    spins = client.get(f"/v1/roulette/session/{session_id}/spins").json()["spins"]
+    assert len(spins) == 1
+
+    other = client.post(f"/v1/roulette/session/{session_id}/bet", headers=headers,
+                        json={**bet, "client_seed": "changed"})
+    assert other.status_code == 422
+
+
+def test_keys_are_scoped_per_caller(client: TestClient, auth_headers):
+    client.post("/v1/roulette/user/deposit", headers={**auth_headers, "Idempotency-Key": "k"},
+                json={"amount": 1.0})
+    anonymous = client.post("/v1/roulette/user/deposit", headers={"Idempotency-Key": "k"},
+                            json={"amount": 1.0})
+    assert anonymous.status_code == 401
+
+
+def test_retry_with_a_refreshed_token_is_replayed(client: TestClient, auth_headers):
+    refreshed = {"Authorization": "Bearer " + create_access_token({"sub": "testuser", "refresh": 1})}
+    assert refreshed != auth_headers
+    body = {"amount": 5.0}
+    first = client.post("/v1/roulette/user/deposit", headers={**auth_headers, "Idempotency-Key": "dep"},
+                        json=body)
+    retry = client.post("/v1/roulette/user/deposit", headers={**refreshed, "Idempotency-Key": "dep"},
+                        json=body)
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert client.get("/profile/me/saldo", headers=refreshed).json()["saldo"] == 1105.0
+
+
+def test_concurrent_duplicate_waits_for_original():
+    calls = []
+
+    async def slow_app(scope, receive, send):
+        await receive()
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": str(len(calls)).encode()})
+
+    app = IdempotencyMiddleware(slow_app, IdempotencyStore(60, 100), paths=[r"^/pay$"])
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            headers = {"Idempotency-Key": "same"}
+            return await asyncio.gather(
+                c.post("/pay", headers=headers, content=b"x"),
+                c.post("/pay", headers=headers, content=b"x"),
+            )
+
+    a, b = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert a.text == b.text == "1"
+
+
+def test_failed_original_releases_key():
+    calls = []
+
+    async def flaky_app(scope, receive, send):
+        await receive()
+        calls.append(1)
+        status = 500 if len(calls) == 1 else 200
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    store = IdempotencyStore(60, 100)
+    app = IdempotencyMiddleware(flaky_app, store, paths=[r"^/pay$"])
+    client = TestClient(app)
+    assert client.post("/pay", headers={"Idempotency-Key": "k"}).status_code == 500
+    assert client.post("/pay", headers={"Idempotency-Key": "k"}).status_code == 200
+    assert client.post("/pay", headers={"Idempotency-Key": "k"}).headers["idempotent-replayed"] == "true"
+    assert len(calls) == 2
+    assert store.stats() == {"entries": 1, "in_flight": 0}
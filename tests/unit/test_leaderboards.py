@@ -0,0 +1,54 @@
+# tests/unit/test_leaderboards.py
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.leaderboards import service as leaderboard_service
+from app.leaderboards.board import TopK
+from app.model import User
+
+
+def test_topk_keeps_best_scores_and_evicts_floor():
+    board = TopK(3)
+    for uid, score in [(1, 10.0), (2, 20.0), (3, 5.0), (4, 7.0), (3, 30.0), (1, 8.0)]:
+        board.offer(uid, f"u{uid}", score)
+    assert board.top() == [(3, "u3", 30.0), (2, "u2", 20.0), (1, "u1", 10.0)]
+    assert len(board) == 3
+
+
+def test_topk_heap_is_compacted():
+    board = TopK(2)
+    for i in range(100):
+        board.offer(1, "u1", float(i))
+    assert len(board._heap) <= 8
+    assert board.top(1) == [(1, "u1", 99.0)]
+
+
+def test_record_win_feeds_all_boards_and_snapshot(session: Session):
+    alice = User(id=1, email="a@x", username="alice", password_hash="x", role="Jugador",
+                 is_Active=True, ganancias_totales=50.0)
+    bob = User(id=2, email="b@x", username="bob", password_hash="x", role="Jugador",
+               is_Active=True, ganancias_totales=70.0)
+    session.add(alice)
+    session.add(bob)
+    session.commit()
+
+    leaderboard_service.record_win(alice, 50.0)
+    leaderboard_service.record_win(bob, 30.0)
+    leaderboard_service.record_win(bob, 40.0)
+
+    assert [e["username"] for e in leaderboard_service.top("ganancias")] == ["bob", "alice"]
+    daily = leaderboard_service.top("ganancias", "daily")
+    assert [(e["username"], e["score"]) for e in daily] == [("bob", 70.0), ("alice", 50.0)]
+    assert leaderboard_service.top("biggest_win")[0]["username"] == "alice"
+
+    assert leaderboard_service.snapshot(session) == 8
+    leaderboard_service.warm_start(session)
+    assert leaderboard_service.top("biggest_win")[0]["score"] == 50.0
+    assert leaderboard_service.top("ganancias", "daily")[0]["score"] == 70.0
+
+
+def test_leaderboard_endpoint(client: TestClient):
+    res = client.get("/v1/leaderboards/ganancias?period=daily")
+    assert res.status_code == 200
+    assert res.json()["entries"] == []
+    assert client.get("/v1/leaderboards/nope").status_code == 404
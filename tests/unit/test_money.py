@@ -0,0 +1,56 @@
+# tests/unit/test_money.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
+from sqlmodel import Session, select
+
+from app.migrations import migrate_money_to_minor
+from app.model import CreditRequest, User
+from app.money import scale, to_major, to_minor
+
+
+def test_conversions_are_exact():
+    assert to_minor(10) == 1000
+    assert to_minor(0.1) + to_minor(0.2) == to_minor(0.3)
+    assert to_minor("19.99") == 1999
+    assert to_major(1999) == 19.99
+    assert scale(1000, 3.0) == 3000
+    assert scale(333, 1.5) == 499  # hacia abajo al centavo
+    for bad in (1.005, "abc", float("inf"), True):
+        with pytest.raises(ValueError):
+            to_minor(bad)
+
+
+def test_api_takes_decimals_and_db_keeps_cents(client: TestClient, session: Session, auth_headers):
+    res = client.post("/v1/credits/request", headers=auth_headers, json={"amount": 12.34})
+    assert res.status_code == 200
+    assert res.json()["amount"] == 12.34
+    assert session.exec(select(CreditRequest.amount)).one() == 1234
+
+    saldo = session.exec(select(User.saldo).where(User.username == "testuser")).one()
+    assert saldo == 110000  # 1000 del alta + 100 que deposita el fixture
+    assert client.get("/profile/me/saldo", headers=auth_headers).json()["saldo"] == 1100.0
+
+    # fracciones de centavo se rechazan en el borde
+    session_id = client.post("/v1/roulette/session").json()["session_id"]
+    res = client.post(f"/v1/roulette/session/{session_id}/bet", headers=auth_headers, json={
+        "client_seed": "c", "bet": {"type": "color", "side": "red", "amount": 0.001}})
+    assert res.status_code == 422
+
+
+def test_migrate_float_columns_to_cents():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE "user" (id INTEGER NOT NULL, username VARCHAR NOT NULL, saldo FLOAT NOT NULL, '
+            'ganancias_totales FLOAT NOT NULL, perdidas_totales FLOAT NOT NULL, PRIMARY KEY (id), UNIQUE (username))'))
+        conn.execute(text('CREATE INDEX ix_user_saldo ON "user" (saldo)'))
+        conn.execute(text('INSERT INTO "user" VALUES (1, \'a\', 1234.56, 0.1, 0.3)'))
+
+    assert migrate_money_to_minor(engine) == ["user.saldo", "user.ganancias_totales", "user.perdidas_totales"]
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT saldo, ganancias_totales, perdidas_totales FROM "user"')).one() == (123456, 10, 30)
+    inspector = inspect(engine)
+    assert {c["name"]: str(c["type"]) for c in inspector.get_columns("user")}["saldo"] == "INTEGER"
+    assert [i["name"] for i in inspector.get_indexes("user")] == ["ix_user_saldo"]
+    assert migrate_money_to_minor(engine) == []
@@ -0,0 +1,63 @@
+# tests/unit/test_monitor.py
+import json
+import logging
+import random
+import statistics
+
+from fastapi.testclient import TestClient
+
+from app import config
+from app.analytics.monitor import Monitor, RollingWindow, Welford, monitor
+
+
+def test_welford_and_window_match_batch_statistics():
+    rng = random.Random(7)
+    xs = [rng.expovariate(1.0) for _ in range(500)]
+    w = Welford()
+    for x in xs:
+        w.add(x)
+    assert abs(w.mean - statistics.fmean(xs)) < 1e-9
+    assert abs(w.variance - statistics.variance(xs)) < 1e-9
+
+    window = RollingWindow(50)
+    for i, x in enumerate(xs):
+        window.add(100, i, x)
+    assert len(window.items) == 50
+    assert abs(window.mean - statistics.fmean(xs[-50:])) < 1e-9
+    assert window.paid_out == sum(range(450, 500))
+
+
+def test_lucky_player_and_drift_alert_once(monkeypatch, caplog):
+    monkeypatch.setattr(config, "MONITOR_WINDOW", 100)
+    monkeypatch.setattr(config, "MONITOR_MIN_BETS", 50)
+    rng = random.Random(1)
+    m = Monitor()
+    # tráfico normal: gana la mitad de las veces el doble (retorno medio 1)
+    for i in range(2000):
+        m.observe("roulette", i % 40, 100, 200 if rng.random() < 0.5 else 0)
+    assert m.snapshot()["recent_alerts"] == []
+
+    caplog.set_level(logging.WARNING, logger="casino.monitor")
+    for _ in range(100):
+        m.observe("roulette", 999, 100, 200)  # gana siempre
+    events = [json.loads(r.getMessage())["event"] for r in caplog.records]
+    assert events.count("lucky_player") == 1
+    assert events.count("rtp_drift") == 1
+
+    snap = m.snapshot()
+    assert snap["flagged_users"][0]["user_id"] == 999
+    assert snap["games"]["roulette"]["bets"] == 2100
+    assert snap["games"]["roulette"]["window"]["rtp"] == 2.0
+
+
+def test_settlements_feed_the_monitor(client: TestClient, auth_headers, admin_headers):
+    session_id = client.post("/v1/slots/session").json()["session_id"]
+    for i in range(3):
+        client.post(f"/v1/slots/session/{session_id}/bet", headers=auth_headers,
+                    json={"client_seed": f"s{i}", "bet": {"amount": 1.0}})
+    assert monitor.snapshot()["games"]["slots"]["bets"] == 3
+
+    res = client.get("/v1/admin/monitor", headers=admin_headers)
+    assert res.status_code == 200
+    assert res.json()["games"]["slots"]["window"]["bets"] == 3
+    assert client.get("/v1/admin/monitor", headers=auth_headers).status_code == 403
@@ -186,4 +186,93 @@ def test_partial_profile_update(client: TestClient, auth_headers):
     data = response.json()
     assert data["telefono"] == "+573009876543"
     # El email debería mantenerse igual
-    assert "email" in data
\ No newline at end of file
+    assert "email" in data
+
+def test_profile_etag_304_until_balance_changes(client: TestClient, auth_headers):
+    """Test GET condicional del perfil: 304 mientras no cambie el usuario"""
+    first = client.get("/profile/testuser")
+    assert first.status_code == 200
+    # ya la primera lectura del proceso trae validador
+    etag = first.headers["ETag"]
+    cached = client.get("/profile/testuser", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+    client.post("/v1/roulette/user/deposit", headers=auth_headers, json={"amount": 5.0})
+    changed = client.get("/profile/testuser", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["saldo"] == 1105.0
+
+
+def test_saldo_etag_requires_valid_token(client: TestClient, auth_headers):
+    """Test 304 del saldo solo con token válido"""
+    etag = client.get("/profile/me/saldo", headers=auth_headers).headers["ETag"]
+
+    cached = client.get("/profile/me/saldo", headers={**auth_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    bad = client.get("/profile/me/saldo", headers={"Authorization": "Bearer invalid", "If-None-Match": etag})
+    assert bad.status_code == 401
+
+
+def test_activity_feed_mixes_games_and_wallet(client: TestClient, auth_headers):
+    """Test feed de actividad unificado con paginación keyset"""
+    roulette_id = client.post("/v1/roulette/session").json()["session_id"]
+    client.post(f"/v1/roulette/session/{roulette_id}/bet", headers=auth_headers, json={
+        "client_seed": "feed", "bet": {"type": "color", "side": "red", "amount": 5.0}})
+    slots_id = client.post("/v1/slots/session").json()["session_id"]
+    client.post(f"/v1/slots/session/{slots_id}/bet", headers=auth_headers, json={
+        "client_seed": "feed", "bet": {"amount": 2.0}})
+    client.post("/v1/credits/request", headers=auth_headers, json={"amount": 40.0})
+
+    first = client.get("/profile/me/activity?limit=2", headers=auth_headers)
+    assert first.status_code == 200
+    page1 = first.json()
+    assert [i["kind"] for i in page1["items"]] == ["credit_request", "slot_bet"]
+    assert page1["items"][1]["game"] == "slots"
+
+    page2 = client.get(
+        f"/profile/me/activity?limit=2&cursor={page1['next_cursor']}", headers=auth_headers
+    ).json()
+    # el depósito viene del fixture auth_headers
+    assert [i["kind"] for i in page2["items"]] == ["roulette_bet", "deposit"]
+    assert page2["next_cursor"] is None
+
+
+def test_version_maps_are_bounded_and_never_reuse_a_version(monkeypatch):
+    from app import config
+    from app.users import versions
+
+    monkeypatch.setattr(config, "USER_VERSIONS_CACHE_SIZE", 2)
+    versions.remember(1, "uno")
+    old = versions.etag_for(1, "saldo")
+    versions.bump(1)
+    for user_id in (2, 3):  # desalojan al usuario 1 de los dos mapas
+        versions.remember(user_id, f"u{user_id}")
+    assert len(versions._versions) == 2 and len(versions._ids_by_username) == 2
+    assert versions.cached_etag("uno", "saldo") is None
+
+    versions.remember(1, "uno")
+    assert versions.etag_for(1, "saldo") != old
+
+
+def test_saldo_stops_answering_304_once_the_user_is_deactivated_or_deleted(
+        client: TestClient, session, auth_headers):
+    from sqlmodel import select
+    from app.model import User
+
+    etag = client.get("/profile/me/saldo", headers=auth_headers).headers["ETag"]
+    conditional = {**auth_headers, "If-None-Match": etag}
+    assert client.get("/profile/me/saldo", headers=conditional).status_code == 304
+
+    user = session.exec(select(User).where(User.username == "testuser")).one()
+    user.is_Active = False
+    session.add(user)
+    session.commit()
+    assert client.get("/profile/me/saldo", headers=conditional).status_code == 200
+
+    etag = client.get("/profile/me/saldo", headers=auth_headers).headers["ETag"]
+    session.delete(user)
+    session.commit()
+    res = client.get("/profile/me/saldo", headers={**auth_headers, "If-None-Match": etag})
+    assert res.status_code == 401
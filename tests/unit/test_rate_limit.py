@@ -0,0 +1,62 @@
+# tests/unit/test_rate_limit.py
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth.jwt import create_access_token
+from app.middleware.rate_limit import RateLimiter, RateLimitMiddleware, RateRule, client_identity
+
+
+def test_bucket_refills_at_rate():
+    limiter = RateLimiter(idle_seconds=60)
+    key = ("bet", "user:a")
+
+    assert limiter.acquire(key, rate=1.0, burst=2, now=0.0) == (True, 0.0)
+    assert limiter.acquire(key, rate=1.0, burst=2, now=0.0) == (True, 0.0)
+    allowed, retry_after = limiter.acquire(key, rate=1.0, burst=2, now=0.5)
+    assert not allowed and retry_after == 0.5
+    assert limiter.acquire(key, rate=1.0, burst=2, now=1.0)[0]
+
+
+def test_keys_are_independent_and_idle_keys_evicted():
+    limiter = RateLimiter(idle_seconds=10, shards=1)
+    limiter.acquire(("bet", "user:a"), rate=1.0, burst=1, now=0.0)
+    assert not limiter.acquire(("bet", "user:a"), rate=1.0, burst=1, now=0.1)[0]
+    assert limiter.acquire(("bet", "user:b"), rate=1.0, burst=1, now=0.1)[0]
+    assert limiter.stats()["keys"] == 2
+
+    limiter.acquire(("bet", "user:c"), rate=1.0, burst=1, now=20.0)
+    assert limiter.stats()["keys"] == 1
+
+
+def test_identity_uses_jwt_subject_or_ip():
+    token = create_access_token({"sub": "alice"})
+    scope = {"headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("1.2.3.4", 1)}
+    assert client_identity(scope) == "user:alice"
+
+    forged = {"headers": [(b"authorization", b"Bearer not-a-jwt")], "client": ("1.2.3.4", 1)}
+    assert client_identity(forged) == "ip:1.2.3.4"
+
+
+def test_middleware_returns_429_with_retry_after():
+    app = FastAPI()
+
+    @app.post("/v1/slots/session/{session_id}/spin")
+    def spin(session_id: int):
+        return {"ok": True}
+
+    @app.get("/v1/slots/session/{session_id}/hash")
+    def hash_(session_id: int):
+        return {"ok": True}
+
+    app.add_middleware(RateLimitMiddleware, limiter=RateLimiter(idle_seconds=60), rules=[
+        RateRule("spin", "POST", r"^/v1/slots/session/\d+/spin$", rate=0.01, burst=2),
+    ])
+    client = TestClient(app)
+
+    assert [client.post("/v1/slots/session/1/spin").status_code for _ in range(3)] == [200, 200, 429]
+    res = client.post("/v1/slots/session/1/spin")
+    assert res.status_code == 429
+    assert int(res.headers["Retry-After"]) >= 1
+
+    # rutas sin regla no se limitan
+    assert all(client.get("/v1/slots/session/1/hash").status_code == 200 for _ in range(5))
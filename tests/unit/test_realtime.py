@@ -0,0 +1,84 @@
+# tests/unit/test_realtime.py
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.realtime.hub import BalanceHub
+
+
+def test_hub_drops_oldest_when_connection_is_slow():
+    async def scenario():
+        hub = BalanceHub()
+        sub = hub.subscribe(1)
+        for i in range(20):
+            hub.publish(1, {"saldo": i})
+        await asyncio.sleep(0)  # deja correr los call_soon_threadsafe
+        messages = [sub.queue.get_nowait() for _ in range(sub.queue.qsize())]
+        hub.unsubscribe(sub)
+        return sub, messages, hub
+
+    sub, messages, hub = asyncio.run(scenario())
+    assert len(messages) == sub.queue.maxsize
+    assert messages[-1] == '{"saldo": 19}'
+    assert sub.dropped == 20 - sub.queue.maxsize
+    assert hub.stats() == {"users": 0, "connections": 0}
+
+
+def test_websocket_pushes_balance_after_deposit(client: TestClient, auth_headers):
+    token = auth_headers["Authorization"].split(" ", 1)[1]
+    with client.websocket_connect(f"/v1/stream/balance?token={token}") as ws:
+        snapshot = ws.receive_json()
+        assert snapshot["event"] == "snapshot"
+        assert snapshot["saldo"] == 1100.0
+
+        client.post("/v1/roulette/user/deposit", headers=auth_headers, json={"amount": 25.0})
+        pushed = ws.receive_json()
+        assert pushed["event"] == "deposit"
+        assert pushed["saldo"] == 1125.0
+        assert pushed["amount"] == 25.0
+
+
+def test_websocket_rejects_invalid_token(client: TestClient):
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/v1/stream/balance?token=invalid") as ws:
+            ws.receive_json()
+
+
+def test_websocket_cleans_up_when_send_fails(monkeypatch):
+    from types import SimpleNamespace
+
+    from app.realtime import routes
+    from app.realtime.hub import hub
+
+    user = SimpleNamespace(id=77, saldo=100, ganancias_totales=0, perdidas_totales=0)
+    monkeypatch.setattr(routes, "get_user_from_token", lambda db, token: user)
+    cancelled = []
+
+    class BrokenSocket:
+        async def accept(self):
+            pass
+
+        async def send_json(self, data):
+            hub.publish(user.id, {"saldo": 1})  # llega un cambio apenas conecta
+
+        async def send_text(self, text):
+            raise RuntimeError("client went away")
+
+        async def receive(self):
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await routes.balance_ws(BrokenSocket(), "token", db=None)
+        await asyncio.sleep(0)  # deja que la cancelación llegue al receive()
+        # antes de que asyncio.run cancele lo que quede colgado al cerrar el loop
+        assert cancelled == [True]
+
+    asyncio.run(scenario())
+    assert hub.stats() == {"users": 0, "connections": 0}
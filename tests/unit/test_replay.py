@@ -0,0 +1,74 @@
+# tests/unit/test_replay.py
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app import config
+from app.analytics import replay
+from app.games.slots import service as slot_service
+from app.model import RouletteSession, SlotSpin, Spin, User
+
+
+def _play(client: TestClient, headers, bets: int):
+    roulette_id = client.post("/v1/roulette/session").json()["session_id"]
+    slots_id = client.post("/v1/slots/session").json()["session_id"]
+    for i in range(bets):
+        client.post(f"/v1/roulette/session/{roulette_id}/bet", headers=headers, json={
+            "client_seed": f"r{i}", "bet": {"type": "color", "side": "red", "amount": 1.5}})
+        client.post(f"/v1/slots/session/{slots_id}/bet", headers=headers, json={
+            "client_seed": f"s{i}", "bet": {"amount": 1.0, "lines": 3}})
+
+
+def test_same_paytable_replays_history_exactly(client: TestClient, session: Session, auth_headers):
+    _play(client, auth_headers, 12)
+    slots = replay.replay(session, "slots", {})
+    spins = session.exec(select(SlotSpin)).all()
+    assert (slots["bets"], slots["wagered"]) == (12, 3600)
+    assert slots["current"]["ggr"] == 3600 - sum(s.win_amount for s in spins)
+    assert slots["ggr_delta"] == 0 and slots["players"]["better_off"] == 0
+
+    roulette = replay.replay(session, "roulette", {})
+    assert roulette["current"]["ggr"] == -sum(s.payout for s in session.exec(select(Spin)).all())
+    assert roulette["ggr_delta"] == 0
+
+
+def test_candidate_paytable_changes_ggr(client: TestClient, session: Session, auth_headers, monkeypatch):
+    monkeypatch.setattr(config, "SPIN_STORAGE", "compact")  # los símbolos salen de symbol_code
+    _play(client, auth_headers, 12)
+    wins = sum(1 for s in session.exec(select(Spin)).all() if s.payout > 0)
+
+    roulette = replay.replay(session, "roulette", {"color": 2})
+    assert roulette["ggr_delta"] == -wins * 150
+    assert roulette["players"]["better_off"] == (1 if wins else 0)
+
+    no_pay = {symbol: 0.0 for symbol in slot_service.SYMBOL_PAYOUTS}
+    slots = replay.replay(session, "slots", no_pay)
+    assert slots["candidate"] == {"ggr": 3600, "rtp": 0.0}
+
+    with pytest.raises(ValueError):
+        replay.replay(session, "slots", {"🍌": 3})
+
+
+def test_legacy_roulette_payloads_are_normalized(session: Session, auth_headers):
+    user_id = session.exec(select(User.id).where(User.username == "testuser")).one()
+    rs = RouletteSession(server_seed="s", server_seed_hash="h")
+    session.add(rs)
+    session.commit()
+    # filas de antes de compile_bet: el request guardado tal cual
+    legacy = [
+        ('{"type": "color", "side": "Red", "amount": 1.0}', 1, 100, 100),     # 1 es rojo
+        ('{"type": "straight", "number": "17"}', 17, 100, 3500),
+        ('{"type": "dozen", "which": "2"}', 5, 100, -100),
+        ('{"type": "color", "side": "purple"}', 3, 100, -100),               # no interpretable
+    ]
+    for i, (payload, pocket, amount, payout) in enumerate(legacy):
+        session.add(Spin(session_id=rs.id, nonce=i, client_seed="c", hmac_hex="", pocket=pocket, color="",
+                         user_id=user_id, bet_type=payload.split('"')[3], bet_payload=payload,
+                         bet_amount=amount, payout=payout))
+    session.commit()
+
+    result = replay.replay(session, "roulette", {"straight": 30})
+    assert result["bets"] == 3
+    assert result["unpriced"] == {"bets": 1, "wagered": 100}
+    assert result["current"]["ggr"] == -(100 + 3500 - 100)
+    assert result["ggr_delta"] == 500
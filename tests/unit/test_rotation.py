@@ -0,0 +1,73 @@
+# tests/unit/test_rotation.py
+import dataclasses
+import threading
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlmodel import Session
+
+from app import config
+from app.games import rotation
+from app.games.roulette import service as roulette_service
+from app.model import RouletteSession, SlotSession
+
+
+def test_session_rotates_after_n_spins(client: TestClient, monkeypatch):
+    monkeypatch.setattr(config, "SESSION_ROTATE_AFTER_SPINS", 3)
+    session_id = client.post("/v1/roulette/session").json()["session_id"]
+    spin_url = f"/v1/roulette/session/{session_id}/spin"
+
+    spins = [client.post(spin_url, json={"client_seed": "c"}).json() for _ in range(3)]
+    assert spins[0]["rotation"] is None and spins[1]["rotation"] is None
+
+    rotated = spins[2]["rotation"]
+    assert rotated["revealed_session_id"] == session_id
+    assert roulette_service.hash_server_seed(rotated["server_seed"]) == spins[0]["server_seed_hash"]
+
+    # la sesión vieja ya no acepta giros; la nueva sí
+    assert client.post(spin_url, json={"client_seed": "c"}).status_code == 400
+    res = client.post(f"/v1/roulette/session/{rotated['next_session_id']}/spin", json={"client_seed": "c"})
+    assert res.status_code == 200
+    assert res.json()["server_seed_hash"] == rotated["next_server_seed_hash"]
+
+
+def test_slots_bet_reports_rotation(client: TestClient, auth_headers, monkeypatch):
+    monkeypatch.setattr(config, "SESSION_ROTATE_AFTER_SPINS", 1)
+    session_id = client.post("/v1/slots/session").json()["session_id"]
+    res = client.post(f"/v1/slots/session/{session_id}/bet", headers=auth_headers,
+                      json={"client_seed": "c", "bet": {"amount": 1.0}})
+    assert res.status_code == 200
+    assert res.json()["rotation"]["revealed_session_id"] == session_id
+
+
+def test_only_one_request_rotates(client: TestClient, session: Session, monkeypatch):
+    session_id = client.post("/v1/roulette/session").json()["session_id"]
+    client.post(f"/v1/roulette/session/{session_id}/spin", json={"client_seed": "c"})
+    monkeypatch.setattr(config, "SESSION_ROTATE_AFTER_SPINS", 1)
+
+    # dos copias de la metadata, como en dos procesos distintos
+    first = roulette_service.get_session_meta(session, session_id)
+    second = dataclasses.replace(first, lock=threading.Lock())
+    assert roulette_service.rotate_if_due(session, first) is not None
+    assert roulette_service.rotate_if_due(session, second) is None
+
+
+def test_reveal_stale_sessions_in_batch(client: TestClient, session: Session, monkeypatch):
+    monkeypatch.setattr(config, "SESSION_ROTATE_AFTER_MINUTES", 60)
+    old = [client.post("/v1/roulette/session").json()["session_id"] for _ in range(3)]
+    old_slot = client.post("/v1/slots/session").json()["session_id"]
+    two_hours_ago = datetime.now(timezone.utc) - timedelta(hours=2)
+    session.exec(update(RouletteSession).values(created_at=two_hours_ago))
+    session.exec(update(SlotSession).values(created_at=two_hours_ago))
+    session.commit()
+    fresh = client.post("/v1/roulette/session").json()["session_id"]
+
+    assert rotation.reveal_stale_sessions(session, batch_size=2) == {"roulette": 3, "slots": 1}
+
+    for session_id in old:
+        res = client.post(f"/v1/roulette/session/{session_id}/spin", json={"client_seed": "c"})
+        assert res.status_code == 400
+    res = client.post(f"/v1/slots/session/{old_slot}/spin", json={"client_seed": "c", "bet_amount": 1})
+    assert res.status_code == 400
+    assert client.post(f"/v1/roulette/session/{fresh}/spin", json={"client_seed": "c"}).status_code == 200
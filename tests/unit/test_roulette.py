@@ -94,8 +94,8 @@ def test_roulette_bet_validation_invalid_bet_type(client: TestClient, auth_heade
         json=bet_data
     )
     
-    # Assert
-    assert response.status_code == 400
+    # Assert - el esquema tipado lo rechaza antes de tocar la DB
+    assert response.status_code == 422
 
 def test_roulette_spin_provably_fair_verification(client: TestClient, auth_headers):
     """Test que verifica el sistema provably fair"""
@@ -226,4 +226,50 @@ def test_roulette_bet_without_authentication(client: TestClient):
     )
     
     # Assert
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+
+def test_roulette_malformed_bets_rejected_before_spin(client: TestClient, auth_headers):
+    """Apuestas mal formadas: 422 y ni giro ni cambio de saldo"""
+    session_id = client.post("/v1/roulette/session", headers=auth_headers).json()["session_id"]
+    saldo = client.get("/profile/me/saldo", headers=auth_headers).json()["saldo"]
+
+    for bet in [
+        {"type": "color", "side": "green", "amount": 5.0},
+        {"type": "straight", "amount": 5.0},
+        {"type": "straight", "number": 37, "amount": 5.0},
+        {"type": "dozen", "which": 4, "amount": 5.0},
+        {"type": "column", "which": 1, "amount": -5.0},
+        {"side": "red", "amount": 5.0},
+    ]:
+        response = client.post(
+            f"/v1/roulette/session/{session_id}/bet",
+            headers=auth_headers,
+            json={"client_seed": "bad", "bet": bet}
+        )
+        assert response.status_code == 422, bet
+
+    spins = client.get(f"/v1/roulette/session/{session_id}/spins").json()["spins"]
+    assert spins == []
+    assert client.get("/profile/me/saldo", headers=auth_headers).json()["saldo"] == saldo
+
+
+def test_roulette_compiled_bets_match_rules():
+    """La forma compilada paga igual que las reglas de la mesa"""
+    from app.games.roulette import service
+
+    red = service.compile_bet({"type": "color", "side": "RED", "amount": 1000})  # centavos
+    assert red.payload == {"type": "color", "side": "red"}
+    assert service.evaluate_compiled(red, 1) == (True, 1000)
+    assert service.evaluate_compiled(red, 0) == (False, -1000)
+
+    straight = service.compile_bet({"type": "straight", "number": 0, "amount": 200})
+    assert service.evaluate_compiled(straight, 0) == (True, 7000)
+
+    column = service.compile_bet({"type": "column", "which": "3", "amount": 100})
+    assert all(service.evaluate_compiled(column, n)[0] == (n in service.col3) for n in range(37))
+
+    # montos que no son centavos enteros se rechazan, no se truncan
+    for amount in (150.7, 10.0, "100", True):
+        with pytest.raises(ValueError):
+            service.compile_bet({"type": "color", "side": "red", "amount": amount})
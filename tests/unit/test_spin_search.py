@@ -0,0 +1,68 @@
+# tests/unit/test_spin_search.py
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.model import Spin, User
+
+
+def _bets(client: TestClient, headers, n: int):
+    session_id = client.post("/v1/roulette/session").json()["session_id"]
+    for i in range(n):
+        bet = {"type": "straight", "number": 7, "amount": 2.0} if i % 2 else \
+            {"type": "color", "side": "red", "amount": 1.0}
+        client.post(f"/v1/roulette/session/{session_id}/bet", headers=headers,
+                    json={"client_seed": f"c{i}", "bet": bet})
+    client.post(f"/v1/roulette/session/{session_id}/spin", json={"client_seed": "x"})  # sin apuesta
+
+
+def test_search_by_user_pages_with_cursor(client: TestClient, session: Session, auth_headers, admin_headers):
+    _bets(client, auth_headers, 5)
+    user_id = session.exec(select(User.id).where(User.username == "testuser")).one()
+
+    res = client.get(f"/v1/admin/spins?game=roulette&user_id={user_id}&limit=3", headers=admin_headers)
+    assert res.status_code == 200
+    body = res.json()
+    assert body["index"] == "ix_spin_user_ts_id"
+    assert (body["count"], body["count_exact"]) == (5, True)
+    first = body["items"]
+    assert len(first) == 3 and all(s["user_id"] == user_id for s in first)
+
+    nxt = client.get(f"/v1/admin/spins?game=roulette&user_id={user_id}&limit=3"
+                     f"&cursor={res.headers['X-Next-Cursor']}", headers=admin_headers)
+    ids = [s["id"] for s in first + nxt.json()["items"]]
+    assert len(ids) == 5 and ids == sorted(ids, reverse=True)
+    assert "X-Next-Cursor" not in nxt.headers
+
+    straight = client.get(f"/v1/admin/spins?game=roulette&user_id={user_id}&bet_type=straight&min_amount=2",
+                          headers=admin_headers).json()["items"]
+    assert len(straight) == 2 and all(s["stake"] == 2.0 for s in straight)
+
+    assert client.get("/v1/admin/spins?game=roulette", headers=auth_headers).status_code == 403
+
+
+def test_unindexed_combinations_are_rejected(client: TestClient, session: Session, auth_headers, admin_headers):
+    _bets(client, auth_headers, 4)
+    # monto/premio sin usuario ni rango de fechas
+    res = client.get("/v1/admin/spins?game=roulette&min_win=10", headers=admin_headers)
+    assert res.status_code == 400
+    res = client.get("/v1/admin/spins?game=slots&bet_type=color", headers=admin_headers)
+    assert res.status_code == 400
+
+    now = datetime.now(timezone.utc)
+    window = {"date_from": (now - timedelta(days=90)).isoformat(), "date_to": now.isoformat()}
+    res = client.get("/v1/admin/spins", headers=admin_headers, params={"game": "roulette", "min_win": 1, **window})
+    assert res.status_code == 400  # rango más largo que SEARCH_MAX_RANGE_DAYS
+
+    window["date_from"] = (now - timedelta(days=1)).isoformat()
+    window["date_to"] = (now + timedelta(minutes=1)).isoformat()
+    res = client.get("/v1/admin/spins", headers=admin_headers,
+                     params={"game": "roulette", "bet_type": "color", "min_win": 0.01, **window})
+    assert res.status_code == 200
+    assert res.json()["index"] == "ix_spin_bettype_ts_id"
+    winners = [s for s in session.exec(select(Spin).where(Spin.bet_type == "color")).all() if s.payout > 0]
+    assert len(res.json()["items"]) == len(winners)
+
+    everything = client.get("/v1/admin/spins?game=roulette", headers=admin_headers).json()
+    assert everything["index"] == "ix_spin_ts_id" and everything["count"] == 5
@@ -0,0 +1,58 @@
+# tests/unit/test_user_directory.py
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlmodel import Session, select
+
+from app.migrations import add_missing_columns, backfill_user_identity
+from app.model import User
+
+
+def _signup(client: TestClient, username: str, email: str):
+    client.post("/auth/signup", json={"username": username, "password": "pw", "email": email})
+
+
+def test_prefix_search_filters_and_pages(client: TestClient, session: Session, admin_headers):
+    for name in ("Ana", "andres", "Andrea", "bruno"):
+        _signup(client, name, f"{name}@Mail.com ")
+    andrea = session.exec(select(User).where(User.username == "Andrea")).one()
+    andrea.is_Active = False
+    session.add(andrea)
+    session.commit()
+
+    res = client.get("/v1/admin/users?q=AN&limit=2", headers=admin_headers)
+    assert res.status_code == 200
+    first = res.json()
+    assert [u["username"] for u in first] == ["Ana", "Andrea"]
+    assert all("password_hash" not in u and "numero_documento" not in u for u in first)
+    rest = client.get(f"/v1/admin/users?q=AN&limit=2&cursor={res.headers['X-Next-Cursor']}",
+                      headers=admin_headers).json()
+    assert [u["username"] for u in rest] == ["andres"]
+
+    active = client.get("/v1/admin/users?q=an&active=true", headers=admin_headers).json()
+    assert [u["username"] for u in active] == ["Ana", "andres"]
+    by_email = client.get("/v1/admin/users?q=BRUNO@&by=email", headers=admin_headers).json()
+    assert [u["email"] for u in by_email] == ["bruno@Mail.com "]
+    admins = client.get("/v1/admin/users?role=admin", headers=admin_headers).json()
+    assert [u["username"] for u in admins] == ["admin"]
+
+    assert client.get("/v1/admin/users?cursor=nope", headers=admin_headers).status_code == 400
+    assert client.get("/auth/debug/users").status_code == 404
+
+
+def test_player_cannot_list_users(client: TestClient, auth_headers):
+    assert client.get("/v1/admin/users", headers=auth_headers).status_code == 403
+
+
+def test_backfill_normalizes_existing_users():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE "user" (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL, username VARCHAR NOT NULL, '
+            'password_hash VARCHAR NOT NULL, role VARCHAR NOT NULL, "is_Active" BOOLEAN NOT NULL)'))
+        conn.execute(text("""INSERT INTO "user" VALUES (1, ' Zoe@X.io', 'ZOE', 'h', 'Jugador', 1)"""))
+    add_missing_columns(engine)
+
+    assert backfill_user_identity(engine, batch_size=1) == 1
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT username_norm, email_norm FROM "user"')).one() == ("zoe", "zoe@x.io")
+    assert backfill_user_identity(engine) == 0